@@ -1,6 +1,11 @@
 from flask import Flask, render_template, send_from_directory
 import os
+from flask.helpers import get_debug_flag
+from werkzeug.serving import is_running_from_reloader
 from tools.cache_manager import clear_old_cache
+from tools.bilibili_push import start_push_ingest
+from tools.refresh_scheduler import start_refresh_scheduler
+from tools.user_manager import DATA_DIR
 
 # 导入蓝图
 from routes.auth_routes import auth_bp
@@ -23,6 +28,52 @@ app.register_blueprint(config_bp)
 app.register_blueprint(batch_update_bp)
 app.register_blueprint(cache_bp)
 
+BACKGROUND_SERVICES_LOCK_FILE = os.path.join(DATA_DIR, 'background_services.lock')
+_background_services_lock = None
+
+def acquire_background_services_lock():
+    """
+    获取后台服务的进程锁（非阻塞，进程退出时由系统释放）
+
+    gunicorn等多进程部署中每个工作进程都会导入应用，只有拿到锁的进程运行后台服务
+
+    Returns:
+        bool: 本进程是否持有锁
+    """
+    global _background_services_lock
+    if _background_services_lock is not None:
+        return True
+    lock_file = open(BACKGROUND_SERVICES_LOCK_FILE, 'a+')
+    try:
+        try:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return False
+    _background_services_lock = lock_file
+    return True
+
+def start_background_services():
+    """启动哔哩哔哩推送和定时刷新（按性能设置，重复调用不会重复启动）"""
+    # 调试模式下重载器的父进程只负责监视文件变化，后台服务只在实际运行应用的子进程中启动
+    reloader_parent = (__name__ == '__main__' or get_debug_flag()) and not is_running_from_reloader()
+    if reloader_parent:
+        return
+    # 多进程部署时只在一个进程中启动，避免重复轮询和重复的推送连接
+    if not acquire_background_services_lock():
+        print("后台服务已在其他进程中运行，本进程不启动")
+        return
+    start_push_ingest()
+    start_refresh_scheduler()
+
+# 导入应用时即启动（flask run、gunicorn等方式同样适用）
+start_background_services()
+
 @app.route('/')
 def index():
     # 如果用户已登录，显示主页面
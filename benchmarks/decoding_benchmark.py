@@ -0,0 +1,116 @@
+"""
+页面解码基准测试
+比较 response.text（响应头缺少charset时requests对整个页面做编码探测）与
+tools/page_decoding.py 的字节解码策略（声明的charset → <meta> charset → UTF-8）的每页CPU耗时，
+并用cProfile列出两种方式的主要耗时函数
+
+用法（在项目根目录执行）：
+    python -m benchmarks.decoding_benchmark                  # 使用已录制的页面（见extraction_benchmark --record）
+    python -m benchmarks.decoding_benchmark --rounds 20
+    python -m benchmarks.decoding_benchmark --content-type "text/html; charset=utf-8"
+
+没有录制页面时使用合成页面，结果只能作为参考
+"""
+
+import os
+import sys
+import glob
+import time
+import pstats
+import random
+import cProfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from tools.page_decoding import decode_page
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def synthetic_page(seed, size=600000):
+    """生成带中文内容、开头有<meta charset>的合成页面"""
+    rng = random.Random(seed)
+    words = ['直播间', '主播', '正在直播', '英雄联盟', '王者荣耀', '弹幕', '礼物', '关注', 'hot', 'room']
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>合成页面</title></head><body>']
+    length = 0
+    while length < size:
+        line = f'<div class="item-{rng.randint(0, 9999)}">{"".join(rng.choice(words) for _ in range(20))}</div>\n'
+        parts.append(line)
+        length += len(line.encode('utf-8'))
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+def load_pages():
+    """读取录制的斗鱼、虎牙页面，没有时使用合成页面"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+
+    if not pages:
+        print("没有录制页面，使用合成页面（可用 extraction_benchmark --record 录制真实页面）")
+        pages = [synthetic_page(seed) for seed in range(3)]
+    return pages
+
+def build_response(content, content_type):
+    """构造与requests收到该页面时相同的Response对象"""
+    response = Response()
+    response.status_code = 200
+    response._content = content
+    response.headers = CaseInsensitiveDict({'Content-Type': content_type} if content_type else {})
+    response.encoding = get_encoding_from_headers(response.headers)
+    return response
+
+def legacy_decode(content, content_type):
+    """原来的方式：response.text"""
+    return build_response(content, content_type).text
+
+def policy_decode(content, content_type):
+    """字节解码策略"""
+    response = build_response(content, content_type)
+    return decode_page(response.content, response.headers.get('Content-Type'))
+
+def profile(name, decode, pages, content_type, rounds):
+    """在cProfile下运行，返回每页CPU耗时（毫秒）并打印主要耗时函数"""
+    profiler = cProfile.Profile()
+    cpu_start = time.process_time()
+    profiler.enable()
+    for _ in range(rounds):
+        for content in pages:
+            decode(content, content_type)
+    profiler.disable()
+    per_page = (time.process_time() - cpu_start) / (rounds * len(pages)) * 1000
+
+    print(f"\n== {name}: 每页CPU {per_page:.3f} ms")
+    stats = pstats.Stats(profiler, stream=sys.stdout)
+    stats.strip_dirs().sort_stats('tottime').print_stats(5)
+    return per_page
+
+def run(rounds, content_type):
+    pages = load_pages()
+    total_bytes = sum(len(content) for content in pages)
+    print(f"页面数: {len(pages)}，平均大小: {total_bytes // len(pages)} 字节，"
+          f"Content-Type: {content_type or '(缺失)'}，轮数: {rounds}")
+
+    mismatched = sum(1 for content in pages if legacy_decode(content, content_type) != policy_decode(content, content_type))
+    if mismatched:
+        # text/html且未声明charset时requests按ISO-8859-1解码，中文会变成乱码
+        print(f"注意: {mismatched}个页面的response.text与UTF-8解码结果不同（response.text编码判断有误）")
+
+    legacy = profile('response.text', legacy_decode, pages, content_type, rounds)
+    policy = profile('decode_page', policy_decode, pages, content_type, rounds)
+    print(f"每页节省CPU: {legacy - policy:.3f} ms，加速比: {legacy / policy:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='页面解码基准测试')
+    parser.add_argument('--rounds', type=int, default=5, help='每种实现的重复轮数')
+    parser.add_argument('--content-type', default='', help='模拟的响应头Content-Type，默认缺失')
+    args = parser.parse_args()
+    run(args.rounds, args.content_type)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+斗鱼页面字段提取基准测试
+比较声明式提取器（tools/extractor.py）与原来逐字段re.search的解析耗时
+
+用法（在项目根目录执行）：
+    python -m benchmarks.extraction_benchmark --record 9999 288016   # 录制直播间页面
+    python -m benchmarks.extraction_benchmark                        # 使用已录制的页面测试
+    python -m benchmarks.extraction_benchmark --rounds 500
+
+没有录制页面时使用合成页面，结果只能作为参考
+"""
+
+import os
+import re
+import sys
+import glob
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import http_client
+from tools.douyu_checker import DouyuChecker
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def legacy_parse_live_status(html_content):
+    """原来的直播状态解析：每种写法单独搜索整个页面"""
+    status_patterns = [
+        r'\$ROOM\.show_status\s*=\s*(\d+)',
+        r'show_status[=:]\s*(\d+)',
+        r'"show_status":\s*(\d+)'
+    ]
+
+    for pattern in status_patterns:
+        match = re.search(pattern, html_content)
+        if match:
+            status_code = int(match.group(1))
+            return status_code == 1, status_code
+
+    if '"online"' in html_content and '"room_status"' in html_content:
+        status_match = re.search(r'"room_status":\s*(\d+)', html_content)
+        if status_match:
+            status_code = int(status_match.group(1))
+            return status_code == 1, status_code
+
+    raise ValueError("无法从页面获取直播状态")
+
+def legacy_parse_room_info(text, room_id):
+    """原来的直播间信息解析：每个字段、每种写法单独搜索整个页面"""
+    title_match = re.search(r'<h3 class="Title-header[^>]*>([^<]+)</h3>', text)
+    title = title_match.group(1).strip() if title_match else "未知"
+
+    name_match = re.search(r'<h2 class="Title-anchorNameH2[^>]*>([^<]+)</h2>', text)
+    anchor_name = name_match.group(1).strip() if name_match else "未知"
+
+    avatar_url = ""
+    for pattern in [
+        r'\$ROOM\.owner_avatar\s*=\s*["\']([^"\']+)["\']',
+        r'owner_avatar["\']:\s*["\']([^"\']+)["\']',
+        r'"owner_avatar":"([^"]+)"'
+    ]:
+        match = re.search(pattern, text)
+        if match:
+            avatar_url = DouyuChecker.clean_url(match.group(1))
+            break
+
+    cover_url = ""
+    for pattern in [
+        r'\$ROOM\.coverSrc\s*=\s*["\']([^"\']+)["\']',
+        r'coverSrc["\']:\s*["\']([^"\']+)["\']',
+        r'"coverSrc":"([^"]+)"'
+    ]:
+        match = re.search(pattern, text)
+        if match:
+            cover_url = DouyuChecker.clean_url(match.group(1))
+            break
+
+    hot_match = re.search(r'"hot":"([^"]+)"', text)
+    hot_value = hot_match.group(1) if hot_match else "0"
+
+    return {
+        'platform': DouyuChecker.PLATFORM_NAME,
+        'title': title,
+        'anchor': anchor_name,
+        'url': f'{DouyuChecker.BASE_URL}/{room_id}',
+        'avatar': avatar_url,
+        'cover': cover_url,
+        'popular_num': hot_value
+    }
+
+def legacy_snapshot(html, room_id):
+    is_live, status_info = legacy_parse_live_status(html)
+    room_info = legacy_parse_room_info(html, room_id)
+    room_info['is_live'] = is_live
+    room_info['status_info'] = status_info
+    match = re.search(r'\$ROOM\.room_id\s*=\s*(\d+)', html)
+    if match:
+        room_info['resolved_room_id'] = match.group(1)
+    return room_info
+
+def record_pages(room_ids):
+    """下载直播间完整页面保存到pages目录"""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for room_id in room_ids:
+        request_spec = DouyuChecker.build_room_request(room_id)
+        response = http_client.get(
+            DouyuChecker.PLATFORM_KEY,
+            request_spec['url'],
+            headers=request_spec.get('headers'),
+            default_headers=DouyuChecker.DEFAULT_HEADERS
+        )
+        response.raise_for_status()
+        path = os.path.join(PAGES_DIR, f'douyu_{room_id}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"已录制 {path}（{len(response.text)} 字符）")
+
+def synthetic_page(room_id, size=300000):
+    """生成带有斗鱼页面关键字段的合成页面"""
+    rng = random.Random(room_id)
+    words = ['div', 'span', 'script', 'room', 'owner', 'cover', 'show', 'status', 'hot', 'data']
+    filler = []
+    while sum(len(line) for line in filler) < size:
+        tag = rng.choice(words)
+        filler.append(f'<{tag} class="{rng.choice(words)}-{rng.randint(0, 999)}">{rng.choice(words)} {rng.randint(0, 99999)}</{tag}>\n')
+    middle = len(filler) // 2
+    fields = (
+        f'<h3 class="Title-header x">标题{room_id}</h3><h2 class="Title-anchorNameH2 y">主播{room_id}</h2>\n'
+        f'<script>$ROOM.room_id = {room_id}; $ROOM.show_status = 1; '
+        f'$ROOM.owner_avatar = "https:\\/\\/apic.douyucdn.cn\\/{room_id}.png"; '
+        f'$ROOM.coverSrc = "https:\\/\\/rpic.douyucdn.cn\\/{room_id}.jpg"; var info = {{"hot":"12345"}};</script>\n'
+    )
+    return ''.join(filler[:middle]) + fields + ''.join(filler[middle:])
+
+def load_pages():
+    """读取录制的页面，没有时使用合成页面"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, 'douyu_*.html'))):
+        room_id = os.path.basename(path)[len('douyu_'):-len('.html')]
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((room_id, f.read()))
+
+    if not pages:
+        print("没有录制页面，使用合成页面（可用 --record 录制真实页面）")
+        pages = [(str(room_id), synthetic_page(room_id)) for room_id in (9999, 288016, 74751)]
+    return pages
+
+def run(rounds):
+    pages = load_pages()
+    total_chars = sum(len(html) for _, html in pages)
+    print(f"页面数: {len(pages)}，平均大小: {total_chars // len(pages)} 字符，轮数: {rounds}")
+
+    # 两种实现的结果必须一致
+    for room_id, html in pages:
+        expected = legacy_snapshot(html, room_id)
+        actual = DouyuChecker.parse_snapshot(html, room_id)
+        if expected != actual:
+            print(f"结果不一致 {room_id}:\n  逐字段: {expected}\n  提取器: {actual}")
+            sys.exit(1)
+
+    results = {}
+    for name, parse in (('逐字段re.search', legacy_snapshot), ('声明式提取器', DouyuChecker.parse_snapshot)):
+        seconds = timeit.timeit(lambda: [parse(html, room_id) for room_id, html in pages], number=rounds)
+        per_page = seconds / (rounds * len(pages)) * 1000
+        results[name] = per_page
+        print(f"{name:<16} 每页 {per_page:.3f} ms")
+
+    legacy, engine = results.values()
+    print(f"加速比: {legacy / engine:.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='斗鱼页面字段提取基准测试')
+    parser.add_argument('--record', nargs='+', metavar='ROOM_ID', help='录制指定直播间的页面后退出')
+    parser.add_argument('--rounds', type=int, default=200, help='每种实现的重复轮数')
+    args = parser.parse_args()
+
+    if args.record:
+        record_pages(args.record)
+        return
+    run(args.rounds)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+虎牙内嵌JSON提取基准测试
+比较JsonIsland（子串定位 + raw_decode只解码一个值）与原来的
+惰性DOTALL正则 + json.loads在大页面上的耗时
+
+用法（在项目根目录执行）：
+    python -m benchmarks.json_island_benchmark --record 11342412 660000   # 录制直播间页面
+    python -m benchmarks.json_island_benchmark                           # 使用已录制的页面测试
+    python -m benchmarks.json_island_benchmark --rounds 500
+
+没有录制页面时使用合成的大页面，结果只能作为参考
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import http_client
+from tools.huya_checker import HuyaChecker
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def legacy_islands(html_content):
+    """原来的提取方式：惰性DOTALL正则截取到第一个 }; 再整体json.loads"""
+    islands = {}
+    for name, variable in (('room_data', 'TT_ROOM_DATA'), ('profile', 'TT_PROFILE_INFO')):
+        match = re.search(rf'var\s+{variable}\s*=\s*(\{{.*?\}});', html_content, re.DOTALL)
+        try:
+            islands[name] = json.loads(match.group(1)) if match else None
+        except json.JSONDecodeError:
+            islands[name] = None
+    return islands
+
+def island_extract(html_content):
+    """JsonIsland提取，与legacy_islands返回相同结构"""
+    fields = HuyaChecker.extract_fields(html_content)
+    return {'room_data': fields['room_data'], 'profile': fields['profile']}
+
+def record_pages(room_ids):
+    """下载直播间完整页面保存到pages目录"""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for room_id in room_ids:
+        request_spec = HuyaChecker.build_room_request(room_id)
+        response = http_client.get(
+            HuyaChecker.PLATFORM_KEY,
+            request_spec['url'],
+            headers=request_spec.get('headers'),
+            default_headers=HuyaChecker.DEFAULT_HEADERS
+        )
+        response.raise_for_status()
+        path = os.path.join(PAGES_DIR, f'huya_{room_id}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"已录制 {path}（{len(response.text)} 字符）")
+
+def synthetic_page(room_id, size=500000):
+    """生成内嵌大块JSON、脚本中有大量var声明的合成页面"""
+    rng = random.Random(room_id)
+    scripts = []
+    while sum(len(script) for script in scripts) < size:
+        scripts.append(f'<script>var v{rng.randint(0, 99999)} = {{"k": "{"x" * rng.randint(10, 200)}"}};</script>\n')
+
+    room_data = {
+        'state': 'ON',
+        'introduction': f'标题{room_id}',
+        'screenshot': f'//live-cover.msstatic.com/{room_id}.jpg',
+        'totalCount': 123456,
+        'gameList': [{'gid': i, 'name': f'game{i}', 'tags': list(range(20))} for i in range(300)]
+    }
+    profile_info = {'nick': f'主播{room_id}', 'avatar': f'//huyaimg.msstatic.com/{room_id}.png', 'profileRoom': room_id}
+    islands = (
+        f'<script>var TT_ROOM_DATA = {json.dumps(room_data, ensure_ascii=False)};\n'
+        f'var TT_PROFILE_INFO = {json.dumps(profile_info, ensure_ascii=False)};</script>\n'
+    )
+    middle = len(scripts) * 3 // 4
+    return ''.join(scripts[:middle]) + islands + ''.join(scripts[middle:])
+
+def load_pages():
+    """读取录制的页面，没有时使用合成页面"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, 'huya_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+
+    if not pages:
+        print("没有录制页面，使用合成页面（可用 --record 录制真实页面）")
+        pages = [synthetic_page(room_id) for room_id in (11342412, 660000, 880201)]
+    return pages
+
+def run(rounds):
+    pages = load_pages()
+    total_chars = sum(len(html) for html in pages)
+    print(f"页面数: {len(pages)}，平均大小: {total_chars // len(pages)} 字符，轮数: {rounds}")
+
+    # 两种实现在用到的键上结果必须一致
+    for html in pages:
+        expected = legacy_islands(html)
+        actual = island_extract(html)
+        for name, island in HuyaChecker.PAGE_EXTRACTOR.fields.items():
+            if name not in actual:
+                continue
+            legacy_value = expected[name]
+            if legacy_value is not None:
+                legacy_value = {key: legacy_value[key] for key in island.keys if key in legacy_value}
+            if legacy_value != actual[name]:
+                print(f"结果不一致 {name}:\n  正则: {legacy_value}\n  raw_decode: {actual[name]}")
+                sys.exit(1)
+
+    results = {}
+    for name, extract in (('正则 + json.loads', legacy_islands), ('JsonIsland', island_extract)):
+        seconds = timeit.timeit(lambda: [extract(html) for html in pages], number=rounds)
+        per_page = seconds / (rounds * len(pages)) * 1000
+        results[name] = per_page
+        print(f"{name:<18} 每页 {per_page:.3f} ms")
+
+    legacy, island = results.values()
+    print(f"加速比: {legacy / island:.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='虎牙内嵌JSON提取基准测试')
+    parser.add_argument('--record', nargs='+', metavar='ROOM_ID', help='录制指定直播间的页面后退出')
+    parser.add_argument('--rounds', type=int, default=100, help='每种实现的重复轮数')
+    args = parser.parse_args()
+
+    if args.record:
+        record_pages(args.record)
+        return
+    run(args.rounds)
+
+if __name__ == '__main__':
+    main()
@@ -150,5 +150,55 @@ def admin_update_config():
             'message': '配置更新成功',
             'config': admin_config
         })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@admin_bp.route('/admin/refresh_usage')
+@admin_required
+def admin_refresh_usage():
+    """获取各用户的直播间刷新用量"""
+    try:
+        from tools.refresh_queue import get_refresh_usage
+        return jsonify({
+            'success': True,
+            'users': get_refresh_usage()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@admin_bp.route('/admin/network_stats')
+@admin_required
+def admin_network_stats():
+    """获取出站网络层的运行统计"""
+    try:
+        from tools.http_client import get_session_stats
+        from tools.rate_limiter import get_rate_limit_stats
+        from tools.room_refresher import snapshot_flight
+        from tools.circuit_breaker import get_breaker_stats
+        from tools.latency_tracker import get_latency_stats
+        from tools.retry_policy import get_retry_stats
+        from tools.identity_pool import get_identity_pool_stats
+        from tools.fetch_tiers import get_tier_stats
+        from tools.egress_pool import get_egress_stats
+        from tools.bilibili_push import get_push_stats
+        from tools.refresh_scheduler import get_scheduler_stats
+        from tools.refresh_queue import get_refresh_queue_stats
+        from tools.traffic_meter import get_traffic_stats
+        return jsonify({
+            'success': True,
+            'http_sessions': get_session_stats(),
+            'rate_limits': get_rate_limit_stats(),
+            'circuit_breakers': get_breaker_stats(),
+            'latency': get_latency_stats(),
+            'retries': get_retry_stats(),
+            'identity_pools': get_identity_pool_stats(),
+            'fetch_tiers': get_tier_stats(),
+            'egress': get_egress_stats(),
+            'bilibili_push': get_push_stats(),
+            'scheduler': get_scheduler_stats(),
+            'refresh_queue': get_refresh_queue_stats(),
+            'traffic': get_traffic_stats(),
+            'single_flight': snapshot_flight.get_stats()
+        })
     except Exception as e:
         return jsonify({'error': str(e)})
\ No newline at end of file
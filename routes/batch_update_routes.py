@@ -1,19 +1,18 @@
 from flask import Blueprint, request, jsonify, session
-from tools.platform_factory import PlatformFactory
 from tools.data_handler import (
     load_saved_rooms
 )
-from tools.cache_manager import (
-    load_cached_data, save_cached_data
-)
 from tools.group_manager import (
     update_room_groups
 )
 from tools.config_manager import (
-    load_douyin_config
+    load_douyin_config, load_performance_settings, get_douyin_api_bases
+)
+from tools.room_refresher import (
+    refresh_room_queued, refresh_rooms, serve_pushed_room
 )
-from tools.utils import (
-    check_data_changes, merge_room_data
+from tools.refresh_queue import (
+    PRIORITY_INTERACTIVE, room_priority
 )
 
 # 创建蓝图
@@ -35,83 +34,26 @@ def batch_update_rooms():
                 'changed_rooms': []
             })
         
-        updated_rooms = []
-        changed_rooms = []
-        failed_rooms = []
-        
         # 获取抖音API配置
         douyin_config = load_douyin_config(user_id)
-        douyin_api_url_base = douyin_config.get('api_url', 'https://douyin.wtf')
+        douyin_api_url_base = get_douyin_api_bases(douyin_config)
+        
+        # 并发模式和时间预算可由请求参数覆盖，默认使用性能设置
+        data = request.get_json(silent=True) or {}
+        concurrent = data.get('concurrent')
+        deadline = data.get('deadline', load_performance_settings()['batch_refresh'].get('deadline'))
+        
+        updated_rooms, changed_rooms, failed_rooms = refresh_rooms(
+            urls, user_id, douyin_api_url_base, concurrent=concurrent, deadline=deadline
+        )
         
-        # 逐个更新房间信息
-        for url in urls:
-            try:
-                # 获取平台检测器
-                checker_class = PlatformFactory.get_platform_checker(url)
-                
-                # 提取房间ID
-                room_id = checker_class.extract_room_id(url)
-                
-                # 获取抖音API配置（如果是抖音平台）
-                douyin_api_url = None
-                if checker_class.__name__ == 'DouyinChecker':
-                    douyin_api_url = douyin_api_url_base + '/api/douyin/web/fetch_user_live_videos'
-                
-                # 获取房间信息
-                if douyin_api_url:
-                    room_info = checker_class.get_room_info(room_id, douyin_api_url)
-                else:
-                    room_info = checker_class.get_room_info(room_id)
-                
-                # 检查直播状态
-                if douyin_api_url:
-                    is_live, status_info = checker_class.check_live_status(room_id, douyin_api_url)
-                else:
-                    is_live, status_info = checker_class.check_live_status(room_id)
-                
-                platform = PlatformFactory.detect_platform_from_url(url)
-                
-                result = {
-                    'success': True,
-                    'platform': platform,
-                    'room_id': room_id,
-                    'anchor': room_info['anchor'],
-                    'title': room_info['title'],
-                    'url': room_info['url'],
-                    'is_live': is_live,
-                    'status_info': str(status_info),
-                    'avatar': room_info['avatar'],
-                    'cover': room_info['cover'],
-                    'popular_num': room_info.get('popular_num', 0),
-                    'from_cache': False
-                }
-                
-                # 如果有fetch_status字段，添加到result中
-                if 'fetch_status' in room_info:
-                    result['fetch_status'] = room_info['fetch_status']
-                
-                # 合并数据，保留有效原有数据
-                cached_data = load_cached_data(url, user_id)
-                merged_result = merge_room_data(cached_data, result)
-                
-                # 检查数据是否发生变化
-                if check_data_changes(cached_data, merged_result):
-                    changed_rooms.append(merged_result)
-                
-                # 保存到缓存
-                save_cached_data(url, merged_result, user_id)
-                updated_rooms.append(merged_result)
-                
-            except Exception as e:
-                print(f"更新直播间失败 {url}: {e}")
-                failed_rooms.append({
-                    'url': url,
-                    'error': str(e)
-                })
+        # 是否有直播间因超出时间预算而返回缓存数据或失败
+        deadline_exceeded = any(room.get('deadline_exceeded') for room in updated_rooms + failed_rooms)
         
         return jsonify({
             'success': True,
             'message': f'更新完成，成功{len(updated_rooms)}个，失败{len(failed_rooms)}个',
+            'deadline_exceeded': deadline_exceeded,
             'updated_rooms': updated_rooms,
             'changed_rooms': changed_rooms,
             'failed_rooms': failed_rooms
@@ -131,65 +73,27 @@ def incremental_update_room():
         if not room_url:
             return jsonify({'error': '缺少房间URL参数'})
         
-        # 获取平台检测器
-        checker_class = PlatformFactory.get_platform_checker(room_url)
-        
-        # 提取房间ID
-        room_id = checker_class.extract_room_id(room_url)
-        
-        # 获取抖音API配置（如果是抖音平台）
-        douyin_api_url = None
-        if checker_class.__name__ == 'DouyinChecker':
-            douyin_config = load_douyin_config(user_id)
-            douyin_api_url = douyin_config.get('api_url', 'https://douyin.wtf') + '/api/douyin/web/fetch_user_live_videos'
-        
-        # 获取房间信息
-        if douyin_api_url:
-            room_info = checker_class.get_room_info(room_id, douyin_api_url)
-        else:
-            room_info = checker_class.get_room_info(room_id)
+        # 获取抖音API配置
+        douyin_config = load_douyin_config(user_id)
+        douyin_api_url_base = get_douyin_api_bases(douyin_config)
         
-        # 检查直播状态
-        if douyin_api_url:
-            is_live, status_info = checker_class.check_live_status(room_id, douyin_api_url)
+        # 定时刷新（background）时，推送连接覆盖的直播间只按对账间隔轮询
+        pushed = serve_pushed_room(room_url, user_id) if data.get('background') else None
+        if pushed is not None:
+            merged_result, has_changes = pushed
         else:
-            is_live, status_info = checker_class.check_live_status(room_id)
-        
-        platform = PlatformFactory.detect_platform_from_url(room_url)
-        
-        result = {
-            'success': True,
-            'platform': platform,
-            'room_id': room_id,
-            'anchor': room_info['anchor'],
-            'title': room_info['title'],
-            'url': room_info['url'],
-            'is_live': is_live,
-            'status_info': str(status_info),
-            'avatar': room_info['avatar'],
-            'cover': room_info['cover'],
-            'popular_num': room_info.get('popular_num', 0),
-            'from_cache': False
-        }
-        
-        # 如果有fetch_status字段，添加到result中
-        if 'fetch_status' in room_info:
-            result['fetch_status'] = room_info['fetch_status']
-        
-        # 合并数据，保留有效原有数据
-        cached_data = load_cached_data(room_url, user_id)
-        merged_result = merge_room_data(cached_data, result)
-        
-        # 检查数据是否发生变化
-        has_changes = check_data_changes(cached_data, merged_result)
-        
-        # 保存到缓存
-        save_cached_data(room_url, merged_result, user_id)
+            deadline = data.get('deadline', load_performance_settings()['batch_refresh'].get('incremental_deadline'))
+            # 用户手动刷新排在刷新队列最前
+            priority = room_priority(room_url, user_id) if data.get('background') else PRIORITY_INTERACTIVE
+            merged_result, has_changes = refresh_room_queued(
+                room_url, user_id, douyin_api_url_base, priority, deadline=deadline
+            )
         
         return jsonify({
             'success': True,
             'room_data': merged_result,
-            'has_changes': has_changes
+            'has_changes': has_changes,
+            'deadline_exceeded': bool(merged_result.get('deadline_exceeded'))
         })
         
     except Exception as e:
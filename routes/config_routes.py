@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify, session
+import re
 from tools.config_manager import (
-    load_douyin_config, save_douyin_config, 
+    load_douyin_config, save_douyin_config, get_douyin_api_bases,
     load_refresh_settings, save_refresh_settings
 )
+from tools.room_refresher import DOUYIN_API_PATH
+from tools.endpoint_balancer import get_endpoint_stats
+from tools.refresh_scheduler import is_scheduler_running
 
 # 创建蓝图
 config_bp = Blueprint('config', __name__)
@@ -13,9 +17,19 @@ def get_douyin_config_route():
     try:
         user_id = session.get('user_id', 'admin')
         config = load_douyin_config(user_id)
+
+        # 各API地址的延迟、错误率和摘除状态（只有被请求过的地址才有统计）
+        api_bases = get_douyin_api_bases(config)
+        stats = get_endpoint_stats([base + DOUYIN_API_PATH for base in api_bases])
+        endpoints = [
+            dict(stats.get(base + DOUYIN_API_PATH, {}), url=base)
+            for base in api_bases
+        ]
+
         return jsonify({
             'success': True,
-            'config': config
+            'config': config,
+            'endpoints': endpoints
         })
     except Exception as e:
         return jsonify({'error': str(e)})
@@ -25,13 +39,19 @@ def save_douyin_config_endpoint():
     """保存抖音API配置"""
     try:
         data = request.get_json()
-        api_url = data.get('api_url', '').strip()
+
+        # 支持api_urls列表，或api_url中用逗号、空白分隔的多个地址
+        api_urls = data.get('api_urls')
+        if not isinstance(api_urls, list):
+            api_urls = re.split(r'[\s,，]+', data.get('api_url', ''))
+        api_urls = [str(url).strip().rstrip('/') for url in api_urls if str(url).strip()]
         
-        if not api_url:
+        if not api_urls:
             return jsonify({'error': 'API地址不能为空'})
         
         config = {
-            'api_url': api_url
+            'api_url': api_urls[0],
+            'api_urls': list(dict.fromkeys(api_urls))
         }
         
         user_id = session.get('user_id', 'admin')
@@ -52,7 +72,8 @@ def get_refresh_settings():
         settings = load_refresh_settings(user_id)
         return jsonify({
             'success': True,
-            'settings': settings
+            'settings': settings,
+            'server_refresh': is_scheduler_running()
         })
     except Exception as e:
         return jsonify({'error': str(e)})
@@ -7,7 +7,13 @@ from tools.cache_manager import (
     load_cached_data, save_cached_data
 )
 from tools.config_manager import (
-    load_douyin_config
+    load_douyin_config, get_douyin_api_bases
+)
+from tools.room_refresher import (
+    fetch_room
+)
+from tools.room_id_cache import (
+    resolve_room_id
 )
 
 # 创建蓝图
@@ -27,8 +33,8 @@ def manage_room():
         # 获取平台检测器
         checker_class = PlatformFactory.get_platform_checker(room_input)
         
-        # 提取房间ID
-        room_id = checker_class.extract_room_id(room_input)
+        # 提取房间ID（优先使用房间号解析缓存）
+        room_id = resolve_room_id(checker_class, room_input)
         
         # 构建标准URL
         base_url = getattr(checker_class, 'BASE_URL', 'https://unknown.com')
@@ -80,43 +86,12 @@ def get_room_info_route():
         # 获取平台检测器
         checker_class = PlatformFactory.get_platform_checker(url)
         
-        # 提取房间ID
-        room_id = checker_class.extract_room_id(url)
-        
-        # 获取抖音API配置（如果是抖音平台）
-        douyin_api_url = None
-        if checker_class.__name__ == 'DouyinChecker':
-            douyin_config = load_douyin_config(user_id)
-            douyin_api_url = douyin_config.get('api_url', 'https://douyin.wtf') + '/api/douyin/web/fetch_user_live_videos'
-        
-        # 获取房间信息
-        if douyin_api_url:
-            room_info = checker_class.get_room_info(room_id, douyin_api_url)
-        else:
-            room_info = checker_class.get_room_info(room_id)
-        
-        # 检查直播状态
-        if douyin_api_url:
-            is_live, status_info = checker_class.check_live_status(room_id, douyin_api_url)
-        else:
-            is_live, status_info = checker_class.check_live_status(room_id)
-        
-        platform = PlatformFactory.detect_platform_from_url(url)
+        # 获取抖音API配置
+        douyin_config = load_douyin_config(user_id)
+        douyin_api_url_base = get_douyin_api_bases(douyin_config)
         
-        result = {
-            'success': True,
-            'platform': platform,
-            'room_id': room_id,
-            'anchor': room_info['anchor'],
-            'title': room_info['title'],
-            'url': room_info['url'],
-            'is_live': is_live,
-            'status_info': str(status_info),
-            'avatar': room_info['avatar'],
-            'cover': room_info['cover'],
-            'popular_num': room_info.get('popular_num', 0),
-            'from_cache': False
-        }
+        # 一次请求同时获取直播状态和房间信息
+        result = fetch_room(url, checker_class, douyin_api_url_base)
         
         # 保存到缓存
         save_cached_data(url, result, user_id)
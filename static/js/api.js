@@ -33,7 +33,7 @@ class APIManager {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ room_url: roomUrl })
+            body: JSON.stringify({ room_url: roomUrl, background: background })
         });
     }
     
@@ -114,7 +114,7 @@ class APIManager {
         });
     }
     
-    static async incrementalUpdateRoom(roomUrl) {
+    static async incrementalUpdateRoom(roomUrl, background = false) {
         return await this.fetchWithErrorHandling('/incremental_update_room', {
             method: 'POST',
             headers: {
@@ -4,6 +4,8 @@ class TimerService {
         this.timerId = null;
         this.isRunning = false;
         this.updateInterval = 600000; // 默认600秒(10分钟)更新一次
+        this.cachePollInterval = 60000; // 读取服务端缓存的最长间隔，及时显示推送和服务端刷新的结果
+        this.serverRefresh = false; // 服务端定时刷新是否在运行，未运行时由浏览器发起增量更新
         this.lastUpdateTime = 0;
         this.updateListeners = [];
     }
@@ -15,6 +17,7 @@ class TimerService {
             if (response.success) {
                 // 将分钟转换为毫秒
                 this.updateInterval = response.settings.refresh_interval * 60 * 1000;
+                this.serverRefresh = !!response.server_refresh;
                 console.log("已加载刷新频率设置:", response.settings.refresh_interval, "分钟");
                 
                 // 如果服务正在运行，重新启动以应用新的间隔
@@ -49,7 +52,7 @@ class TimerService {
         // 设置定时器
         this.timerId = setInterval(() => {
             this.updateAllRooms();
-        }, this.updateInterval);
+        }, this.serverRefresh ? Math.min(this.updateInterval, this.cachePollInterval) : this.updateInterval);
 
         this.isRunning = true;
         this.lastUpdateTime = Date.now();
@@ -127,72 +130,44 @@ class TimerService {
         }
         
         try {
-            console.log("开始后台增量更新直播间信息...");
-            
-            // 首先获取需要更新的房间列表
-            const response = await APIManager.incrementalUpdateAll();
-            if (!response) {
-                console.error("获取房间列表失败: 响应为空");
-                return;
-            }
-            
-            if (!response.success) {
-                console.error("获取房间列表失败:", response.error);
+            if (!this.serverRefresh) {
+                await this.incrementalUpdateAll();
                 return;
             }
             
-            // 检查是否没有需要更新的直播间
-            if (response.message && response.message.includes('没有需要更新的直播间')) {
-                console.log("没有需要更新的直播间");
+            // 直播间由服务端定时刷新，这里只读取服务端缓存
+            const response = await APIManager.loadCachedRooms();
+            if (!response || !response.success) {
+                console.error("读取服务端缓存失败:", response && response.error);
                 return;
             }
             
-            const roomsToUpdate = response.rooms_to_update || [];
-            if (!Array.isArray(roomsToUpdate)) {
-                console.error("rooms_to_update 数据格式错误:", roomsToUpdate);
-                return;
-            }
-            console.log("需要更新", roomsToUpdate.length, "个直播间");
-            
-            // 逐个更新房间信息
+            const currentRooms = new Map(stateManager.getRooms().map(room => [room.url, room]));
             let updatedCount = 0;
-            let changedCount = 0;
             const changedRooms = [];
             
-            for (const roomUrl of roomsToUpdate) {
-                try {
-                    const updateResponse = await APIManager.incrementalUpdateRoom(roomUrl);
-                    if (updateResponse.success) {
-                        updatedCount++;
-                        
-                        // 更新状态管理器中的数据
-                        stateManager.updateRoom(updateResponse.room_data);
-                        
-                        // 更新UI显示
-                        roomRenderer.updateRoomCard(updateResponse.room_data);
-                        
-                        // 如果有变化，收集变化的房间
-                        if (updateResponse.has_changes) {
-                            changedCount++;
-                            changedRooms.push(updateResponse.room_data);
-                        }
-                        
-                        console.log("已更新直播间:", updateResponse.room_data.anchor);
-                    }
-                } catch (error) {
-                    console.error("更新直播间失败:", roomUrl, error);
+            for (const room of response.rooms || []) {
+                const current = currentRooms.get(room.url);
+                updatedCount++;
+                
+                // 与页面上的数据比较，只重新渲染有变化的直播间
+                if (current && !this.hasRoomChanged(current, room)) {
+                    continue;
                 }
                 
-                // 添加小延迟避免请求过于频繁
-                await new Promise(resolve => setTimeout(resolve, 100));
+                stateManager.updateRoom(room);
+                roomRenderer.updateRoomCard(room);
+                if (current) {
+                    changedRooms.push(room);
+                }
             }
             
-            console.log(`后台更新完成，共更新${updatedCount}个直播间，${changedCount}个有变化`);
+            console.log(`已读取服务端缓存，共${updatedCount}个直播间，${changedRooms.length}个有变化`);
             
             // 通知更新监听器
             this.notifyUpdate({
                 total: updatedCount,
-                changed: changedCount,
+                changed: changedRooms.length,
                 changedRooms: changedRooms
             });
             
@@ -211,6 +186,90 @@ class TimerService {
         }
     }
 
+    // 服务端定时刷新未运行时（未启用或未启动），由浏览器逐个请求增量更新
+    async incrementalUpdateAll() {
+        console.log("开始后台增量更新直播间信息...");
+        
+        // 首先获取需要更新的房间列表
+        const response = await APIManager.incrementalUpdateAll();
+        if (!response) {
+            console.error("获取房间列表失败: 响应为空");
+            return;
+        }
+        
+        if (!response.success) {
+            console.error("获取房间列表失败:", response.error);
+            return;
+        }
+        
+        // 检查是否没有需要更新的直播间
+        if (response.message && response.message.includes('没有需要更新的直播间')) {
+            console.log("没有需要更新的直播间");
+            return;
+        }
+        
+        const roomsToUpdate = response.rooms_to_update || [];
+        if (!Array.isArray(roomsToUpdate)) {
+            console.error("rooms_to_update 数据格式错误:", roomsToUpdate);
+            return;
+        }
+        console.log("需要更新", roomsToUpdate.length, "个直播间");
+        
+        // 逐个更新房间信息
+        let updatedCount = 0;
+        let changedCount = 0;
+        const changedRooms = [];
+        
+        for (const roomUrl of roomsToUpdate) {
+            try {
+                // 定时更新属于后台刷新：参与队列的公平分配和积压丢弃，推送覆盖的直播间按对账间隔轮询
+                const updateResponse = await APIManager.incrementalUpdateRoom(roomUrl, true);
+                if (updateResponse.success) {
+                    updatedCount++;
+                    
+                    // 更新状态管理器中的数据
+                    stateManager.updateRoom(updateResponse.room_data);
+                    
+                    // 更新UI显示
+                    roomRenderer.updateRoomCard(updateResponse.room_data);
+                    
+                    // 如果有变化，收集变化的房间
+                    if (updateResponse.has_changes) {
+                        changedCount++;
+                        changedRooms.push(updateResponse.room_data);
+                    }
+                    
+                    console.log("已更新直播间:", updateResponse.room_data.anchor);
+                }
+            } catch (error) {
+                console.error("更新直播间失败:", roomUrl, error);
+            }
+            
+            // 添加小延迟避免请求过于频繁
+            await new Promise(resolve => setTimeout(resolve, 100));
+        }
+        
+        console.log(`后台更新完成，共更新${updatedCount}个直播间，${changedCount}个有变化`);
+        
+        // 通知更新监听器
+        this.notifyUpdate({
+            total: updatedCount,
+            changed: changedCount,
+            changedRooms: changedRooms
+        });
+        
+        // 更新完成后保存缓存
+        CacheManager.saveToCache(stateManager.getRooms());
+        
+        this.lastUpdateTime = Date.now();
+    }
+
+    // 直播间数据是否有需要刷新显示的变化（直播状态、人气和卡片上显示的信息）
+    hasRoomChanged(oldRoom, newRoom) {
+        const fields = ['is_live', 'status_info', 'title', 'cover', 'avatar', 'anchor', 'popular_num'];
+        return fields.some(field => oldRoom[field] !== newRoom[field]);
+    }
+
     // 设置更新间隔（分钟）
     async setRefreshInterval(minutes) {
         // 验证输入
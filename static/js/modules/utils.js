@@ -157,9 +157,10 @@ class Utils {
             const response = await APIManager.getDouyinConfig();
             if (response.success) {
                 const config = response.config;
-                // 如果有配置，更新本地存储
-                if (config.api_url) {
-                    localStorage.setItem('douyin_api_url', config.api_url);
+                // 如果有配置，更新本地存储（多个地址用逗号分隔显示）
+                const apiUrls = config.api_urls || (config.api_url ? [config.api_url] : []);
+                if (apiUrls.length) {
+                    localStorage.setItem('douyin_api_url', apiUrls.join(', '));
                 }
             }
         } catch (error) {
@@ -0,0 +1,118 @@
+"""
+测试公共夹具
+数据目录和性能设置指向临时目录，各测试之间清空按平台/站点缓存的模块级注册表；
+stub_server提供本地HTTP桩服务，代替真实的平台接口
+"""
+
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import (  # noqa: E402
+    user_manager, config_manager, identity_pool, circuit_breaker, rate_limiter, egress_pool, fetch_tiers,
+    latency_tracker, traffic_meter, retry_policy
+)
+
+_REGISTRIES = (
+    identity_pool._pools,
+    circuit_breaker._breakers,
+    rate_limiter._limiters,
+    egress_pool._pools,
+    fetch_tiers._health,
+    latency_tracker._trackers,
+    traffic_meter._meters,
+    retry_policy._budgets
+)
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path, monkeypatch):
+    """用户数据、身份池和性能设置写到临时目录"""
+    users_dir = tmp_path / 'users'
+    users_dir.mkdir()
+    monkeypatch.setattr(user_manager, 'USERS_DIR', str(users_dir))
+    monkeypatch.setattr(user_manager, 'USERS_FILE', str(users_dir / 'users.json'))
+    monkeypatch.setattr(identity_pool, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(config_manager, 'PERFORMANCE_SETTINGS_FILE', str(tmp_path / 'performance_settings.json'))
+
+    for registry in _REGISTRIES:
+        registry.clear()
+    yield tmp_path
+    for registry in _REGISTRIES:
+        registry.clear()
+
+@pytest.fixture
+def performance_settings():
+    """写入性能设置覆盖项（与默认设置深度合并）"""
+    def write(overrides):
+        config_manager.save_performance_settings(overrides)
+    return write
+
+class StubServer:
+    """
+    本地HTTP桩服务
+
+    routes为 (方法, 路径) → handler(query, body)，handler返回 (状态码, JSON对象)；
+    收到的请求按顺序记录在requests中
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                query = parse_qs(parsed.query)
+                stub.requests.append((method, parsed.path, query, body))
+
+                handler = stub.routes.get((method, parsed.path))
+                status, payload = handler(query, body) if handler else (404, {'code': -404})
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def make_stub_server():
+    """创建本地HTTP桩服务，测试结束后关闭"""
+    servers = []
+    def make():
+        servers.append(StubServer())
+        return servers[-1]
+    yield make
+    for server in servers:
+        server.close()
+
+@pytest.fixture
+def stub_server(make_stub_server):
+    return make_stub_server()
@@ -0,0 +1,88 @@
+"""哔哩哔哩批量直播状态查询（对本地桩服务）"""
+
+import pytest
+
+from tools.bilibili_checker import BilibiliChecker
+from tools.circuit_breaker import CircuitOpenError, get_breaker
+
+ROOM_INFO_PATH = '/xlive/web-room/v1/index/getRoomBaseInfo'
+UIDS_PATH = '/room/v1/Room/get_status_info_by_uids'
+
+# 桩服务中的房间：短号1对应实际房间号21452505
+ROOMS = {
+    '21452505': {
+        'room_id': 21452505, 'short_id': 1, 'uid': 110, 'uname': '主播A',
+        'title': '直播中的房间', 'live_status': 1, 'online': 321, 'cover': 'cover-a'
+    },
+    '6': {
+        'room_id': 6, 'short_id': 0, 'uid': 120, 'uname': '主播B',
+        'title': '轮播房间', 'live_status': 2, 'online': 0, 'cover': 'cover-b'
+    }
+}
+
+def room_base_info(query, body):
+    """按房间号或短号查询，与真实接口一样按实际房间号返回"""
+    requested = query.get('room_ids', [])
+    by_room_ids = {
+        room_id: item for room_id, item in ROOMS.items()
+        if room_id in requested or str(item['short_id']) in requested
+    }
+    return 200, {'code': 0, 'data': {'by_room_ids': by_room_ids}}
+
+@pytest.fixture
+def bilibili_stub(stub_server, monkeypatch):
+    monkeypatch.setattr(BilibiliChecker, 'API_BASE_URL', stub_server.url)
+    stub_server.routes[('GET', ROOM_INFO_PATH)] = room_base_info
+    return stub_server
+
+def test_batch_maps_short_and_real_room_ids(bilibili_stub):
+    status_map = BilibiliChecker.batch_check_live_status(room_ids=['1', '6', '404'])
+
+    assert set(status_map) == {'1', '6'}
+    assert status_map['1']['resolved_room_id'] == '21452505'
+    assert status_map['1']['url'] == 'https://live.bilibili.com/1'
+    assert status_map['1']['is_live'] is True
+    assert status_map['1']['anchor'] == '主播A'
+    assert status_map['6']['is_live'] is False
+    assert status_map['6']['status_info'] == '轮播中'
+
+def test_short_and_real_id_in_same_chunk_both_resolve(bilibili_stub):
+    status_map = BilibiliChecker.batch_check_live_status(room_ids=['1', '21452505'])
+
+    assert status_map['1']['resolved_room_id'] == '21452505'
+    assert status_map['21452505']['resolved_room_id'] == '21452505'
+    assert len(bilibili_stub.requests) == 1
+
+def test_batch_is_chunked_and_failed_chunk_is_skipped(bilibili_stub):
+    def flaky(query, body):
+        if query['room_ids'] == ['6']:
+            return 200, {'code': -400, 'message': '参数错误'}
+        return room_base_info(query, body)
+    bilibili_stub.routes[('GET', ROOM_INFO_PATH)] = flaky
+
+    status_map = BilibiliChecker.batch_check_live_status(room_ids=['1', '6'], chunk_size=1)
+
+    assert [request[2]['room_ids'] for request in bilibili_stub.requests] == [['1'], ['6']]
+    assert set(status_map) == {'1'}
+
+def test_batch_by_uids(bilibili_stub):
+    def by_uids(query, body):
+        return 200, {'code': 0, 'data': {
+            str(uid): dict(item, face='face.jpg')
+            for item in ROOMS.values() for uid in body['uids'] if item['uid'] == uid
+        }}
+    bilibili_stub.routes[('POST', UIDS_PATH)] = by_uids
+
+    status_map = BilibiliChecker.batch_check_live_status(uids=['110'])
+
+    assert status_map['110']['resolved_room_id'] == '21452505'
+    assert status_map['110']['avatar'] == 'face.jpg'
+
+def test_open_breaker_is_not_wrapped_as_network_error(bilibili_stub):
+    breaker = get_breaker(bilibili_stub.url)
+    for _ in range(breaker.failure_threshold):
+        breaker.record(False)
+
+    with pytest.raises(CircuitOpenError):
+        BilibiliChecker.batch_check_live_status(room_ids=['1'])
+    assert bilibili_stub.requests == []
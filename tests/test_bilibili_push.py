@@ -0,0 +1,190 @@
+"""哔哩哔哩直播状态推送：协议解码、状态写入缓存与对账轮询（对本地WebSocket桩服务）"""
+
+import json
+import time
+import zlib
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+
+from tools import bilibili_push, room_refresher
+from tools.bilibili_push import (
+    PushIngest, encode_packet, decode_packets, parse_status_event,
+    OP_AUTH, OP_AUTH_REPLY, OP_MESSAGE, OP_HEARTBEAT_REPLY, PROTO_JSON, PROTO_ZLIB
+)
+from tools.cache_manager import save_cached_data, load_cached_data
+from tools.data_handler import save_rooms_data
+from tools.user_manager import save_users
+
+ROOM_URL = 'https://live.bilibili.com/1'
+
+def message(cmd, **fields):
+    return encode_packet(OP_MESSAGE, json.dumps(dict(fields, cmd=cmd)), protover=PROTO_JSON)
+
+def compressed(*packets):
+    return encode_packet(OP_MESSAGE, zlib.compress(b''.join(packets)), protover=PROTO_ZLIB)
+
+def test_decode_packets_expands_zlib_frames():
+    frame = encode_packet(OP_HEARTBEAT_REPLY, b'\x00\x00\x00\x10') + compressed(message('LIVE'), message('DANMU_MSG'))
+
+    packets = list(decode_packets(frame))
+
+    assert [op for op, _ in packets] == [OP_HEARTBEAT_REPLY, OP_MESSAGE, OP_MESSAGE]
+    assert json.loads(packets[1][1])['cmd'] == 'LIVE'
+
+def test_decode_packets_stops_at_truncated_packet():
+    frame = message('LIVE') + message('PREPARING')[:20]
+
+    assert len(list(decode_packets(frame))) == 1
+
+@pytest.mark.parametrize('payload, expected', [
+    ({'cmd': 'LIVE'}, (True, '直播中')),
+    ({'cmd': 'PREPARING'}, (False, '未开播')),
+    ({'cmd': 'PREPARING', 'round': 1}, (False, '轮播中')),
+    ({'cmd': 'DANMU_MSG:4:0:2:2:2:0'}, None)
+])
+def test_parse_status_event(payload, expected):
+    assert parse_status_event(json.dumps(payload).encode('utf-8')) == expected
+
+def test_parse_status_event_ignores_invalid_body():
+    assert parse_status_event(b'\x00\x01') is None
+
+@pytest.fixture
+def subscribed_room():
+    """用户u1关注了哔哩哔哩直播间1，缓存中为未开播"""
+    save_users({'u1': {'username': 'u1'}})
+    save_rooms_data([ROOM_URL], 'u1')
+    save_cached_data(ROOM_URL, {'url': ROOM_URL, 'is_live': False, 'status_info': '未开播', 'title': '标题'}, 'u1')
+    return ROOM_URL
+
+def test_apply_status_updates_cache_and_marks_changed(subscribed_room):
+    ingest = PushIngest('ws://127.0.0.1:1/sub')
+    ingest._subscribers = {'1': [('u1', subscribed_room)], '2': [('u1', 'https://live.bilibili.com/2')]}
+
+    ingest._apply_status('1', True, '直播中')
+    # 没有缓存的直播间不写入
+    ingest._apply_status('2', True, '直播中')
+
+    cached = load_cached_data(subscribed_room, 'u1')
+    assert cached['is_live'] is True
+    assert cached['title'] == '标题'
+    assert cached['pushed_at'] > 0
+    assert load_cached_data('https://live.bilibili.com/2', 'u1') is None
+    assert ingest.take_changed('u1', subscribed_room)
+    assert not ingest.take_changed('u1', subscribed_room)
+
+    # 状态没变时不算变化
+    ingest._apply_status('1', True, '直播中')
+    assert ingest.stats['status_changes'] == 1
+
+def test_needs_poll_without_push_connection_always_polls():
+    ingest = PushIngest('ws://127.0.0.1:1/sub')
+    ingest.mark_reconciled(ROOM_URL)
+
+    assert ingest.needs_poll(ROOM_URL)
+    assert ingest.needs_poll(ROOM_URL)
+
+@pytest.fixture
+def connected_ingest(monkeypatch):
+    """直播间1的推送连接正常的推送服务，设为模块当前使用的实例"""
+    ingest = PushIngest('ws://127.0.0.1:1/sub', reconcile_interval=1800)
+    ingest._connected['1'] = time.monotonic()
+    monkeypatch.setattr(bilibili_push, '_ingest', ingest)
+    return ingest
+
+def test_only_successful_poll_counts_as_reconciled(subscribed_room, connected_ingest):
+    assert connected_ingest.needs_poll(subscribed_room)
+
+    # 对账轮询失败（返回缓存数据）时不记为已对账
+    room_refresher.keep_cached_result(subscribed_room, 'u1', ConnectionError('失败'))
+    assert connected_ingest.needs_poll(subscribed_room)
+
+    room_refresher.save_room_result(subscribed_room, {'url': subscribed_room, 'is_live': False}, 'u1')
+    assert not connected_ingest.needs_poll(subscribed_room)
+
+def test_served_from_push_counts_only_push_answers(subscribed_room, connected_ingest):
+    # 需要对账时不由推送应答，普通轮询也不计入
+    assert room_refresher.serve_pushed_room(subscribed_room, 'u1') is None
+    room_refresher.save_room_result(subscribed_room, {'url': subscribed_room, 'is_live': False}, 'u1')
+    assert connected_ingest.stats['served_from_push'] == 0
+
+    result, _ = room_refresher.serve_pushed_room(subscribed_room, 'u1')
+    assert result['from_push']
+    assert connected_ingest.stats['served_from_push'] == 1
+
+class WebSocketStub:
+    """本地消息服务器：认证成功后发送frames中的数据帧，记录收到的认证包"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.auth = []
+        self._loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get('/sub', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.TCPSite(self._runner, '127.0.0.1', 0).start())
+        self.url = f'ws://127.0.0.1:{self._runner.addresses[0][1]}/sub'
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        first = await ws.receive()
+        for op, body in decode_packets(first.data):
+            if op == OP_AUTH:
+                self.auth.append(json.loads(body))
+        await ws.send_bytes(encode_packet(OP_AUTH_REPLY, json.dumps({'code': 0})))
+        for frame in self.frames:
+            await ws.send_bytes(frame)
+        async for _ in ws:
+            pass
+        return ws
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+@pytest.fixture
+def push_stub():
+    stub = WebSocketStub([compressed(message('DANMU_MSG'), message('LIVE'))])
+    yield stub
+    stub.close()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def test_push_event_from_stub_server_reaches_cache(subscribed_room, push_stub):
+    ingest = PushIngest(push_stub.url, fetch_token=False, connect_interval=0, reconcile_interval=1800)
+    # 房间号已解析，不访问批量接口
+    ingest._real_ids['1'] = '1'
+    ingest.start()
+    try:
+        assert wait_for(lambda: load_cached_data(subscribed_room, 'u1')['is_live'])
+    finally:
+        stats = ingest.get_stats()
+        covered = ingest.covers(subscribed_room)
+        first_check = ingest.needs_poll(subscribed_room)
+        ingest.mark_reconciled(subscribed_room)
+        second_check = ingest.needs_poll(subscribed_room)
+        ingest.stop()
+
+    assert push_stub.auth[0]['roomid'] == 1
+    assert push_stub.auth[0]['protover'] == PROTO_ZLIB
+    assert 'key' not in push_stub.auth[0]
+    assert stats['connects'] == 1
+    assert stats['events'] == 1
+    assert stats['subscribed'] == 1
+    # 推送覆盖的直播间成功对账后，到下个对账间隔前不再轮询
+    assert covered
+    assert first_check and not second_check
+    assert ingest.take_changed('u1', subscribed_room)
@@ -0,0 +1,50 @@
+"""直播间缓存：并发的读改写不丢失字段，读取方不会读到写了一半的文件"""
+
+import os
+import threading
+
+from tools.cache_manager import (
+    save_cached_data, save_poll_state, load_cache_entry, get_cache_file, cache_entry_lock
+)
+
+ROOM_URL = 'https://live.bilibili.com/1'
+
+def run_threads(*targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_data_and_poll_state_writes_keep_both():
+    save_cached_data(ROOM_URL, {'title': '初始'}, 'u1', {'interval': 0})
+    errors = []
+
+    def write_data():
+        for i in range(50):
+            save_cached_data(ROOM_URL, {'title': f'标题{i}'}, 'u1')
+
+    def write_poll_state():
+        for i in range(50):
+            save_poll_state(ROOM_URL, {'interval': i + 1}, 'u1')
+
+    def read():
+        for _ in range(200):
+            if load_cache_entry(ROOM_URL, 'u1') is None:
+                errors.append('读取到不完整的缓存文件')
+
+    run_threads(write_data, write_poll_state, read)
+
+    entry = load_cache_entry(ROOM_URL, 'u1')
+    assert not errors
+    assert entry['data'] == {'title': '标题49'}
+    # 保存数据时保留的轮询状态不会覆盖并发写入的新状态
+    assert entry['poll_state'] == {'interval': 50}
+    assert os.listdir(os.path.dirname(get_cache_file(ROOM_URL, 'u1'))) == [os.path.basename(get_cache_file(ROOM_URL, 'u1'))]
+
+def test_cache_entry_lock_is_reentrant_and_per_room():
+    with cache_entry_lock(ROOM_URL, 'u1'):
+        # 持有锁时可以写入同一直播间
+        save_cached_data(ROOM_URL, {'title': '标题'}, 'u1')
+        assert cache_entry_lock(ROOM_URL, 'u1') is cache_entry_lock(ROOM_URL, 'u1')
+        assert cache_entry_lock(ROOM_URL, 'u2') is not cache_entry_lock(ROOM_URL, 'u1')
@@ -0,0 +1,100 @@
+"""熔断器：连续失败打开、冷却后半开探测、探测结果决定恢复或重新打开"""
+
+import pytest
+
+from tools import circuit_breaker
+from tools.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, get_breaker, breaker_key, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.acquire()
+        breaker.record(False)
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=3, recovery_timeout=30)
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == STATE_CLOSED
+
+    breaker.record(False)
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    assert breaker.get_stats()['rejected'] == 1
+
+def test_half_open_allows_limited_probes(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=2, recovery_timeout=30, half_open_max_calls=1)
+    open_breaker(breaker)
+
+    clock.now += 30
+    breaker.acquire()
+    assert breaker.state == STATE_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=2, recovery_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.acquire()
+
+    breaker.record(True)
+    assert breaker.state == STATE_CLOSED
+    breaker.acquire()
+    breaker.acquire()
+
+def test_failed_probe_reopens_for_another_timeout(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=2, recovery_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.acquire()
+
+    breaker.record(False)
+    assert breaker.state == STATE_OPEN
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    clock.now += 1
+    breaker.acquire()
+    assert breaker.get_stats()['opened'] == 2
+
+def test_cancelled_probe_returns_slot(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=1, recovery_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.acquire()
+
+    breaker.cancel()
+    breaker.acquire()
+
+def test_disabled_breaker_only_counts(clock):
+    breaker = CircuitBreaker('https://a', failure_threshold=1, enabled=False)
+    for _ in range(5):
+        breaker.acquire()
+        breaker.record(False)
+
+    assert breaker.state == STATE_CLOSED
+    assert breaker.get_stats()['failures'] == 5
+
+def test_breakers_are_per_site():
+    assert breaker_key('HTTPS://Douyin.wtf/api/x?y=1') == 'https://douyin.wtf'
+    assert get_breaker('https://a.example/x') is get_breaker('https://a.example/y')
+    assert get_breaker('https://a.example/x') is not get_breaker('https://b.example/x')
@@ -0,0 +1,29 @@
+"""性能设置：合并默认值、缓存与只读视图"""
+
+import pytest
+
+from tools.config_manager import load_performance_settings
+
+def test_missing_items_use_defaults(performance_settings):
+    performance_settings({'retry': {'default': {'max_attempts': 5}}})
+
+    retry = load_performance_settings()['retry']
+    assert retry['default']['max_attempts'] == 5
+    assert retry['default']['base_delay'] == 0.2
+    assert 'douyu' in retry['platforms']
+
+def test_settings_are_cached_and_read_only():
+    settings = load_performance_settings()
+
+    assert load_performance_settings() is settings
+    with pytest.raises(TypeError):
+        settings['retry']['default']['max_attempts'] = 1
+    assert isinstance(settings['retry']['default']['retry_statuses'], tuple)
+
+def test_save_invalidates_cache(performance_settings):
+    before = load_performance_settings()
+    performance_settings({'single_flight': {'freshness': 9}})
+
+    after = load_performance_settings()
+    assert after is not before
+    assert after['single_flight']['freshness'] == 9
@@ -0,0 +1,90 @@
+"""刷新时间预算与自适应超时"""
+
+import time
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from tools import http_client, room_refresher
+from tools.cache_manager import save_cached_data
+from tools.deadline import Deadline, DeadlineExceeded, as_deadline, deadline_scope, get_current_deadline
+from tools.latency_tracker import get_latency_tracker, get_request_timeout
+
+ROOM_URL = 'https://www.douyu.com/9999'
+
+def test_as_deadline():
+    assert as_deadline(None) is None
+    assert as_deadline(0) is None
+    deadline = Deadline(5)
+    assert as_deadline(deadline) is deadline
+    assert 4 < as_deadline('5').remaining() <= 5
+
+def test_deadline_scope_sets_and_restores():
+    deadline = Deadline(5)
+    with deadline_scope(deadline):
+        assert get_current_deadline() is deadline
+    assert get_current_deadline() is None
+
+def test_expired_deadline_raises():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+def test_default_batch_refresh_has_no_deadline():
+    from tools.config_manager import load_performance_settings
+    assert load_performance_settings()['batch_refresh']['deadline'] is None
+
+def test_read_timeout_uses_default_until_enough_samples(performance_settings):
+    performance_settings({'timeouts': {'min_samples': 5, 'default_read': 10, 'multiplier': 2,
+                                       'min_read': 2, 'max_read': 15, 'percentile': 99}})
+    tracker = get_latency_tracker('douyu')
+    for _ in range(4):
+        tracker.record(3.0)
+    assert get_request_timeout('douyu')[1] == 10
+
+    tracker.record(3.0)
+    assert get_request_timeout('douyu')[1] == 6.0
+
+def test_read_timeout_is_clamped(performance_settings):
+    performance_settings({'timeouts': {'min_samples': 1, 'multiplier': 2, 'min_read': 2, 'max_read': 15}})
+    get_latency_tracker('fast').record(0.1)
+    get_latency_tracker('slow').record(30)
+
+    assert get_request_timeout('fast')[1] == 2
+    assert get_request_timeout('slow')[1] == 15
+
+def test_request_timeout_capped_by_remaining_budget():
+    with deadline_scope(Deadline(1)):
+        connect_timeout, read_timeout = http_client.resolve_timeout('douyu', (3.05, 10))
+    assert connect_timeout <= 1 and read_timeout <= 1
+
+    with deadline_scope(Deadline(0.001)):
+        time.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            http_client.resolve_timeout('douyu', (3.05, 10))
+
+def test_wait_refresh_does_not_block_past_budget_on_running_job(monkeypatch):
+    save_cached_data(ROOM_URL, {'url': ROOM_URL, 'is_live': True, 'anchor': '主播'}, 'u1')
+    monkeypatch.setattr(room_refresher, 'RUNNING_GRACE_SECONDS', 0.1)
+    future = Future()
+    # 模拟已开始执行、无法取消的刷新
+    assert future.set_running_or_notify_cancel()
+
+    start = time.monotonic()
+    result, has_changes = room_refresher.wait_refresh(future, ROOM_URL, 'u1', Deadline(0.05))
+
+    assert time.monotonic() - start < 1
+    assert result['deadline_exceeded'] and result['from_cache']
+    assert result['anchor'] == '主播'
+    assert not has_changes
+
+def test_wait_refresh_returns_job_finishing_within_grace():
+    future = Future()
+    future.set_running_or_notify_cancel()
+    threading.Timer(0.1, future.set_result, args=(({'url': ROOM_URL}, True),)).start()
+
+    assert room_refresher.wait_refresh(future, ROOM_URL, 'u1', Deadline(0.05)) == ({'url': ROOM_URL}, True)
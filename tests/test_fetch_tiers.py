@@ -0,0 +1,121 @@
+"""分层获取：层级顺序、失败降级与冷却恢复"""
+
+import pytest
+
+from tools import fetch_tiers
+from tools.base_checker import BaseChecker
+from tools.circuit_breaker import CircuitOpenError
+from tools.deadline import DeadlineExceeded
+from tools.fetch_tiers import PAGE_TIER, plan_tiers, get_tier_health, record_tier_failure
+
+DECLARED = ('fast_api', 'open_api', PAGE_TIER)
+
+@pytest.fixture
+def tier_settings(performance_settings):
+    performance_settings({'fetch_tiers': {
+        'platforms': {}, 'window': 4, 'min_samples': 2, 'failure_threshold': 0.5, 'demote_duration': 60
+    }})
+
+class FakeChecker(BaseChecker):
+    """每个层级的响应由failing中是否包含该层级决定"""
+
+    PLATFORM_KEY = 'fake'
+    SNAPSHOT_TIERS = DECLARED
+    failing = set()
+    requested = []
+
+    @classmethod
+    def _request(cls, request_spec):
+        cls.requested.append(request_spec['url'])
+        if request_spec['url'] in cls.failing:
+            raise ConnectionError(f"{request_spec['url']} 不可用")
+        return {'tier': request_spec['url']}
+
+    @classmethod
+    def build_room_request(cls, room_id, api_url=None):
+        return {'url': PAGE_TIER}
+
+    @classmethod
+    def build_fast_api_request(cls, room_id):
+        return {'url': 'fast_api'}
+
+    @classmethod
+    def build_open_api_request(cls, room_id):
+        return {'url': 'open_api'}
+
+    @classmethod
+    def parse_snapshot(cls, payload, room_id):
+        return {'is_live': True, 'status_info': '直播中'}
+
+    parse_fast_api_snapshot = parse_snapshot
+    parse_open_api_snapshot = parse_snapshot
+
+@pytest.fixture
+def checker(tier_settings):
+    FakeChecker.failing = set()
+    FakeChecker.requested = []
+    return FakeChecker
+
+def test_plan_uses_declared_order_with_page_last(tier_settings):
+    assert plan_tiers('fake', DECLARED) == ['fast_api', 'open_api', PAGE_TIER]
+
+def test_plan_follows_configured_order_and_keeps_fallback(performance_settings):
+    performance_settings({'fetch_tiers': {'platforms': {'fake': ['open_api', 'unknown', PAGE_TIER]}}})
+
+    assert plan_tiers('fake', DECLARED) == ['open_api', PAGE_TIER]
+
+def test_disabled_tiers_fetch_page_only(performance_settings):
+    performance_settings({'fetch_tiers': {'enabled': False}})
+
+    assert plan_tiers('fake', DECLARED) == [PAGE_TIER]
+
+def test_failing_tier_falls_through_then_is_demoted(checker):
+    checker.failing = {'fast_api'}
+
+    for _ in range(2):
+        assert checker.fetch_snapshot('1')['tier'] == 'open_api'
+    assert checker.requested == ['fast_api', 'open_api', 'fast_api', 'open_api']
+
+    # 失败率达到阈值后跳过该层级
+    assert get_tier_health('fake', 'fast_api').demoted
+    checker.requested = []
+    assert checker.fetch_snapshot('1')['tier'] == 'open_api'
+    assert checker.requested == ['open_api']
+
+def test_demoted_tier_returns_after_cooldown(checker, monkeypatch):
+    checker.failing = {'fast_api'}
+    for _ in range(2):
+        checker.fetch_snapshot('1')
+    assert plan_tiers('fake', DECLARED) == ['open_api', PAGE_TIER]
+
+    monotonic = fetch_tiers.time.monotonic
+    monkeypatch.setattr(fetch_tiers.time, 'monotonic', lambda: monotonic() + 61)
+    assert plan_tiers('fake', DECLARED) == list(DECLARED)
+
+def test_page_tier_is_never_demoted(checker):
+    checker.failing = {'fast_api', 'open_api', PAGE_TIER}
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            checker.fetch_snapshot('1')
+
+    assert plan_tiers('fake', DECLARED) == [PAGE_TIER]
+    assert get_tier_health('fake', PAGE_TIER).get_stats()['failures'] == 4
+    assert not get_tier_health('fake', PAGE_TIER).demoted
+
+def test_open_breaker_does_not_count_against_tier(tier_settings):
+    for _ in range(3):
+        record_tier_failure('fake', 'fast_api', CircuitOpenError('熔断'), is_last=False)
+
+    assert get_tier_health('fake', 'fast_api').get_stats()['failures'] == 0
+    assert plan_tiers('fake', DECLARED)[0] == 'fast_api'
+
+def test_deadline_aborts_without_trying_next_tier(checker, monkeypatch):
+    def expired(request_spec):
+        checker.requested.append(request_spec['url'])
+        raise DeadlineExceeded('超出刷新时间预算')
+    monkeypatch.setattr(checker, '_request', expired)
+
+    with pytest.raises(DeadlineExceeded):
+        checker.fetch_snapshot('1')
+    assert checker.requested == ['fast_api']
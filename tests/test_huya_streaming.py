@@ -0,0 +1,69 @@
+"""虎牙页面流式扫描：内嵌JSON所在的脚本比扫描缓冲区大时仍能解析"""
+
+import json
+
+from tools.huya_checker import HuyaChecker
+from tools.stream_scanner import scan_chunks
+
+TAIL_SIZE = 16384
+
+ROOM_DATA = {'state': 'ON', 'introduction': '标题里有 }; 也不截断', 'screenshot': 'https://img/cover.jpg', 'totalCount': 4321}
+PROFILE_INFO = {'nick': '虎牙主播', 'avatar': 'https://img/avatar.jpg', 'profileRoom': 660000}
+
+def build_page(player_info_size=50000, room_data=ROOM_DATA):
+    """TT_ROOM_DATA、TT_PROFILE_INFO和很大的TT_PLAYER_INFO在同一个脚本中"""
+    player_info = {'stream': 'x' * player_info_size}
+    return (
+        '<html><head><meta charset="utf-8"><title>虎牙主播的直播间</title></head><body>'
+        '<script>'
+        f'var TT_ROOM_DATA = {json.dumps(room_data, ensure_ascii=False)};'
+        f'var TT_PROFILE_INFO = {json.dumps(PROFILE_INFO, ensure_ascii=False)};'
+        f'var TT_PLAYER_INFO = {json.dumps(player_info)};'
+        '</script>'
+        '<h1 class="host-name"><span>虎牙主播</span></h1>'
+        + 'y' * 20000 +
+        '</body></html>'
+    ).encode('utf-8')
+
+def stream(page, markers, chunk_size=4096):
+    chunks = (page[start:start + chunk_size] for start in range(0, len(page), chunk_size))
+    return scan_chunks(chunks, markers, tail_size=TAIL_SIZE)
+
+def test_snapshot_markers_survive_script_larger_than_tail():
+    page = build_page()
+    assert len(page) > 3 * TAIL_SIZE
+
+    text, stopped_early, bytes_read = stream(page, HuyaChecker.SNAPSHOT_MARKERS)
+
+    assert stopped_early
+    assert bytes_read < len(page)
+    is_live, state = HuyaChecker.parse_live_status(text)
+    assert (is_live, state) == (True, 'ON')
+
+    snapshot = HuyaChecker.parse_snapshot(text, '660000')
+    assert snapshot['anchor'] == '虎牙主播'
+    assert snapshot['title'] == ROOM_DATA['introduction']
+
+def test_streamed_result_matches_full_page():
+    page = build_page()
+    text, _, _ = stream(page, HuyaChecker.SNAPSHOT_MARKERS)
+    full = page.decode('utf-8')
+
+    assert HuyaChecker.parse_snapshot(text, '660000') == HuyaChecker.parse_snapshot(full, '660000')
+
+def test_room_id_marker_survives_script_larger_than_tail():
+    text, _, _ = stream(build_page(), HuyaChecker.ROOM_ID_MARKERS)
+
+    assert HuyaChecker.parse_room_id(text, 'https://www.huya.com/') == '660000'
+
+def test_oversized_room_data_falls_back_to_full_page():
+    # TT_ROOM_DATA超出标记的长度上限，流式标记匹配不到，读完页面后按整页解析
+    room_data = dict(ROOM_DATA, introduction='长' * 20000)
+    page = build_page(room_data=room_data)
+
+    text, stopped_early, bytes_read = stream(page, HuyaChecker.SNAPSHOT_MARKERS)
+
+    assert not stopped_early
+    assert bytes_read == len(page)
+    assert HuyaChecker.parse_live_status(text) == (True, 'ON')
+    assert HuyaChecker.parse_snapshot(text, '660000') == HuyaChecker.parse_snapshot(page.decode('utf-8'), '660000')
@@ -0,0 +1,81 @@
+"""自适应轮询间隔：未开播时间隔倍增到上限，直播中快速轮询，规律开播前提前恢复"""
+
+import copy
+
+import pytest
+
+from tools.config_manager import DEFAULT_PERFORMANCE_SETTINGS
+from tools.poll_policy import next_poll_state, failed_poll_state, predict_next_start, jitter_delay, DAY_SECONDS
+
+BASE = 600
+NOW = 10 * DAY_SECONDS
+
+@pytest.fixture
+def settings():
+    return copy.deepcopy(DEFAULT_PERFORMANCE_SETTINGS['adaptive_polling'])
+
+def poll(state, is_live, now, settings):
+    return next_poll_state(state, is_live, now, BASE, settings)
+
+def test_offline_interval_doubles_up_to_max(settings):
+    state = poll(None, False, NOW, settings)
+    assert state['interval'] == BASE
+
+    intervals = []
+    now = NOW
+    for _ in range(6):
+        now = state['next_poll_at']
+        state = poll(state, False, now, settings)
+        intervals.append(state['interval'])
+
+    assert intervals == [1200, 2400, 4800, 7200, 7200, 7200]
+    assert state['next_poll_at'] == now + settings['max_interval']
+
+def test_live_room_polls_fast_and_records_start(settings):
+    offline = poll({'is_live': False, 'interval': 4800}, False, NOW, settings)
+
+    live = poll(offline, True, NOW + 60, settings)
+
+    assert live['interval'] == settings['fast_interval']
+    assert live['start_times'] == [NOW + 60]
+    assert live['last_live_at'] == NOW + 60
+
+def test_recently_offline_keeps_fast_interval(settings):
+    live = poll({'is_live': False}, True, NOW, settings)
+
+    state = poll(live, False, NOW + 60, settings)
+    assert state['interval'] == settings['fast_interval']
+
+    # 超过下播窗口后从用户间隔开始放宽
+    later = NOW + settings['recent_offline_window'] + 1
+    assert poll(state, False, later, settings)['interval'] == BASE
+
+def test_next_poll_moves_before_predicted_start(settings):
+    # 前两天的同一时刻开播
+    start = NOW + 20 * 3600
+    state = {'is_live': False, 'interval': 7200, 'start_times': [start - 2 * DAY_SECONDS, start - DAY_SECONDS]}
+
+    before = poll(state, False, start - 3600, settings)
+    assert before['next_poll_at'] == start - settings['start_lead']
+
+    within = poll(state, False, start - 60, settings)
+    assert within['interval'] == settings['fast_interval']
+
+def test_predict_next_start_needs_min_occurrences():
+    assert predict_next_start([NOW - DAY_SECONDS + 100], NOW, 1800, 2) is None
+    assert predict_next_start([NOW - 2 * DAY_SECONDS + 100, NOW - DAY_SECONDS + 100], NOW, 1800, 2) == NOW + 100
+
+def test_disabled_policy_uses_base_interval(settings):
+    settings['enabled'] = False
+    state = poll({'is_live': False, 'interval': 4800}, False, NOW, settings)
+    assert state['interval'] == BASE
+    assert state['next_poll_at'] == NOW + BASE
+
+def test_failed_poll_keeps_interval_and_caps_delay():
+    state = failed_poll_state({'is_live': False, 'interval': 4800}, NOW, BASE)
+    assert state['interval'] == 4800
+    assert state['next_poll_at'] == NOW + BASE
+
+def test_jitter_only_shortens_delay():
+    delays = [jitter_delay(100, 0.1) for _ in range(200)]
+    assert all(90 <= delay <= 100 for delay in delays)
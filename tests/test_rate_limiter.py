@@ -0,0 +1,108 @@
+"""平台限流器：令牌桶、并发窗口与AIMD调整"""
+
+import pytest
+
+from tools import rate_limiter
+from tools.rate_limiter import (
+    PlatformRateLimiter, RateLimitTimeout, get_rate_limiter,
+    OUTCOME_SUCCESS, OUTCOME_THROTTLED, OUTCOME_TIMEOUT, OUTCOME_ERROR, OUTCOME_CANCELLED
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock)
+    return clock
+
+def make_limiter(**overrides):
+    settings = dict(
+        rate=2, burst=3, initial_concurrency=4, min_concurrency=1, max_concurrency=8,
+        latency_target=1.0, backoff_ratio=0.5, backoff_cooldown=1.0
+    )
+    settings.update(overrides)
+    return PlatformRateLimiter('test', **settings)
+
+def test_burst_then_wait_for_refill(clock):
+    limiter = make_limiter(initial_concurrency=10)
+
+    assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.try_acquire() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert limiter.try_acquire() == 0
+
+def test_tokens_never_exceed_burst(clock):
+    limiter = make_limiter(initial_concurrency=10)
+    clock.now += 60
+
+    assert [limiter.try_acquire() for _ in range(4)][-1] > 0
+
+def test_concurrency_window_limits_in_flight(clock):
+    limiter = make_limiter(burst=10, initial_concurrency=2)
+    limiter.try_acquire()
+    limiter.try_acquire()
+
+    assert limiter.try_acquire() > 0
+    limiter.release(OUTCOME_CANCELLED)
+    assert limiter.try_acquire() == 0
+
+@pytest.mark.parametrize('outcome', [OUTCOME_THROTTLED, OUTCOME_TIMEOUT])
+def test_throttle_or_timeout_halves_window_once_per_cooldown(clock, outcome):
+    limiter = make_limiter()
+
+    limiter.release(outcome)
+    limiter.release(outcome)
+    assert limiter.concurrency_limit == 2
+
+    clock.now += 1.0
+    limiter.release(outcome)
+    limiter.release(outcome)
+    clock.now += 1.0
+    limiter.release(outcome)
+    assert limiter.concurrency_limit == 1
+    assert limiter.get_stats()['backoffs'] == 3
+
+def test_healthy_success_grows_window_additively(clock):
+    limiter = make_limiter()
+
+    for _ in range(4):
+        limiter.release(OUTCOME_SUCCESS, latency=0.2)
+    assert limiter.concurrency_limit == pytest.approx(5, abs=0.1)
+
+    # 延迟超过阈值时不放大
+    limiter.release(OUTCOME_SUCCESS, latency=1.5)
+    limiter.release(OUTCOME_ERROR, latency=0.2)
+    limiter.release(OUTCOME_CANCELLED, latency=0.2)
+    assert limiter.concurrency_limit == pytest.approx(5, abs=0.1)
+
+def test_window_stays_within_bounds(clock):
+    limiter = make_limiter(initial_concurrency=8)
+    for _ in range(20):
+        limiter.release(OUTCOME_SUCCESS, latency=0.1)
+    assert limiter.concurrency_limit == 8
+
+    for _ in range(10):
+        clock.now += 1.0
+        limiter.release(OUTCOME_THROTTLED)
+    assert limiter.concurrency_limit == 1
+
+def test_acquire_times_out_when_no_permit():
+    limiter = make_limiter(initial_concurrency=1)
+    limiter.acquire()
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(max_wait=0.1)
+
+def test_limits_scale_with_egress_routes(performance_settings):
+    performance_settings({'egress': {'enabled': True, 'platforms': {'douyu': ['direct', 'http://proxy-a:8080']}}})
+
+    limiter = get_rate_limiter('douyu')
+    assert limiter.rate == 10
+    assert limiter.max_concurrency == 32
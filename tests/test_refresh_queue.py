@@ -0,0 +1,233 @@
+"""全局刷新队列：手动刷新优先、用户间赤字轮询、老化、用户并发上限和积压丢弃，异步引擎和逐个刷新同样经过队列"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from tools import refresh_queue, room_refresher
+from tools.refresh_queue import (
+    RefreshQueue, RefreshShedError, PRIORITY_INTERACTIVE, PRIORITY_BOOSTED, PRIORITY_NORMAL
+)
+from tools.async_refresh import AsyncRefreshEngine
+from tools.deadline import Deadline, DeadlineExceeded
+from tools.cache_manager import save_cached_data
+
+URLS = [f'https://www.douyu.com/{i}' for i in range(6)]
+
+@pytest.fixture
+def queue(monkeypatch):
+    """替换全局刷新队列"""
+    queue = RefreshQueue(workers=2)
+    monkeypatch.setattr(refresh_queue, '_queue', queue)
+    return queue
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class Blocker:
+    """占住工作线程的任务，release()后结束"""
+
+    def __init__(self, queue, user_id='blocker', priority=PRIORITY_NORMAL, platform_key='p'):
+        self.started = threading.Event()
+        self._release = threading.Event()
+        self.future = queue.submit(user_id, platform_key, priority, 100, self._run)
+        assert self.started.wait(5)
+
+    def _run(self):
+        self.started.set()
+        self._release.wait(5)
+
+    def release(self):
+        self._release.set()
+        self.future.result(5)
+
+def run_in_order(queue, jobs):
+    """在唯一的工作线程被占住时按顺序提交 (用户, 优先级, 标签)，返回实际执行的标签顺序"""
+    blocker = Blocker(queue)
+    order = []
+    futures = [queue.submit(user_id, 'p', priority, 100, order.append, label) for user_id, priority, label in jobs]
+    blocker.release()
+    for future in futures:
+        future.result(5)
+    return order
+
+def test_users_share_workers_round_robin():
+    queue = RefreshQueue(workers=1)
+    jobs = [('u1', PRIORITY_NORMAL, f'a{i}') for i in range(4)] + [('u2', PRIORITY_NORMAL, f'b{i}') for i in range(2)]
+
+    assert run_in_order(queue, jobs) == ['a0', 'b0', 'a1', 'b1', 'a2', 'a3']
+
+def test_user_weight_gives_more_turns():
+    queue = RefreshQueue(workers=1, user_weights={'u1': 2})
+    jobs = [('u1', PRIORITY_NORMAL, f'a{i}') for i in range(4)] + [('u2', PRIORITY_NORMAL, f'b{i}') for i in range(2)]
+
+    assert run_in_order(queue, jobs) == ['a0', 'a1', 'b0', 'a2', 'a3', 'b1']
+
+def test_interactive_runs_before_background_of_all_users():
+    queue = RefreshQueue(workers=1)
+    jobs = [
+        ('u1', PRIORITY_NORMAL, 'normal'), ('u1', PRIORITY_BOOSTED, 'boosted'),
+        ('u2', PRIORITY_NORMAL, 'other'), ('u2', PRIORITY_INTERACTIVE, 'manual')
+    ]
+
+    # 用户内部按优先级，用户之间轮流
+    assert run_in_order(queue, jobs) == ['manual', 'boosted', 'other', 'normal']
+
+def test_long_waiting_job_ages_past_higher_priority():
+    queue = RefreshQueue(workers=1, aging_interval=0.05)
+    blocker = Blocker(queue)
+    order = []
+    first = queue.submit('u1', 'p', PRIORITY_NORMAL, 100, order.append, 'normal')
+    # 排队超过两个老化间隔后，排名已在新提交的优先刷新之前
+    time.sleep(0.15)
+    second = queue.submit('u1', 'p', PRIORITY_BOOSTED, 100, order.append, 'boosted')
+    blocker.release()
+    first.result(5)
+    second.result(5)
+
+    assert order == ['normal', 'boosted']
+
+def test_user_cap_limits_background_but_not_interactive():
+    queue = RefreshQueue(workers=4, user_max_in_flight=1, aging_interval=0)
+    running = Blocker(queue, user_id='u1')
+    # 同一平台的后台刷新排名更靠前（老化间隔为0时按入队时间排序），手动刷新仍然不被挡住
+    background = queue.submit('u1', 'p', PRIORITY_NORMAL, 100, lambda: 'background')
+    manual = queue.submit('u1', 'p', PRIORITY_INTERACTIVE, 100, lambda: 'manual')
+    other_user = queue.submit('u2', 'p', PRIORITY_NORMAL, 100, lambda: 'other')
+
+    assert manual.result(5) == 'manual'
+    assert other_user.result(5) == 'other'
+    assert not background.done()
+
+    running.release()
+    assert background.result(5) == 'background'
+
+def test_platform_limit_is_shared_by_all_users():
+    queue = RefreshQueue(workers=4)
+    running = Blocker(queue, platform_key='douyu')
+    queue.submit('u1', 'douyu', PRIORITY_INTERACTIVE, 1, lambda: None)
+    waiting = queue.submit('u2', 'douyu', PRIORITY_INTERACTIVE, 1, lambda: None)
+    other_platform = queue.submit('u2', 'huya', PRIORITY_NORMAL, 1, lambda: 'huya')
+
+    assert other_platform.result(5) == 'huya'
+    assert not waiting.done()
+    running.release()
+    waiting.result(5)
+
+def test_background_is_shed_when_backlogged_but_interactive_is_queued():
+    queue = RefreshQueue(workers=1, shed_threshold=2)
+    blocker = Blocker(queue)
+    queued = [queue.submit('u1', 'p', PRIORITY_NORMAL, 100, lambda: None) for _ in range(2)]
+
+    with pytest.raises(RefreshShedError):
+        queue.submit('u1', 'p', PRIORITY_BOOSTED, 100, lambda: None).result(5)
+    manual = queue.submit('u1', 'p', PRIORITY_INTERACTIVE, 100, lambda: 'manual')
+
+    blocker.release()
+    assert manual.result(5) == 'manual'
+    for future in queued:
+        future.result(5)
+    assert queue.stats['shed'] == 1
+    assert queue.get_usage()['u1']['shed'] == 1
+
+def test_cancelled_jobs_are_skipped():
+    queue = RefreshQueue(workers=1)
+    blocker = Blocker(queue)
+    cancelled = queue.submit('u1', 'p', PRIORITY_INTERACTIVE, 100, lambda: None)
+    assert cancelled.cancel()
+    after = queue.submit('u1', 'p', PRIORITY_NORMAL, 100, lambda: 'after')
+
+    blocker.release()
+    assert after.result(5) == 'after'
+    assert wait_for(lambda: queue.get_stats()['depth'] == 0)
+    assert queue.get_usage()['u1']['cancelled'] == 1
+
+def test_reserved_slot_is_held_until_release(queue):
+    slot = queue.reserve('u1', 'douyu', PRIORITY_NORMAL, 1)
+    slot.result(5)
+
+    started = threading.Event()
+    job = queue.submit('u1', 'douyu', PRIORITY_NORMAL, 1, started.set)
+    assert not started.wait(0.1)
+
+    queue.release(slot)
+    job.result(5)
+    assert wait_for(lambda: queue.get_stats()['in_flight'] == {})
+    assert queue.get_stats()['completed'] == 2
+
+def test_release_before_grant_returns_slot_after_grant(queue):
+    blocker = queue.reserve('u1', 'douyu', PRIORITY_NORMAL, 1)
+    blocker.result(5)
+    slot = queue.reserve('u1', 'douyu', PRIORITY_NORMAL, 1)
+    queue.release(slot)
+
+    queue.release(blocker)
+    assert wait_for(lambda: slot.done() and queue.get_stats()['in_flight'] == {})
+
+def test_reserve_is_shed_when_backlogged(monkeypatch):
+    queue = RefreshQueue(workers=1, shed_threshold=0)
+    with pytest.raises(RefreshShedError):
+        queue.reserve('u1', 'douyu', PRIORITY_NORMAL, 1).result(5)
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    """异步引擎的单个直播间获取替换为等待一小段时间，记录同时进行的数量"""
+    counts = {'active': 0, 'peak': 0}
+
+    async def fetch_room(self, url, checker, douyin_api_url_base):
+        counts['active'] += 1
+        counts['peak'] = max(counts['peak'], counts['active'])
+        await asyncio.sleep(0.05)
+        counts['active'] -= 1
+        return {'url': url}
+
+    monkeypatch.setattr(AsyncRefreshEngine, 'fetch_room', fetch_room)
+    return counts
+
+def test_async_engine_respects_platform_limit(queue, fake_fetch, performance_settings):
+    performance_settings({'batch_refresh': {'platform_concurrency': {'douyu': 2}}})
+    priorities = dict.fromkeys(URLS, PRIORITY_NORMAL)
+
+    results = asyncio.run(AsyncRefreshEngine().fetch_rooms(URLS, [], user_id='u1', priorities=priorities))
+
+    assert [error for _, _, error in results] == [None] * len(URLS)
+    assert fake_fetch['peak'] == 2
+    assert queue.get_stats()['in_flight'] == {}
+    assert queue.get_usage()['u1']['completed'] == len(URLS)
+
+def test_async_engine_deadline_covers_queue_wait(queue, fake_fetch, performance_settings):
+    performance_settings({'batch_refresh': {'platform_concurrency': {'douyu': 1}}})
+    blocker = queue.reserve('u2', 'douyu', PRIORITY_NORMAL, 1)
+    blocker.result(5)
+
+    results = asyncio.run(AsyncRefreshEngine().fetch_rooms(
+        URLS[:1], [], Deadline(0.1), user_id='u1', priorities={URLS[0]: PRIORITY_NORMAL}
+    ))
+
+    assert isinstance(results[0][2], DeadlineExceeded)
+    assert fake_fetch['peak'] == 0
+    queue.release(blocker)
+    assert wait_for(lambda: queue.get_stats()['in_flight'] == {} and queue.get_stats()['depth'] == 0)
+
+def test_sequential_poll_goes_through_queue(queue, monkeypatch):
+    monkeypatch.setattr(room_refresher, 'refresh_room', lambda url, *args: ({'url': url}, False))
+
+    outcomes = room_refresher.poll_rooms(URLS[:3], 'u1', [], concurrent=False)
+
+    assert [outcome for _, outcome, _ in outcomes] == [({'url': url}, False) for url in URLS[:3]]
+    assert queue.get_usage()['u1']['completed'] == 3
+
+def test_sequential_poll_is_shed_to_cached_data(monkeypatch):
+    monkeypatch.setattr(refresh_queue, '_queue', RefreshQueue(workers=1, shed_threshold=0))
+    save_cached_data(URLS[0], {'url': URLS[0], 'title': '缓存'}, 'u1')
+
+    outcomes = room_refresher.poll_rooms(URLS[:1], 'u1', [], concurrent=False)
+
+    assert outcomes[0][1][0]['from_cache']
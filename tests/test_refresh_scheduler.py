@@ -0,0 +1,70 @@
+"""服务端定时刷新：到期关注者获取共享直播间，首次轮询在刷新间隔内错开"""
+
+import time
+
+from tools import refresh_scheduler
+from tools.refresh_scheduler import RefreshScheduler
+from tools.poll_policy import spread_fraction
+from tools.cache_manager import load_cached_data
+from tools.user_manager import save_users
+from tools.data_handler import save_rooms_data
+
+ROOM_URL = 'https://live.douyin.com/1'
+
+def test_shared_room_is_fetched_with_due_users_config(monkeypatch):
+    save_users({'u1': {'username': 'u1'}, 'u2': {'username': 'u2'}})
+    save_rooms_data([ROOM_URL], 'u1')
+    save_rooms_data([ROOM_URL], 'u2')
+
+    fetched_by = []
+    def fake_poll_rooms(urls, user_id, douyin_api_url_base, deadline=None):
+        fetched_by.append(user_id)
+        for url in urls:
+            yield url, ({'url': url, 'is_live': True}, True), None
+    monkeypatch.setattr(refresh_scheduler, 'poll_rooms', fake_poll_rooms)
+
+    scheduler = RefreshScheduler()
+    now = time.time()
+    # 只对第二个关注者到期
+    scheduler._poll_states[('u1', ROOM_URL)] = {'next_poll_at': now + 600}
+    scheduler._poll_states[('u2', ROOM_URL)] = {'next_poll_at': now - 1}
+    scheduler.run_due()
+
+    assert fetched_by == ['u2']
+    assert scheduler.stats['fetched'] == 1
+    assert scheduler.stats['shared'] == 1
+    # 结果同样写入未到期关注者的缓存
+    assert load_cached_data(ROOM_URL, 'u1')['is_live'] is True
+
+def test_first_polls_are_spread_across_the_interval(monkeypatch):
+    urls = [f'https://live.douyin.com/{i}' for i in range(20)]
+    save_users({'u1': {'username': 'u1'}})
+    save_rooms_data(urls, 'u1')
+    monkeypatch.setattr(refresh_scheduler, 'poll_rooms', lambda urls, *args, **kwargs: [])
+
+    scheduler = RefreshScheduler()
+    interval = scheduler.user_interval('u1')
+    start = time.time()
+    scheduler.run_due()
+
+    offsets = [scheduler._poll_states[('u1', url)]['next_poll_at'] - start for url in urls]
+    assert all(0 <= offset < interval + 1 for offset in offsets)
+    # 按URL哈希错开，而不是同时到期
+    assert scheduler.stats['due'] < len(urls) // 2
+    assert max(offsets) - min(offsets) > interval / 2
+
+def test_spread_fraction_is_stable():
+    fraction = spread_fraction(ROOM_URL)
+    assert 0 <= fraction < 1
+    assert spread_fraction(ROOM_URL) == fraction
+    assert spread_fraction('https://live.douyin.com/2') != fraction
+
+def test_next_wait_is_clamped_to_tick_bounds():
+    scheduler = RefreshScheduler(tick_interval=30, min_tick_interval=1)
+    assert scheduler._next_wait() == 30
+
+    scheduler._poll_states[('u1', ROOM_URL)] = {'next_poll_at': time.time() + 10}
+    assert 9 < scheduler._next_wait() <= 10
+
+    scheduler._poll_states[('u1', ROOM_URL)] = {'next_poll_at': time.time() - 10}
+    assert scheduler._next_wait() == 1
@@ -0,0 +1,175 @@
+"""重试预算、退避抖动与对冲请求"""
+
+import threading
+
+import pytest
+
+from tools import http_client, retry_policy
+from tools.latency_tracker import get_latency_tracker
+from tools.retry_policy import RetryBudget, backoff_delay, get_retry_policy, hedge_delay
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class FakeResponse:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_budget_floor_allows_one_extra_request_per_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry_policy.time, 'monotonic', clock)
+    budget = RetryBudget(ratio=0.1, min_retries=1, window=10)
+    for _ in range(3):
+        budget.record_request()
+
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw('hedges')
+    assert budget.get_stats()['denied'] == 1
+
+    clock.now += 11
+    budget.record_request()
+    assert budget.try_withdraw()
+
+def test_budget_scales_with_request_volume():
+    budget = RetryBudget(ratio=0.1, min_retries=1, window=10)
+    for _ in range(50):
+        budget.record_request()
+
+    assert sum(budget.try_withdraw() for _ in range(10)) == 5
+
+def test_default_policy_keeps_amplification_low():
+    policy = get_retry_policy('douyu')
+    assert policy['budget_min_retries'] <= 2
+    assert policy['hedge'] is True
+    assert get_retry_policy('douyin')['max_attempts'] == 2
+
+def test_backoff_delay_is_jittered_within_ceiling():
+    policy = {'base_delay': 0.2, 'max_delay': 1.0}
+    delays = [backoff_delay(policy, 2) for _ in range(200)]
+
+    assert all(0 <= delay <= 0.8 for delay in delays)
+    assert len(set(delays)) > 100
+    assert all(backoff_delay(policy, 10) <= 1.0 for _ in range(50))
+
+def test_hedge_delay_needs_samples(performance_settings):
+    performance_settings({'timeouts': {'min_samples': 3}})
+    policy = dict(get_retry_policy('douyu'), hedge_percentile=50, hedge_min_delay=0.05)
+    tracker = get_latency_tracker('douyu')
+    tracker.record(0.3)
+    assert hedge_delay('douyu', policy) is None
+
+    tracker.record(0.3)
+    tracker.record(0.01)
+    assert hedge_delay('douyu', policy) == 0.3
+    assert hedge_delay('douyu', dict(policy, hedge=False)) is None
+
+@pytest.fixture
+def hedge_pool(performance_settings, monkeypatch):
+    performance_settings({'retry': {'hedge_max_concurrent': 1}})
+    monkeypatch.setattr(http_client, '_hedge_pool', None)
+
+def slow_then_fast():
+    """第一次调用等到第二次调用完成后才返回"""
+    second_done = threading.Event()
+    calls = []
+
+    def send():
+        index = len(calls)
+        calls.append(threading.current_thread().name)
+        if index == 0:
+            second_done.wait(5)
+            return FakeResponse('primary')
+        second_done.set()
+        return FakeResponse('hedge')
+    return send, calls
+
+def test_slow_request_is_hedged_and_hedge_wins(hedge_pool):
+    budget = RetryBudget(min_retries=1)
+    send, calls = slow_then_fast()
+
+    response = http_client._send_hedged('douyu', 0.05, budget, send)
+
+    assert response.name == 'hedge'
+    assert len(calls) == 2
+    assert budget.get_stats()['hedge_wins'] == 1
+
+def test_no_hedge_when_budget_exhausted(hedge_pool):
+    budget = RetryBudget(min_retries=0)
+
+    def send():
+        threading.Event().wait(0.2)
+        return FakeResponse('primary')
+
+    assert http_client._send_hedged('douyu', 0.01, budget, send).name == 'primary'
+    assert budget.get_stats()['denied'] == 1
+
+def test_failed_first_result_waits_for_the_other(hedge_pool):
+    budget = RetryBudget(min_retries=1)
+    second_done = threading.Event()
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) == 1:
+            second_done.wait(5)
+            return FakeResponse('primary')
+        second_done.set()
+        raise ConnectionError('对冲失败')
+
+    assert http_client._send_hedged('douyu', 0.05, budget, send).name == 'primary'
+
+def test_hedging_is_bounded_by_shared_pool(hedge_pool):
+    budget = RetryBudget(min_retries=10)
+    executor, slots = http_client._get_hedge_pool()
+    assert executor._max_workers == 2
+
+    # 名额被占用时不对冲，直接在调用线程发送
+    threads = []
+
+    def send_inline():
+        threads.append(threading.current_thread())
+        return FakeResponse('inline')
+
+    slots.acquire()
+    try:
+        assert http_client._send_hedged('douyu', 0.01, budget, send_inline).name == 'inline'
+        assert threads == [threading.current_thread()]
+    finally:
+        slots.release()
+
+    # 两个请求都结束后名额归还
+    send, calls = slow_then_fast()
+    http_client._send_hedged('douyu', 0.05, budget, send)
+    for _ in range(100):
+        if slots.acquire(blocking=False):
+            slots.release()
+            break
+        threading.Event().wait(0.01)
+    else:
+        raise AssertionError('对冲名额没有归还')
+
+def test_request_retries_server_errors_within_budget(stub_server):
+    statuses = iter([503, 200])
+    stub_server.routes[('GET', '/status')] = lambda query, body: (next(statuses), {'code': 0})
+
+    response = http_client.get('douyu', f'{stub_server.url}/status')
+
+    assert response.status_code == 200
+    assert len(stub_server.requests) == 2
+
+def test_request_stops_retrying_when_budget_is_spent(stub_server, performance_settings):
+    performance_settings({'retry': {'default': {'budget_min_retries': 1}}})
+    stub_server.routes[('GET', '/status')] = lambda query, body: (503, {'code': -1})
+
+    assert http_client.get('douyu', f'{stub_server.url}/status').status_code == 503
+    assert len(stub_server.requests) == 2
+    assert http_client.get('douyu', f'{stub_server.url}/status').status_code == 503
+    assert len(stub_server.requests) == 3
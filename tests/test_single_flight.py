@@ -0,0 +1,125 @@
+"""请求合并：并发获取只执行一次、结果复用窗口、加入方的时间预算"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools import room_refresher
+from tools.deadline import Deadline, DeadlineExceeded, deadline_scope
+from tools.single_flight import SingleFlight
+
+class Blocking:
+    """第一次调用阻塞到release()，之后的调用立即返回"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            self.released.wait(5)
+            if self.error is not None:
+                raise self.error
+        return {'calls': self.calls}
+
+    def release(self):
+        self.released.set()
+
+def wait_joined(flight, count):
+    for _ in range(500):
+        if flight.get_stats()['joined'] >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('加入的调用方不足')
+
+def test_concurrent_calls_share_one_fetch():
+    flight = SingleFlight(freshness=0)
+    fetch = Blocking()
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, 'room', fetch) for _ in range(4)]
+        fetch.started.wait(5)
+        wait_joined(flight, 3)
+        fetch.release()
+        results = [future.result(5) for future in futures]
+
+    assert fetch.calls == 1
+    assert results == [{'calls': 1}] * 4
+    # 每个调用方拿到独立的副本
+    results[0]['calls'] = 99
+    assert results[1] == {'calls': 1}
+
+def test_error_is_shared_and_not_cached():
+    flight = SingleFlight(freshness=10)
+    fetch = Blocking(error=ConnectionError('失败'))
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, 'room', fetch) for _ in range(2)]
+        fetch.started.wait(5)
+        wait_joined(flight, 1)
+        fetch.release()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result(5)
+
+    assert flight.do('room', fetch) == {'calls': 2}
+
+def test_fresh_result_is_reused_within_window():
+    flight = SingleFlight(freshness=10)
+    fetch = Blocking()
+    fetch.release()
+
+    flight.do('room', fetch)
+    flight.do('room', fetch)
+
+    assert fetch.calls == 1
+    assert flight.get_stats()['fresh_hits'] == 1
+
+def test_freshness_setting_is_read_on_each_call(performance_settings):
+    performance_settings({'single_flight': {'freshness': 0}})
+    flight = SingleFlight(freshness=room_refresher._snapshot_freshness)
+    fetch = Blocking()
+    fetch.release()
+
+    flight.do('room', fetch)
+    flight.do('room', fetch)
+    assert fetch.calls == 2
+
+    performance_settings({'single_flight': {'freshness': 10}})
+    flight.do('room', fetch)
+    flight.do('room', fetch)
+    assert fetch.calls == 3
+
+def test_joiner_gives_up_at_its_own_deadline():
+    flight = SingleFlight(freshness=0)
+    fetch = Blocking()
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(flight.do, 'room', fetch)
+        fetch.started.wait(5)
+        with deadline_scope(Deadline(0.1)):
+            with pytest.raises(DeadlineExceeded):
+                flight.do('room', fetch)
+        fetch.release()
+        assert leader.result(5) == {'calls': 1}
+
+def test_joiner_retries_after_leader_deadline():
+    flight = SingleFlight(freshness=0)
+    fetch = Blocking(error=DeadlineExceeded('发起方预算用完'))
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, 'room', fetch)
+        fetch.started.wait(5)
+        joiner = pool.submit(flight.do, 'room', fetch)
+        wait_joined(flight, 1)
+        fetch.release()
+
+        with pytest.raises(DeadlineExceeded):
+            leader.result(5)
+        assert joiner.result(5) == {'calls': 2}
+    assert flight.get_stats()['retried'] == 1
@@ -0,0 +1,61 @@
+"""出站请求流量统计：分桶计数与峰均比"""
+
+from tools import traffic_meter
+from tools.traffic_meter import TrafficMeter, record_outbound, get_traffic_stats, ALL_PLATFORMS
+
+def test_even_traffic_has_peak_to_mean_one():
+    meter = TrafficMeter(bucket_seconds=10, window=100)
+    for second in range(0, 50, 5):
+        meter.record(second)
+
+    stats = meter.get_stats(50)
+
+    assert stats['requests'] == 10
+    assert stats['peak'] == 2
+    assert stats['peak_to_mean'] == 1
+    assert stats['rate'] == 0.2
+
+def test_burst_then_idle_has_high_peak_to_mean():
+    meter = TrafficMeter(bucket_seconds=10, window=100)
+    for _ in range(10):
+        meter.record(1)
+
+    # 空闲的时间桶也计入平均值
+    stats = meter.get_stats(50)
+
+    assert stats['peak'] == 10
+    assert stats['mean'] == 2
+    assert stats['peak_to_mean'] == 5
+
+def test_current_bucket_is_not_counted():
+    meter = TrafficMeter(bucket_seconds=10, window=100)
+    meter.record(1)
+    meter.record(12)
+
+    assert meter.get_stats(5)['peak_to_mean'] is None
+    assert meter.get_stats(15)['requests'] == 1
+
+def test_buckets_outside_window_are_dropped():
+    meter = TrafficMeter(bucket_seconds=10, window=100)
+    meter.record(0)
+    meter.record(150)
+
+    stats = meter.get_stats(165)
+
+    assert stats['requests'] == 1
+    # 统计范围只覆盖窗口内已结束的时间桶
+    assert stats['mean'] == 0.111
+
+def test_empty_meter_has_no_ratio():
+    assert TrafficMeter().get_stats(100)['peak_to_mean'] is None
+
+def test_record_outbound_counts_platform_and_total(monkeypatch):
+    monkeypatch.setattr(traffic_meter.time, 'monotonic', lambda: 1000)
+    record_outbound('douyu')
+    record_outbound('huya')
+
+    monkeypatch.setattr(traffic_meter.time, 'monotonic', lambda: 1010)
+    stats = get_traffic_stats()
+
+    assert stats['douyu']['requests'] == 1
+    assert stats[ALL_PLATFORMS]['requests'] == 2
@@ -0,0 +1,220 @@
+"""
+异步检测器
+基于aiohttp，复用各平台同步检测器的请求描述与解析逻辑
+
+异步检测器协议：
+    async fetch_snapshot(room_id, api_url=None) -> dict  直播间信息 + is_live + status_info
+    async extract_room_id(url) -> str                   从链接解析房间号
+"""
+
+import json
+import time
+import asyncio
+import aiohttp
+
+from . import http_client
+from .config_manager import load_performance_settings
+from .stream_scanner import StreamScanner
+from .page_decoding import declared_charset, decode_page
+from .circuit_breaker import get_breaker
+from .deadline import DeadlineExceeded, get_current_deadline
+from .egress_pool import DIRECT_ROUTE, choose_egress, record_egress_result
+from .fetch_tiers import plan_tiers, record_tier_success, record_tier_failure
+from .retry_policy import TransientError, get_retry_policy, get_retry_budget, hedge_delay
+from .rate_limiter import (
+    get_rate_limiter, classify_status, RateLimitTimeout, OUTCOME_ERROR, OUTCOME_TIMEOUT, OUTCOME_CANCELLED
+)
+
+# aiohttp原生支持的出口类型（socks代理只用于同步请求）
+ASYNC_EGRESS_SCHEMES = (DIRECT_ROUTE, 'http')
+
+class AsyncChecker:
+    """把同步检测器适配为异步检测器"""
+
+    def __init__(self, checker_class, session, semaphore=None, timeout=10):
+        """
+        Args:
+            checker_class (class): 平台同步检测器类
+            session (aiohttp.ClientSession): 共享的HTTP会话
+            semaphore (asyncio.Semaphore): 全局在途请求数限制，可选
+            timeout (int): 单次请求的总超时上限（秒），连接与读超时使用平台的自适应超时
+        """
+        self.checker_class = checker_class
+        self.session = session
+        self.semaphore = semaphore
+        self.timeout = timeout
+
+    @property
+    def platform_key(self):
+        return self.checker_class.PLATFORM_KEY
+
+    async def _request(self, request_spec):
+        """发送异步请求并按检测器声明的响应类型返回内容，瞬时失败按平台策略重试"""
+        policy = get_retry_policy(self.platform_key)
+        budget = get_retry_budget(self.platform_key)
+        budget.record_request()
+
+        attempt = 0
+        while True:
+            try:
+                return await self._send_hedged(request_spec, policy, budget)
+            except TransientError as e:
+                retry_in = http_client.plan_retry(
+                    self.platform_key, request_spec['url'], policy, budget, attempt, policy['max_attempts'], e
+                )
+                if retry_in is None:
+                    raise
+            await asyncio.sleep(retry_in)
+            attempt += 1
+
+    async def _send_hedged(self, request_spec, policy, budget):
+        """超过平台延迟分位数仍未返回时再发一个对冲请求，取先成功的结果并取消另一个"""
+        delay = hedge_delay(self.platform_key, policy)
+        if delay is None:
+            return await self._send(request_spec)
+
+        tasks = [asyncio.ensure_future(self._send(request_spec))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not budget.try_withdraw('hedges'):
+                return await tasks[0]
+
+            tasks.append(asyncio.ensure_future(self._send(request_spec)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            budget.record_hedge_win()
+                        return task.result()
+            # 两个请求都失败时以原请求的错误为准
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _send(self, request_spec):
+        """在全局在途请求数限制内发送一次请求"""
+        if self.semaphore is not None:
+            async with self.semaphore:
+                return await self._do_request(request_spec)
+        return await self._do_request(request_spec)
+
+    async def _do_request(self, request_spec):
+        # 与同步请求共用站点熔断器、平台限流器和刷新时间预算
+        deadline = get_current_deadline()
+        if deadline is not None:
+            deadline.check()
+
+        breaker = get_breaker(request_spec['url'])
+        breaker.acquire()
+
+        limiter = get_rate_limiter(self.platform_key)
+        try:
+            await limiter.acquire_async(max_wait=min(limiter.max_wait, deadline.remaining()) if deadline else None)
+        except RateLimitTimeout:
+            breaker.cancel()
+            if deadline is not None:
+                deadline.check()
+            raise
+        except BaseException:
+            breaker.cancel()
+            raise
+
+        route = choose_egress(
+            self.platform_key,
+            request_spec.get('egress_key') or f"{request_spec['url']}|{request_spec.get('params')}",
+            ASYNC_EGRESS_SCHEMES
+        )
+
+        start = time.monotonic()
+        headers_at = None
+        outcome = OUTCOME_CANCELLED
+        try:
+            connect_timeout, read_timeout = http_client.resolve_timeout(self.platform_key)
+            outcome = OUTCOME_ERROR
+            async with self.session.get(
+                request_spec['url'],
+                params=request_spec.get('params'),
+                headers={**self.checker_class.DEFAULT_HEADERS, **request_spec.get('headers', {})},
+                proxy=route if route not in (None, DIRECT_ROUTE) else None,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, sock_connect=connect_timeout, sock_read=read_timeout
+                )
+            ) as response:
+                headers_at = time.monotonic()
+                outcome = classify_status(response.status)
+                self.checker_class.record_response(
+                    request_spec, response.status, {name: morsel.value for name, morsel in response.cookies.items()}
+                )
+                response.raise_for_status()
+                if self.checker_class.use_streaming(request_spec):
+                    return await self._read_streamed(response, request_spec['stream_markers'])
+                # 直接处理字节，避免aiohttp在缺少charset时做编码探测
+                body = await response.read()
+                if request_spec.get('response_type', self.checker_class.RESPONSE_TYPE) == 'json':
+                    return json.loads(body)
+                return decode_page(body, response.headers.get('Content-Type'))
+        except asyncio.TimeoutError as e:
+            if deadline is not None and deadline.expired:
+                outcome = OUTCOME_CANCELLED
+                raise DeadlineExceeded(f"超出刷新时间预算（{deadline.seconds:g}秒）") from e
+            outcome = OUTCOME_TIMEOUT
+            raise TransientError(f"网络请求超时: {e}")
+        except asyncio.CancelledError:
+            outcome = OUTCOME_CANCELLED
+            raise
+        except aiohttp.ClientResponseError as e:
+            if e.status in get_retry_policy(self.platform_key)['retry_statuses']:
+                raise TransientError(f"网络请求失败: {e}")
+            raise ConnectionError(f"网络请求失败: {e}")
+        except aiohttp.ClientError as e:
+            raise TransientError(f"网络请求失败: {e}")
+        finally:
+            latency = (headers_at or time.monotonic()) - start
+            http_client.settle_request(self.platform_key, request_spec['url'], limiter, breaker, outcome, latency)
+            record_egress_result(self.platform_key, route, outcome, latency, responded=headers_at is not None)
+
+    async def _read_streamed(self, response, markers):
+        """按标记流式读取响应体，全部找到后关闭连接"""
+        settings = load_performance_settings()['streaming']
+        scanner = StreamScanner(markers, declared_charset(response.headers.get('Content-Type')), settings['tail_size'])
+        stopped_early = False
+
+        async for chunk in response.content.iter_chunked(settings['chunk_size']):
+            if scanner.feed_bytes(chunk):
+                stopped_early = True
+                break
+
+        if stopped_early:
+            response.close()
+        http_client.record_stream(self.platform_key, scanner.bytes_read, stopped_early)
+        return scanner.finish()
+
+    async def extract_room_id(self, url):
+        """从链接中解析房间号，需要页面的平台会异步请求页面"""
+        if not self.checker_class.ROOM_ID_NEEDS_PAGE:
+            return self.checker_class.extract_room_id(url)
+
+        self.checker_class.validate_url(url)
+        html_content = await self._request(self.checker_class.build_room_id_request(url))
+        return self.checker_class.parse_room_id(html_content, url)
+
+    async def fetch_snapshot(self, room_id, api_url=None):
+        """一次请求同时获取直播状态和直播间信息，分层获取的平台依次尝试各层级"""
+        checker_class = self.checker_class
+        if len(checker_class.SNAPSHOT_TIERS) == 1:
+            payload = await self._request(checker_class.build_room_request(room_id, api_url))
+            return checker_class.parse_snapshot(payload, room_id)
+
+        tiers = plan_tiers(self.platform_key, checker_class.SNAPSHOT_TIERS)
+        for index, tier in enumerate(tiers):
+            try:
+                payload = await self._request(checker_class.build_tier_request(tier, room_id, api_url))
+                snapshot = checker_class.parse_tier_snapshot(tier, payload, room_id)
+            except Exception as e:
+                record_tier_failure(self.platform_key, tier, e, index == len(tiers) - 1)
+                continue
+            return record_tier_success(self.platform_key, tier, snapshot)
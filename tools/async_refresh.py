@@ -0,0 +1,155 @@
+"""
+异步刷新引擎
+在单个事件循环中驱动大量直播间的刷新，通过全局信号量限制同时在途的请求数。
+每个直播间在发请求前向全局刷新队列预约名额（见refresh_queue），
+与线程池刷新共享优先级、平台并发、用户并发上限和积压丢弃
+"""
+
+import asyncio
+import aiohttp
+
+from .platform_factory import PlatformFactory
+from .async_checker import AsyncChecker
+from .config_manager import load_performance_settings
+from .room_id_cache import get_cached_room_id, store_room_id, confirm_room_id
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceeded, deadline_scope
+from .refresh_queue import RefreshShedError, load_special_rooms, room_priority
+from .room_refresher import (
+    get_douyin_api_url, build_room_result, build_prefetched_result,
+    save_room_result, keep_cached_result, summarize_outcomes,
+    reserve_refresh_slot, release_refresh_slot
+)
+
+class AsyncRefreshEngine:
+    """异步批量刷新引擎"""
+
+    def __init__(self, max_in_flight=None, timeout=None):
+        """
+        Args:
+            max_in_flight (int): 全局同时在途的请求数上限，None表示使用性能设置
+            timeout (int): 单次请求超时（秒），None表示使用性能设置
+        """
+        settings = load_performance_settings()['async_refresh']
+        self.max_in_flight = max_in_flight or settings.get('max_in_flight', 200)
+        self.timeout = timeout or settings.get('timeout', 10)
+
+    async def fetch_room(self, url, checker, douyin_api_url_base):
+        """获取单个直播间的最新数据（不读写缓存）"""
+        checker_class = checker.checker_class
+
+        # 需要请求页面才能得到房间号的平台优先使用房间号解析缓存
+        room_id = get_cached_room_id(url) if checker_class.ROOM_ID_NEEDS_PAGE else None
+        if not room_id:
+            room_id = await checker.extract_room_id(url)
+            if checker_class.ROOM_ID_NEEDS_PAGE:
+                store_room_id(url, room_id)
+
+        douyin_api_url = get_douyin_api_url(checker_class, douyin_api_url_base)
+        snapshot = await checker.fetch_snapshot(room_id, douyin_api_url)
+        confirm_room_id(url, room_id, snapshot.get('resolved_room_id'))
+        return build_room_result(url, room_id, snapshot, snapshot['is_live'], snapshot['status_info'])
+
+    async def fetch_queued(self, url, checker, douyin_api_url_base, user_id, priority):
+        """在刷新队列取得名额后获取直播间数据，结束或被取消时归还名额"""
+        slot = reserve_refresh_slot(checker.checker_class, user_id, priority)
+        try:
+            await asyncio.wrap_future(slot)
+            return await self.fetch_room(url, checker, douyin_api_url_base)
+        finally:
+            release_refresh_slot(slot)
+
+    async def fetch_rooms(self, urls, douyin_api_url_base, deadline=None, user_id=None, priorities=None):
+        """
+        并发获取多个直播间的最新数据
+
+        Args:
+            deadline (Deadline): 截止时间，到期仍未完成（包括还在排队）的直播间以DeadlineExceeded失败
+            user_id (str): 发起刷新的用户，指定时每个直播间先在刷新队列预约名额，None表示不经过队列
+            priorities (dict): 直播间URL → 队列优先级，见refresh_queue
+
+        Returns:
+            list: [(url, 房间数据 或 None, 异常 或 None), ...]，顺序与urls一致
+        """
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def run(url):
+                try:
+                    checker_class = PlatformFactory.get_platform_checker(url)
+                    checker = AsyncChecker(checker_class, session, semaphore, self.timeout)
+                    if deadline is not None:
+                        deadline.check()
+                    if user_id is None:
+                        fetch = self.fetch_room(url, checker, douyin_api_url_base)
+                    else:
+                        fetch = self.fetch_queued(url, checker, douyin_api_url_base, user_id, priorities[url])
+                    if deadline is None:
+                        return url, await fetch, None
+
+                    try:
+                        result = await asyncio.wait_for(fetch, deadline.remaining())
+                    except asyncio.TimeoutError:
+                        # 单次请求自身超时会被转换为ConnectionError，这里只会是预算用完
+                        raise DeadlineExceeded(f"超出刷新时间预算（{deadline.seconds:g}秒）")
+                    return url, result, None
+                except Exception as e:
+                    return url, None, e
+
+            return await asyncio.gather(*(run(url) for url in urls))
+
+    def refresh_rooms(self, urls, user_id, douyin_api_url_base, prefetched=None, deadline=None):
+        """
+        同步入口：异步获取全部直播间后合并写入缓存
+
+        Args:
+            prefetched (dict): 批量预取得到的 {url: (room_id, 快照)}，可选
+            deadline (Deadline): 截止时间，到期未完成的直播间返回缓存数据
+
+        Returns:
+            tuple: (updated_rooms, changed_rooms, failed_rooms)，顺序与urls一致
+        """
+        return summarize_outcomes(self.refresh_outcomes(urls, user_id, douyin_api_url_base, prefetched, deadline))
+
+    def refresh_outcomes(self, urls, user_id, douyin_api_url_base, prefetched=None, deadline=None):
+        """
+        与refresh_rooms相同，但返回未汇总的逐个结果
+
+        Returns:
+            list: [(url, (merged_result, has_changes) 或 None, 异常 或 None), ...]，顺序与urls一致
+        """
+        results = {}
+        for url, room_snapshot in (prefetched or {}).items():
+            result = build_prefetched_result(url, room_snapshot, user_id)
+            if result is not None:
+                results[url] = (url, result, None)
+
+        pending_urls = [url for url in urls if url not in results]
+        special_rooms = load_special_rooms(user_id)
+        priorities = {url: room_priority(url, user_id, special_rooms) for url in pending_urls}
+        # 截止时间通过上下文传给各请求，用于限制单次请求的超时
+        with deadline_scope(deadline):
+            fetched_rooms = asyncio.run(
+                self.fetch_rooms(pending_urls, douyin_api_url_base, deadline, user_id, priorities)
+            )
+        for fetched in fetched_rooms:
+            results[fetched[0]] = fetched
+
+        outcomes = []
+        for url, result, error in (results[url] for url in urls):
+            try:
+                if isinstance(error, CircuitOpenError):
+                    outcomes.append((url, keep_cached_result(url, user_id, error), None))
+                elif isinstance(error, DeadlineExceeded):
+                    outcomes.append((url, keep_cached_result(url, user_id, error, deadline_exceeded=True), None))
+                elif isinstance(error, RefreshShedError):
+                    outcomes.append((url, keep_cached_result(url, user_id, error), None))
+                elif error is not None:
+                    outcomes.append((url, None, error))
+                else:
+                    outcomes.append((url, save_room_result(url, result, user_id), None))
+            except Exception as e:
+                outcomes.append((url, None, e))
+
+        return outcomes
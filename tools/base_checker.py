@@ -0,0 +1,185 @@
+"""
+检测器基类
+各平台检测器只需声明请求描述（build_*_request）和解析逻辑（parse_*），
+同步接口与异步引擎共用这两部分，只在网络请求方式上不同
+"""
+
+import requests
+
+from . import http_client
+from .config_manager import load_performance_settings
+from .page_decoding import decode_page
+from .fetch_tiers import PAGE_TIER, plan_tiers, record_tier_success, record_tier_failure
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+class BaseChecker:
+    PLATFORM_NAME = ""
+    PLATFORM_KEY = ""
+    BASE_URL = ""
+
+    # 直播间接口的响应类型：'text'（HTML页面）或 'json'
+    RESPONSE_TYPE = 'text'
+    # 提取房间号是否需要请求直播间页面
+    ROOM_ID_NEEDS_PAGE = False
+    # 获取失败时占位数据中的人气值
+    FAILED_POPULAR_NUM = '0'
+    # 流式读取直播间页面时需要找到的标记组（见stream_scanner），None表示读取完整响应
+    SNAPSHOT_MARKERS = None
+    # 页面字段提取器（见extractor），None表示解析方法直接处理原始响应
+    PAGE_EXTRACTOR = None
+    # 直播间数据的获取层级（见fetch_tiers），按优先级排列，最后一个为兜底层级；
+    # page对应build_room_request/parse_snapshot，其他层级对应build_<层级>_request/parse_<层级>_snapshot
+    SNAPSHOT_TIERS = (PAGE_TIER,)
+    # 平台会话的默认请求头
+    DEFAULT_HEADERS = {
+        'User-Agent': DEFAULT_USER_AGENT
+    }
+
+    @classmethod
+    def build_room_request(cls, room_id, api_url=None):
+        """
+        构建获取直播间数据的请求描述
+
+        Returns:
+            dict: 包含url，以及可选的params、headers（与DEFAULT_HEADERS合并后发送）、
+                  stream_markers（流式读取时的标记组）、response_type（默认为RESPONSE_TYPE）、
+                  egress_key（sticky出口分配的固定键）
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def build_tier_request(cls, tier, room_id, api_url=None):
+        """构建某个获取层级的请求描述"""
+        if tier == PAGE_TIER:
+            return cls.build_room_request(room_id, api_url)
+        return getattr(cls, f'build_{tier}_request')(room_id)
+
+    @classmethod
+    def parse_tier_snapshot(cls, tier, payload, room_id):
+        """解析某个获取层级的响应，轻量层级缺少必要字段时抛出ValueError"""
+        if tier == PAGE_TIER:
+            return cls.parse_snapshot(payload, room_id)
+        return getattr(cls, f'parse_{tier}_snapshot')(payload, room_id)
+
+    @classmethod
+    def extract_fields(cls, payload):
+        """用页面字段提取器提取全部字段，已提取过的结果原样返回"""
+        if cls.PAGE_EXTRACTOR is None:
+            return payload
+        return cls.PAGE_EXTRACTOR.extract(payload)
+
+    @classmethod
+    def parse_live_status(cls, payload):
+        """从响应内容中解析直播状态，返回 (是否直播中, 状态信息)"""
+        raise NotImplementedError
+
+    @classmethod
+    def parse_room_info(cls, payload, room_id):
+        """从响应内容中解析直播间详细信息"""
+        raise NotImplementedError
+
+    @classmethod
+    def parse_resolved_room_id(cls, payload):
+        """从响应内容中解析页面实际对应的房间号，无法确定时返回None"""
+        return None
+
+    @classmethod
+    def record_response(cls, request_spec, status_code, cookies):
+        """收到响应后的回调（同步与异步请求共用），默认不处理"""
+
+    @classmethod
+    def failed_room_info(cls, room_id):
+        """获取失败时返回的占位信息"""
+        return {
+            'platform': cls.PLATFORM_NAME,
+            'title': '',
+            'anchor': '',
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'avatar': '',
+            'cover': '',
+            'popular_num': cls.FAILED_POPULAR_NUM,
+            'fetch_status': 'failed'
+        }
+
+    @classmethod
+    def parse_snapshot(cls, payload, room_id):
+        """
+        从同一份响应中同时解析直播状态和直播间信息
+
+        状态解析失败时抛出异常；信息解析失败时使用占位信息
+        """
+        # 声明了字段提取器的平台只提取一次，各解析方法共用结果
+        payload = cls.extract_fields(payload)
+        is_live, status_info = cls.parse_live_status(payload)
+
+        try:
+            room_info = cls.parse_room_info(payload, room_id)
+        except Exception:
+            room_info = cls.failed_room_info(room_id)
+
+        room_info['is_live'] = is_live
+        room_info['status_info'] = status_info
+
+        resolved_room_id = cls.parse_resolved_room_id(payload)
+        if resolved_room_id:
+            room_info['resolved_room_id'] = resolved_room_id
+        return room_info
+
+    @classmethod
+    def fetch_snapshot(cls, room_id, api_url=None):
+        """
+        一次请求同时获取直播状态和直播间信息
+
+        声明了多个获取层级时依次尝试，某一层失败或缺少字段时改用下一层
+
+        Returns:
+            dict: 直播间信息，附带is_live和status_info字段；分层获取时附带tier（数据来源层级）
+        """
+        if len(cls.SNAPSHOT_TIERS) == 1:
+            payload = cls._request(cls.build_room_request(room_id, api_url))
+            return cls.parse_snapshot(payload, room_id)
+
+        tiers = plan_tiers(cls.PLATFORM_KEY, cls.SNAPSHOT_TIERS)
+        for index, tier in enumerate(tiers):
+            try:
+                payload = cls._request(cls.build_tier_request(tier, room_id, api_url))
+                snapshot = cls.parse_tier_snapshot(tier, payload, room_id)
+            except Exception as e:
+                record_tier_failure(cls.PLATFORM_KEY, tier, e, index == len(tiers) - 1)
+                continue
+            return record_tier_success(cls.PLATFORM_KEY, tier, snapshot)
+
+    @staticmethod
+    def use_streaming(request_spec):
+        """请求是否按标记流式读取"""
+        return bool(request_spec.get('stream_markers')) and load_performance_settings()['streaming']['enabled']
+
+    @classmethod
+    def _request(cls, request_spec):
+        """发送同步请求并按响应类型返回内容"""
+        stream = cls.use_streaming(request_spec)
+        try:
+            response = http_client.get(
+                cls.PLATFORM_KEY,
+                request_spec['url'],
+                params=request_spec.get('params'),
+                headers=request_spec.get('headers'),
+                default_headers=cls.DEFAULT_HEADERS,
+                egress_key=request_spec.get('egress_key'),
+                stream=stream
+            )
+            cls.record_response(request_spec, response.status_code, response.cookies.get_dict())
+            if stream:
+                if not response.ok:
+                    response.close()
+                response.raise_for_status()
+                return http_client.read_streamed(cls.PLATFORM_KEY, response, request_spec['stream_markers'])
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ConnectionError(f"网络请求失败: {e}")
+
+        if request_spec.get('response_type', cls.RESPONSE_TYPE) == 'json':
+            return response.json()
+        # 不用response.text：响应头缺少charset时requests会对整个页面做编码探测
+        return decode_page(response.content, response.headers.get('Content-Type'))
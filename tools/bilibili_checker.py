@@ -2,133 +2,263 @@
 哔哩哔哩直播间状态检测工具
 """
 
-import requests
 import re
-import json
 import uuid
 import time
 from urllib.parse import urlparse
 
-class BilibiliChecker:
+from . import http_client
+from .base_checker import BaseChecker, DEFAULT_USER_AGENT
+from .identity_pool import get_identity_pool
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceeded
+
+# 直播状态映射
+LIVE_STATUS_MAP = {0: "未开播", 1: "直播中", 2: "轮播中"}
+
+class BilibiliChecker(BaseChecker):
     PLATFORM_NAME = "哔哩哔哩"
+    PLATFORM_KEY = "bilibili"
     BASE_URL = "https://live.bilibili.com"
-    
+    API_BASE_URL = "https://api.live.bilibili.com"
+    RESPONSE_TYPE = 'json'
+    FAILED_POPULAR_NUM = ''
+    DEFAULT_HEADERS = {
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Origin': 'https://live.bilibili.com',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br'
+    }
+
     @classmethod
     def extract_room_id(cls, url):
         """从B站URL提取房间号"""
         parsed_url = urlparse(url)
         if 'bilibili.com' not in parsed_url.netloc:
             raise ValueError(f"域名不是bilibili.com: {url}")
-        
+
         # 提取房间号
         room_id_match = re.search(r'live\.bilibili\.com/(\d+)', url)
         if room_id_match:
             return room_id_match.group(1)
-        
+
         # 备选方案：从URL路径中提取
         path = parsed_url.path.strip('/')
         if path and path.isdigit():
             return path
-        
+
         raise ValueError(f"无法从链接中提取房间号: {url}")
-    
-    @classmethod
-    def check_live_status(cls, room_id):
-        """检查直播间状态"""
-        api_url = f"https://api.live.bilibili.com/xlive/web-room/v1/index/getInfoByRoom?room_id={room_id}"
-        
-        # 生成随机设备ID和会话ID
+
+    @staticmethod
+    def new_device_cookies():
+        """生成新设备身份的初始Cookie（随机设备ID和会话ID）"""
         buvid3 = str(uuid.uuid4()).replace('-', '').upper()[:32]
         buvid4 = str(uuid.uuid4()).replace('-', '').upper()[:32]
         rpdid = f"|u-{int(time.time())}||t-{int(time.time())}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}',
-            'Origin': 'https://live.bilibili.com',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Cookie': f'buvid3={buvid3}; buvid4={buvid4}; rpdid={rpdid};'
+        return {'buvid3': buvid3, 'buvid4': buvid4, 'rpdid': rpdid}
+
+    @classmethod
+    def identity_pool(cls):
+        """持久设备身份池"""
+        return get_identity_pool(cls.PLATFORM_KEY, cls.new_device_cookies, '.bilibili.com')
+
+    @classmethod
+    def record_response(cls, request_spec, status_code, cookies):
+        """把响应结果和下发的Cookie记到所用的设备身份上"""
+        identity = request_spec.get('identity')
+        if identity is not None:
+            cls.identity_pool().report(identity, status_code, cookies)
+
+    @classmethod
+    def build_room_request(cls, room_id, api_url=None):
+        """构建getInfoByRoom接口请求"""
+        # 轮流使用池中的持久设备身份
+        identity = cls.identity_pool().acquire()
+
+        return {
+            'url': f"{cls.API_BASE_URL}/xlive/web-room/v1/index/getInfoByRoom",
+            'params': {'room_id': room_id},
+            'headers': {
+                'Referer': f'{cls.BASE_URL}/{room_id}',
+                'Cookie': identity.cookie_header()
+            },
+            'identity': identity,
+            # sticky出口分配时同一设备身份固定走同一出口
+            'egress_key': identity.identity_id
         }
-        
+
+    @classmethod
+    def parse_live_status(cls, data):
+        """从getInfoByRoom响应中解析直播状态"""
+        if data.get('code') != 0:
+            return False, data.get('message', 'API错误')
+
+        # 获取直播状态
+        room_info = data['data']['room_info']
+        live_status = room_info['live_status']
+
+        # 状态映射
+        status_text = LIVE_STATUS_MAP.get(live_status, f"未知状态({live_status})")
+
+        return live_status == 1, status_text
+
+    @classmethod
+    def check_live_status(cls, room_id):
+        """检查直播间状态"""
         try:
-            response = requests.get(api_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get('code') != 0:
-                return False, data.get('message', 'API错误')
-            
-            # 获取直播状态
-            room_info = data['data']['room_info']
-            live_status = room_info['live_status']
-            
-            # 状态映射
-            live_status_map = {0: "未开播", 1: "直播中", 2: "轮播中"}
-            status_text = live_status_map.get(live_status, f"未知状态({live_status})")
-            
-            return live_status == 1, status_text
-            
-        except requests.RequestException as e:
-            raise ConnectionError(f"网络请求失败: {e}")
+            data = cls._request(cls.build_room_request(room_id))
+            return cls.parse_live_status(data)
+        except ConnectionError:
+            raise
         except Exception as e:
             raise Exception(f"检查直播状态失败: {e}")
-    
+
+    @classmethod
+    def parse_room_info(cls, data, room_id):
+        """从getInfoByRoom响应中解析直播间详细信息"""
+        if data.get('code') != 0:
+            raise Exception(f"API返回错误: {data.get('message', 'Unknown error')}")
+
+        # 提取数据
+        room_info = data['data']['room_info']
+        anchor_info = data['data']['anchor_info']['base_info']
+
+        # 构建返回数据
+        return {
+            'platform': cls.PLATFORM_NAME,
+            'title': room_info.get('title', '未知标题'),
+            'anchor': anchor_info.get('uname', '未知主播'),
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'avatar': anchor_info.get('face', ''),
+            'cover': room_info.get('cover', ''),
+            'popular_num': room_info.get('online', 0)
+        }
+
     @classmethod
     def get_room_info(cls, room_id):
         """获取直播间详细信息"""
-        api_url = f"https://api.live.bilibili.com/xlive/web-room/v1/index/getInfoByRoom?room_id={room_id}"
-        
-        # 生成随机设备ID和会话ID
-        buvid3 = str(uuid.uuid4()).replace('-', '').upper()[:32]
-        buvid4 = str(uuid.uuid4()).replace('-', '').upper()[:32]
-        rpdid = f"|u-{int(time.time())}||t-{int(time.time())}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}',
-            'Origin': 'https://live.bilibili.com',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Cookie': f'buvid3={buvid3}; buvid4={buvid4}; rpdid={rpdid};'
+        try:
+            data = cls._request(cls.build_room_request(room_id))
+            return cls.parse_room_info(data, room_id)
+        except Exception as e:
+            # 返回失败信息但不让程序崩溃
+            return cls.failed_room_info(room_id)
+
+    @classmethod
+    def _bulk_entry(cls, item, room_id, avatar=''):
+        """把批量接口中的单个房间数据转换为快照格式"""
+        live_status = item.get('live_status', 0)
+        return {
+            'platform': cls.PLATFORM_NAME,
+            'title': item.get('title', '未知标题'),
+            'anchor': item.get('uname', '未知主播'),
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'avatar': avatar,
+            'cover': item.get('cover') or item.get('cover_from_user', ''),
+            'popular_num': item.get('online', 0),
+            'is_live': live_status == 1,
+            'status_info': LIVE_STATUS_MAP.get(live_status, f"未知状态({live_status})"),
+            'uid': str(item.get('uid', '')),
+            'resolved_room_id': str(item.get('room_id', room_id))
         }
-        
+
+    @classmethod
+    def _bulk_request(cls, method, path, **kwargs):
+        """
+        发送批量接口请求并返回data字段
+
+        Raises:
+            CircuitOpenError: 接口处于熔断状态（原样抛出）
+            DeadlineExceeded: 刷新时间预算已用完（原样抛出）
+            ConnectionError: 其他请求失败
+        """
+        identity = cls.identity_pool().acquire()
         try:
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = http_client.request(
+                method,
+                cls.PLATFORM_KEY,
+                f"{cls.API_BASE_URL}{path}",
+                headers={'Referer': f'{cls.BASE_URL}/', 'Cookie': identity.cookie_header()},
+                default_headers=cls.DEFAULT_HEADERS,
+                egress_key=identity.identity_id,
+                **kwargs
+            )
+            cls.identity_pool().report(identity, response.status_code, response.cookies.get_dict())
             response.raise_for_status()
-            
             data = response.json()
-            if data.get('code') != 0:
-                raise Exception(f"API返回错误: {data.get('message', 'Unknown error')}")
-            
-            # 提取数据
-            room_info = data['data']['room_info']
-            anchor_info = data['data']['anchor_info']['base_info']
-            
-            # 构建返回数据
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': room_info.get('title', '未知标题'),
-                'anchor': anchor_info.get('uname', '未知主播'),
-                'url': f'{cls.BASE_URL}/{room_id}',
-                'avatar': anchor_info.get('face', ''),
-                'cover': room_info.get('cover', ''),
-                'popular_num': room_info.get('online', 0)
-            }
-            
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
-            # 返回失败信息但不让程序崩溃
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': '',
-                'anchor': '',
-                'url': f'{cls.BASE_URL}/{room_id}',
-                'avatar': '',
-                'cover': '',
-                'popular_num': '',
-                'fetch_status': 'failed'
-            }
\ No newline at end of file
+            raise ConnectionError(f"批量查询失败: {e}")
+
+        if data.get('code') != 0:
+            raise ConnectionError(f"批量查询失败: {data.get('message', 'API错误')}")
+        return data.get('data') or {}
+
+    @classmethod
+    def batch_check_live_status(cls, room_ids=None, uids=None, chunk_size=50):
+        """
+        批量查询直播状态
+
+        按房间号查询使用getRoomBaseInfo（不含头像），按UID查询使用get_status_info_by_uids；
+        某个分片失败只影响该分片内的房间
+
+        Args:
+            room_ids (list): 房间号列表（支持短号）
+            uids (list): 主播UID列表
+            chunk_size (int): 每次请求包含的最大数量
+
+        Returns:
+            dict: {房间号或UID: 快照}，查询不到的房间不会出现在结果中
+
+        Raises:
+            CircuitOpenError: 接口熔断时不再查询剩余分片
+            DeadlineExceeded: 刷新时间预算已用完
+        """
+        status_map = {}
+
+        room_ids = [str(room_id) for room_id in (room_ids or [])]
+        for start in range(0, len(room_ids), chunk_size):
+            chunk = room_ids[start:start + chunk_size]
+            try:
+                data = cls._bulk_request(
+                    'GET',
+                    '/xlive/web-room/v1/index/getRoomBaseInfo',
+                    params={'req_biz': 'web_room_componet', 'room_ids': chunk}
+                )
+            except CircuitOpenError:
+                raise
+            except ConnectionError as e:
+                print(f"哔哩哔哩批量查询失败（{len(chunk)}个房间）: {e}")
+                continue
+
+            by_room_ids = data.get('by_room_ids') or {}
+            for item in by_room_ids.values():
+                # 请求中使用的可能是短号，两种房间号都对应到同一条数据
+                for key in (str(item.get('room_id', '')), str(item.get('short_id', ''))):
+                    if key in chunk:
+                        status_map[key] = cls._bulk_entry(item, key)
+
+        uids = [str(uid) for uid in (uids or [])]
+        for start in range(0, len(uids), chunk_size):
+            chunk = uids[start:start + chunk_size]
+            try:
+                data = cls._bulk_request(
+                    'POST',
+                    '/room/v1/Room/get_status_info_by_uids',
+                    json={'uids': [int(uid) for uid in chunk]},
+                    # 只读查询，可以安全重试
+                    idempotent=True
+                )
+            except CircuitOpenError:
+                raise
+            except (ConnectionError, ValueError) as e:
+                print(f"哔哩哔哩批量查询失败（{len(chunk)}个主播）: {e}")
+                continue
+
+            for uid, item in data.items():
+                if str(uid) in chunk:
+                    status_map[str(uid)] = cls._bulk_entry(item, item.get('room_id', ''), item.get('face', ''))
+
+        return status_map
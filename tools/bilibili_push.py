@@ -0,0 +1,478 @@
+"""
+哔哩哔哩直播状态推送
+轮询getInfoByRoom时开播最晚要等一个刷新周期才能发现，而且每个周期每个直播间都要请求一次。
+哔哩哔哩直播间的消息WebSocket会推送LIVE（开播）和PREPARING（下播）事件：
+这里在后台线程的事件循环中为所有用户关注的哔哩哔哩直播间各维持一个订阅连接（共用一个会话），
+收到状态变化时直接写入各用户的直播间缓存；连接正常的直播间只按对账间隔轮询
+
+协议：每个数据包 = 16字节头（包长、头长、协议版本、操作码、序号，大端）+ 包体，
+协议版本2的包体是zlib压缩的多个数据包
+"""
+
+import json
+import time
+import zlib
+import random
+import struct
+import asyncio
+import threading
+
+import aiohttp
+
+from . import http_client
+from .bilibili_checker import BilibiliChecker
+from .platform_factory import PlatformFactory
+from .cache_manager import load_cached_data, save_cached_data, cache_entry_lock
+from .config_manager import load_performance_settings
+from .data_handler import load_saved_rooms
+from .user_manager import load_users
+from .utils import merge_room_data
+
+# 数据包头：包长、头长、协议版本、操作码、序号
+HEADER = struct.Struct('>IHHII')
+
+# 协议版本
+PROTO_JSON = 0
+PROTO_INT = 1
+PROTO_ZLIB = 2
+
+# 操作码
+OP_HEARTBEAT = 2
+OP_HEARTBEAT_REPLY = 3
+OP_MESSAGE = 5
+OP_AUTH = 7
+OP_AUTH_REPLY = 8
+
+# 推送事件对应的直播状态：(是否直播中, 状态信息)
+STATUS_COMMANDS = {
+    'LIVE': (True, '直播中'),
+    'PREPARING': (False, '未开播')
+}
+
+DANMU_INFO_URL = f"{BilibiliChecker.API_BASE_URL}/xlive/web-room/v1/index/getDanmuInfo"
+
+def encode_packet(op, body=b'', protover=PROTO_INT, seq=1):
+    """编码一个数据包"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return HEADER.pack(HEADER.size + len(body), HEADER.size, protover, op, seq) + body
+
+def decode_packets(data):
+    """
+    解码一帧中的全部数据包，展开zlib压缩的包；不完整的包丢弃
+
+    Yields:
+        tuple: (操作码, 包体字节)
+    """
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        packet_length, header_length, protover, op, _ = HEADER.unpack_from(data, offset)
+        if packet_length < header_length or offset + packet_length > len(data):
+            return
+        body = data[offset + header_length:offset + packet_length]
+        offset += packet_length
+
+        if protover == PROTO_ZLIB:
+            yield from decode_packets(zlib.decompress(body))
+        else:
+            yield op, body
+
+def parse_status_event(body):
+    """
+    从消息包体中解析开播、下播事件
+
+    Returns:
+        tuple: (是否直播中, 状态信息)，不是状态事件时返回None
+    """
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return None
+    # 部分消息的cmd带有后缀，如 DANMU_MSG:4:0:2:2:2:0
+    cmd = str(message.get('cmd', '')).split(':', 1)[0]
+    if cmd == 'PREPARING' and str(message.get('round')) == '1':
+        return False, '轮播中'
+    return STATUS_COMMANDS.get(cmd)
+
+def collect_subscriptions(max_rooms):
+    """
+    汇总所有用户关注的哔哩哔哩直播间
+
+    Returns:
+        dict: {房间号: [(用户ID, 直播间URL), ...]}，超过max_rooms时保留关注人数最多的直播间
+    """
+    subscriptions = {}
+    for user_id in load_users():
+        for url in load_saved_rooms(user_id):
+            try:
+                if PlatformFactory.get_platform_checker(url) is not BilibiliChecker:
+                    continue
+                room_id = BilibiliChecker.extract_room_id(url)
+            except ValueError:
+                continue
+            subscriptions.setdefault(room_id, []).append((user_id, url))
+
+    if len(subscriptions) > max_rooms:
+        kept = sorted(subscriptions, key=lambda room_id: len(subscriptions[room_id]), reverse=True)[:max_rooms]
+        subscriptions = {room_id: subscriptions[room_id] for room_id in kept}
+    return subscriptions
+
+class PushIngest:
+    """哔哩哔哩直播状态推送的接收服务"""
+
+    def __init__(self, url, fetch_token=True, heartbeat_interval=30, reconnect_base_delay=1,
+                 reconnect_max_delay=120, max_rooms=500, connect_interval=0.05, sync_interval=60,
+                 reconcile_interval=1800):
+        """
+        Args:
+            url (str): 消息服务器地址
+            fetch_token (bool): 是否先获取连接令牌
+            heartbeat_interval (float): 心跳间隔（秒）
+            reconnect_base_delay (float): 重连退避基数（秒）
+            reconnect_max_delay (float): 重连退避上限（秒）
+            max_rooms (int): 最多同时订阅的直播间数
+            connect_interval (float): 新建连接之间的间隔（秒），避免同时发起大量握手
+            sync_interval (float): 重新汇总关注列表的间隔（秒）
+            reconcile_interval (float): 推送覆盖的直播间的对账轮询间隔（秒）
+        """
+        self.url = url
+        self.fetch_token = fetch_token
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.max_rooms = max_rooms
+        self.connect_interval = connect_interval
+        self.sync_interval = sync_interval
+        self.reconcile_interval = reconcile_interval
+
+        # 房间号 → 订阅者、实际房间号（短号需要解析）、连接建立时间
+        self._subscribers = {}
+        self._real_ids = {}
+        self._connected = {}
+        # 直播间URL → 上次对账轮询时间；推送改变了数据、还没返回给用户的 (用户ID, URL)
+        self._reconciled_at = {}
+        self._changed = set()
+
+        self.stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'auth_failures': 0,
+            'events': 0,
+            'status_changes': 0,
+            'served_from_push': 0
+        }
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+
+    def start(self):
+        """在后台线程中启动事件循环"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._stopping = asyncio.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._main(),),
+                                        name='bilibili-push', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """停止服务并等待后台线程退出"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _main(self):
+        tasks = {}
+        async with aiohttp.ClientSession() as session:
+            try:
+                while not self._stopping.is_set():
+                    await self._sync(session, tasks)
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.sync_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _sync(self, session, tasks):
+        """按最新的关注列表增减订阅"""
+        loop = asyncio.get_running_loop()
+        try:
+            subscriptions = await loop.run_in_executor(None, collect_subscriptions, self.max_rooms)
+            unresolved = [room_id for room_id in subscriptions if room_id not in self._real_ids]
+            if unresolved:
+                await loop.run_in_executor(None, self._resolve_room_ids, unresolved)
+        except Exception as e:
+            print(f"同步哔哩哔哩推送订阅失败: {e}")
+            return
+
+        with self._lock:
+            self._subscribers = subscriptions
+
+        for room_id in list(tasks):
+            if room_id not in subscriptions:
+                tasks.pop(room_id).cancel()
+        for room_id in subscriptions:
+            if room_id not in tasks:
+                tasks[room_id] = asyncio.ensure_future(self._run_room(session, room_id))
+                await asyncio.sleep(self.connect_interval)
+
+    def _resolve_room_ids(self, room_ids):
+        """通过批量接口把短号解析为实际房间号，解析不到的先按原房间号连接，下次同步时重试"""
+        try:
+            status_map = BilibiliChecker.batch_check_live_status(room_ids=room_ids)
+        except Exception as e:
+            print(f"解析哔哩哔哩房间号失败: {e}")
+            return
+        for room_id in room_ids:
+            snapshot = status_map.get(room_id)
+            if snapshot:
+                self._real_ids[room_id] = snapshot.get('resolved_room_id') or room_id
+
+    def _fetch_token(self, real_id, identity):
+        """获取连接令牌，失败时返回None（匿名连接）"""
+        try:
+            response = http_client.get(
+                BilibiliChecker.PLATFORM_KEY,
+                DANMU_INFO_URL,
+                params={'id': real_id, 'type': 0},
+                headers={'Referer': f'{BilibiliChecker.BASE_URL}/{real_id}', 'Cookie': identity.cookie_header()},
+                default_headers=BilibiliChecker.DEFAULT_HEADERS,
+                egress_key=identity.identity_id
+            )
+            data = response.json()
+            if data.get('code') == 0:
+                return data['data']['token']
+        except Exception as e:
+            print(f"获取哔哩哔哩直播间 {real_id} 连接令牌失败: {e}")
+        return None
+
+    async def _run_room(self, session, room_id):
+        """维持单个直播间的订阅连接，断开后按指数退避（带抖动）重连"""
+        failures = 0
+        while True:
+            connected_at = None
+            try:
+                real_id = self._real_ids.get(room_id, room_id)
+                identity = BilibiliChecker.identity_pool().acquire()
+                token = None
+                if self.fetch_token:
+                    token = await asyncio.get_running_loop().run_in_executor(None, self._fetch_token, real_id, identity)
+
+                async with session.ws_connect(self.url, headers={'User-Agent': BilibiliChecker.DEFAULT_HEADERS['User-Agent']}) as ws:
+                    await self._authenticate(ws, real_id, token, identity)
+                    connected_at = time.monotonic()
+                    with self._lock:
+                        self._connected[room_id] = connected_at
+                        self.stats['connects'] += 1
+                    failures = 0
+                    await self._receive(ws, room_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                print(f"哔哩哔哩直播间 {room_id} 推送连接断开: {e!r}")
+            finally:
+                with self._lock:
+                    if self._connected.pop(room_id, None) is not None:
+                        self.stats['disconnects'] += 1
+
+            delay = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** max(0, failures - 1)))
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    async def _authenticate(self, ws, real_id, token, identity):
+        """发送进房认证包并等待认证结果"""
+        auth = {
+            'uid': 0,
+            'roomid': int(real_id),
+            'protover': PROTO_ZLIB,
+            'buvid': identity.jar.get('buvid3', ''),
+            'platform': 'web',
+            'type': 2
+        }
+        if token:
+            auth['key'] = token
+        await ws.send_bytes(encode_packet(OP_AUTH, json.dumps(auth)))
+
+        message = await ws.receive(timeout=self.heartbeat_interval)
+        if message.type == aiohttp.WSMsgType.BINARY:
+            for op, body in decode_packets(message.data):
+                if op == OP_AUTH_REPLY and json.loads(body or b'{}').get('code', 0) == 0:
+                    return
+        with self._lock:
+            self.stats['auth_failures'] += 1
+        raise ConnectionError(f"进房认证失败: {message.type.name}")
+
+    async def _receive(self, ws, room_id):
+        """收取消息直到连接断开；两个心跳周期内没有任何数据时视为连接失效"""
+        heartbeat = asyncio.ensure_future(self._heartbeat(ws))
+        try:
+            while True:
+                message = await ws.receive(timeout=self.heartbeat_interval * 2)
+                if message.type != aiohttp.WSMsgType.BINARY:
+                    if message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED,
+                                        aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                        return
+                    continue
+                for op, body in decode_packets(message.data):
+                    if op != OP_MESSAGE:
+                        continue
+                    event = parse_status_event(body)
+                    if event is not None:
+                        with self._lock:
+                            self.stats['events'] += 1
+                        await asyncio.get_running_loop().run_in_executor(None, self._apply_status, room_id, *event)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, ws):
+        while True:
+            await ws.send_bytes(encode_packet(OP_HEARTBEAT))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _apply_status(self, room_id, is_live, status_info):
+        """把推送的状态写入各订阅用户的直播间缓存（没有缓存的直播间等轮询建立基线）"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(room_id, ()))
+
+        for user_id, url in subscribers:
+            with cache_entry_lock(url, user_id):
+                cached_data = load_cached_data(url, user_id)
+                if not cached_data:
+                    continue
+                if cached_data.get('is_live') == is_live and cached_data.get('status_info') == status_info:
+                    continue
+
+                merged_result = merge_room_data(cached_data, {
+                    'is_live': is_live,
+                    'status_info': status_info,
+                    'pushed_at': time.time()
+                })
+                save_cached_data(url, merged_result, user_id)
+            with self._lock:
+                self._changed.add((user_id, url))
+                # 状态变化后下一次刷新立即对账，补齐新的标题、封面等信息
+                self._reconciled_at.pop(url, None)
+                self.stats['status_changes'] += 1
+            print(f"哔哩哔哩推送: {url} {status_info}")
+
+    def covers(self, url):
+        """直播间当前是否由推送连接覆盖"""
+        try:
+            room_id = BilibiliChecker.extract_room_id(url)
+        except ValueError:
+            return False
+        with self._lock:
+            return room_id in self._connected
+
+    def needs_poll(self, url):
+        """
+        判断直播间这次是否需要轮询
+
+        推送未覆盖时总是需要；覆盖时每个对账间隔轮询一次，轮询成功后由mark_reconciled记为已对账，
+        失败的对账轮询下次照常重试
+        """
+        if not self.covers(url):
+            return True
+        with self._lock:
+            return time.monotonic() - self._reconciled_at.get(url, 0) >= self.reconcile_interval
+
+    def mark_reconciled(self, url):
+        """记录推送覆盖的直播间刚成功轮询过"""
+        if self.covers(url):
+            with self._lock:
+                self._reconciled_at[url] = time.monotonic()
+
+    def record_served(self):
+        """记录一次直接用推送维护的缓存数据应答"""
+        with self._lock:
+            self.stats['served_from_push'] += 1
+
+    def take_changed(self, user_id, url):
+        """推送是否改变过该用户的直播间数据（取出后清除）"""
+        with self._lock:
+            if (user_id, url) in self._changed:
+                self._changed.discard((user_id, url))
+                return True
+            return False
+
+    def get_stats(self):
+        """获取订阅数、在线连接数和事件统计"""
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.stats)
+            subscribed = list(self._subscribers)
+            connected = dict(self._connected)
+
+        stats.update({
+            'subscribed': len(subscribed),
+            'connected': len(connected),
+            'disconnected_rooms': [room_id for room_id in subscribed if room_id not in connected],
+            'oldest_connection_age': round(now - min(connected.values())) if connected else 0
+        })
+        return stats
+
+_ingest = None
+_lock = threading.Lock()
+
+def start_push_ingest():
+    """按性能设置启动推送服务（未启用时不启动），返回服务实例"""
+    global _ingest
+    with _lock:
+        if _ingest is not None:
+            return _ingest
+
+        settings = load_performance_settings()['bilibili_push']
+        if not settings['enabled']:
+            return None
+
+        _ingest = PushIngest(
+            settings['url'],
+            fetch_token=settings['fetch_token'],
+            heartbeat_interval=settings['heartbeat_interval'],
+            reconnect_base_delay=settings['reconnect_base_delay'],
+            reconnect_max_delay=settings['reconnect_max_delay'],
+            max_rooms=settings['max_rooms'],
+            connect_interval=settings['connect_interval'],
+            sync_interval=settings['sync_interval'],
+            reconcile_interval=settings['reconcile_interval']
+        )
+        _ingest.start()
+        print(f"哔哩哔哩推送服务已启动: {settings['url']}")
+        return _ingest
+
+def needs_poll(url):
+    """直播间这次是否需要轮询，未启用推送时总是需要"""
+    ingest = _ingest
+    if ingest is None:
+        return True
+    return ingest.needs_poll(url)
+
+def mark_reconciled(url):
+    """直播间轮询成功后调用，推送覆盖的直播间到下个对账间隔前不再轮询"""
+    ingest = _ingest
+    if ingest is not None:
+        ingest.mark_reconciled(url)
+
+def record_served_from_push():
+    """记录一次直接用推送维护的缓存数据应答"""
+    ingest = _ingest
+    if ingest is not None:
+        ingest.record_served()
+
+def take_push_changed(user_id, url):
+    """推送是否改变过该用户的直播间数据（取出后清除）"""
+    ingest = _ingest
+    return ingest is not None and ingest.take_changed(user_id, url)
+
+def get_push_stats():
+    """获取推送服务的运行统计，未启用时返回None"""
+    ingest = _ingest
+    if ingest is None:
+        return None
+    return ingest.get_stats()
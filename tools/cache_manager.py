@@ -2,12 +2,29 @@ import os
 import json
 import time
 import hashlib
+import threading
 from flask import session
 from .user_manager import get_current_user_id, get_user_data_path
 from .data_handler import get_cache_key
 
-def load_cached_data(url, user_id=None):
-    """从缓存加载直播间的详细信息"""
+# 缓存文件路径 → 锁：定时刷新、推送和请求线程会同时读改写同一直播间的缓存记录
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+def _file_lock(cache_file):
+    """获取缓存文件对应的锁（可重入，合并数据时可以在持有锁的情况下调用save_cached_data）"""
+    with _file_locks_lock:
+        lock = _file_locks.get(cache_file)
+        if lock is None:
+            lock = _file_locks[cache_file] = threading.RLock()
+        return lock
+
+def cache_entry_lock(url, user_id=None):
+    """直播间缓存记录的锁，读取缓存、合并新数据再写回时持有，避免并发写入互相覆盖"""
+    return _file_lock(get_cache_file(url, user_id))
+
+def get_cache_file(url, user_id=None):
+    """获取直播间缓存文件路径"""
     if user_id is None:
         user_id = get_current_user_id()
     
@@ -17,44 +34,79 @@ def load_cached_data(url, user_id=None):
     os.makedirs(user_cache_dir, exist_ok=True)
     
     cache_key = get_cache_key(url)
-    cache_file = os.path.join(user_cache_dir, f"{cache_key}.json")
+    return os.path.join(user_cache_dir, f"{cache_key}.json")
+
+def load_cache_entry(url, user_id=None):
+    """加载完整的缓存记录（url、data、timestamp、poll_state），不检查是否过期"""
+    cache_file = get_cache_file(url, user_id)
     
     if os.path.exists(cache_file):
         try:
             with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                # 检查缓存是否过期（24小时）
-                if time.time() - cache_data.get('timestamp', 0) < 86400:
-                    return cache_data.get('data')
+                return json.load(f)
         except Exception as e:
             print(f"加载缓存失败: {e}")
     return None
 
-def save_cached_data(url, data, user_id=None):
-    """保存直播间的详细信息到缓存"""
-    if user_id is None:
-        user_id = get_current_user_id()
-    
-    # 使用用户特定的缓存目录
-    user_dir = get_user_data_path(user_id)
-    user_cache_dir = os.path.join(user_dir, 'cache')
-    os.makedirs(user_cache_dir, exist_ok=True)
-    
-    cache_key = get_cache_key(url)
-    cache_file = os.path.join(user_cache_dir, f"{cache_key}.json")
-    
-    cache_data = {
-        'url': url,
-        'data': data,
-        'timestamp': time.time()
-    }
-    
+def load_cached_data(url, user_id=None):
+    """从缓存加载直播间的详细信息"""
+    cache_data = load_cache_entry(url, user_id)
+    # 检查缓存是否过期（24小时）
+    if cache_data and time.time() - cache_data.get('timestamp', 0) < 86400:
+        return cache_data.get('data')
+    return None
+
+def _write_cache_entry(cache_file, cache_data):
+    """写入缓存记录（先写临时文件再替换，读取方不会读到写了一半的文件；调用方需持有文件锁）"""
     try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, cache_file)
     except Exception as e:
         print(f"保存缓存失败: {e}")
 
+def save_cached_data(url, data, user_id=None, poll_state=None):
+    """
+    保存直播间的详细信息到缓存
+
+    poll_state为None时保留缓存中原有的轮询状态（见poll_policy）
+    """
+    if user_id is None:
+        user_id = get_current_user_id()
+    
+    cache_file = get_cache_file(url, user_id)
+    with _file_lock(cache_file):
+        if poll_state is None:
+            existing = load_cache_entry(url, user_id)
+            poll_state = existing.get('poll_state') if existing else None
+        
+        cache_data = {
+            'url': url,
+            'data': data,
+            'timestamp': time.time()
+        }
+        if poll_state is not None:
+            cache_data['poll_state'] = poll_state
+        
+        _write_cache_entry(cache_file, cache_data)
+
+def load_poll_state(url, user_id=None):
+    """加载直播间的轮询状态，没有时返回None"""
+    cache_data = load_cache_entry(url, user_id)
+    return cache_data.get('poll_state') if cache_data else None
+
+def save_poll_state(url, poll_state, user_id=None):
+    """只更新轮询状态，不改变缓存数据及其时间戳"""
+    if user_id is None:
+        user_id = get_current_user_id()
+    
+    cache_file = get_cache_file(url, user_id)
+    with _file_lock(cache_file):
+        cache_data = load_cache_entry(url, user_id) or {'url': url, 'data': None, 'timestamp': 0}
+        cache_data['poll_state'] = poll_state
+        _write_cache_entry(cache_file, cache_data)
+
 def clear_old_cache(user_id=None):
     """清理过期缓存文件"""
     if user_id is None:
@@ -0,0 +1,152 @@
+"""
+出站请求熔断器
+按目标站点（scheme://host[:port]）分别熔断：平台站点和每个抖音API地址各有一个熔断器。
+连续失败达到阈值后进入打开状态，期间请求直接失败而不再等待超时；
+冷却时间过后进入半开状态放行少量探测请求，成功则恢复，失败则重新打开
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+
+from .config_manager import load_performance_settings
+
+# 熔断器状态
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+class CircuitOpenError(ConnectionError):
+    """目标站点处于熔断状态，请求未发出"""
+
+class CircuitBreaker:
+    """单个目标站点的熔断器"""
+
+    def __init__(self, key, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1, enabled=True):
+        """
+        Args:
+            key (str): 目标站点
+            failure_threshold (int): 连续失败多少次后打开
+            recovery_timeout (float): 打开后多久进入半开状态（秒）
+            half_open_max_calls (int): 半开状态下同时放行的探测请求数
+            enabled (bool): 是否启用，关闭时只统计不拦截
+        """
+        self.key = key
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = float(recovery_timeout)
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        self.enabled = enabled
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+        self.stats = {
+            'successes': 0,
+            'failures': 0,
+            'rejected': 0,
+            'opened': 0
+        }
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        请求发出前检查熔断状态
+
+        Raises:
+            CircuitOpenError: 熔断器打开（或半开且探测名额已满）
+        """
+        with self._lock:
+            if not self.enabled or self.state == STATE_CLOSED:
+                return
+
+            if self.state == STATE_OPEN:
+                remaining = self.recovery_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError(f"{self.key} 熔断中，{remaining:.0f}秒后重试")
+                self.state = STATE_HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(f"{self.key} 熔断恢复探测中")
+            self.half_open_calls += 1
+
+    def cancel(self):
+        """已通过检查但请求最终没有发出时归还探测名额"""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record(self, success):
+        """记录请求结果"""
+        with self._lock:
+            if success:
+                self.stats['successes'] += 1
+                self.consecutive_failures = 0
+                if self.state == STATE_HALF_OPEN:
+                    print(f"熔断恢复: {self.key}")
+                self.state = STATE_CLOSED
+                return
+
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if not self.enabled:
+                return
+
+            # 半开探测失败或连续失败达到阈值时打开
+            if self.state == STATE_HALF_OPEN or (
+                self.state == STATE_CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                if self.state == STATE_CLOSED:
+                    print(f"熔断打开: {self.key}（连续失败{self.consecutive_failures}次）")
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+                self.stats['opened'] += 1
+
+    def get_stats(self):
+        """获取熔断器状态与计数"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures
+            })
+            if self.state == STATE_OPEN:
+                stats['retry_in'] = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return stats
+
+_breakers = {}
+_lock = threading.Lock()
+
+def breaker_key(url):
+    """请求地址对应的熔断键：scheme://host[:port]"""
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
+
+def get_breaker(url):
+    """获取请求地址所属站点的熔断器，不存在时按性能设置创建"""
+    key = breaker_key(url)
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+
+    with _lock:
+        if key not in _breakers:
+            settings = load_performance_settings()['circuit_breaker']
+            _breakers[key] = CircuitBreaker(
+                key,
+                failure_threshold=settings['failure_threshold'],
+                recovery_timeout=settings['recovery_timeout'],
+                half_open_max_calls=settings['half_open_max_calls'],
+                enabled=settings['enabled']
+            )
+        return _breakers[key]
+
+def get_breaker_stats():
+    """获取各站点熔断器的状态"""
+    with _lock:
+        breakers = dict(_breakers)
+    return {key: breaker.get_stats() for key, breaker in breakers.items()}
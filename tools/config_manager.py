@@ -1,7 +1,289 @@
 import os
 import json
+import threading
+from types import MappingProxyType
 from flask import session
-from .user_manager import get_current_user_id, get_user_data_path
+from .user_manager import get_current_user_id, get_user_data_path, DATA_DIR
+
+# 服务端性能调优设置（全局，不区分用户）
+PERFORMANCE_SETTINGS_FILE = os.path.join(DATA_DIR, 'performance_settings.json')
+
+DEFAULT_PERFORMANCE_SETTINGS = {
+    "batch_refresh": {
+        # 是否默认使用并发刷新
+        "concurrent": True,
+        # 并发刷新引擎：threads（线程池）或 asyncio（异步引擎）
+        "engine": "threads",
+        # 刷新队列的工作线程数
+        "max_workers": 16,
+        # 批量刷新的默认时间预算（秒），超出后剩余直播间返回缓存数据；null表示不限时（可由请求的deadline参数指定）
+        "deadline": None,
+        # 单个直播间增量刷新的默认时间预算（秒）
+        "incremental_deadline": 15,
+        # 各平台同时进行中的房间刷新数上限
+        "platform_concurrency": {
+            "douyu": 4,
+            "huya": 4,
+            "bilibili": 6,
+            "douyin": 2
+        }
+    },
+    "refresh_queue": {
+        # 每排队多少秒相当于提升一个优先级（手动刷新 > 特别关注/直播中 > 其他）
+        "aging_interval": 30,
+        # 排队时间统计保留的最近样本数
+        "window": 500,
+        # 每个用户同时进行中的后台刷新数上限（手动刷新不受限制）
+        "user_max_in_flight": 8,
+        # 排队的刷新超过多少个时丢弃新提交的后台刷新（返回缓存数据）
+        "shed_threshold": 1000,
+        # 各用户的公平分配权重，未设置的用户为1
+        "user_weights": {}
+    },
+    "traffic": {
+        # 出站请求计数的时间桶长度（秒）
+        "bucket_seconds": 10,
+        # 计算峰均比的时间窗口（秒）
+        "window": 600
+    },
+    "http": {
+        # 每个平台会话缓存的主机连接池数量
+        "pool_connections": 4,
+        # 每个主机连接池保留的keep-alive连接数
+        "default_pool_maxsize": 10,
+        "pool_maxsize": {
+            "douyu": 16,
+            "huya": 16,
+            "bilibili": 16,
+            "douyin": 8
+        },
+        # 连接池耗尽时是否等待空闲连接（否则临时新建连接）
+        "pool_block": False
+    },
+    "rate_limit": {
+        # 等待限流许可的最长时间（秒）
+        "max_wait": 30,
+        # 遇到限流或超时时并发窗口的收缩乘数
+        "backoff_ratio": 0.5,
+        # 两次收缩之间的最短间隔（秒）
+        "backoff_cooldown": 1.0,
+        # rate: 每秒请求数，burst: 令牌桶容量，latency_target: 健康延迟阈值（秒）
+        "default": {
+            "rate": 5, "burst": 10,
+            "initial_concurrency": 4, "min_concurrency": 1, "max_concurrency": 16,
+            "latency_target": 2.0
+        },
+        "platforms": {
+            "douyu": {
+                "rate": 5, "burst": 10,
+                "initial_concurrency": 4, "min_concurrency": 1, "max_concurrency": 16,
+                "latency_target": 2.0
+            },
+            "huya": {
+                "rate": 5, "burst": 10,
+                "initial_concurrency": 4, "min_concurrency": 1, "max_concurrency": 16,
+                "latency_target": 2.0
+            },
+            "bilibili": {
+                "rate": 8, "burst": 16,
+                "initial_concurrency": 6, "min_concurrency": 1, "max_concurrency": 24,
+                "latency_target": 1.0
+            },
+            "douyin": {
+                "rate": 3, "burst": 6,
+                "initial_concurrency": 2, "min_concurrency": 1, "max_concurrency": 8,
+                "latency_target": 3.0
+            }
+        }
+    },
+    "timeouts": {
+        # 连接超时（秒）
+        "connect": 3.05,
+        # 延迟样本不足时的读超时（秒）
+        "default_read": 10,
+        # 读超时 = 延迟分位数 × 倍数，并限制在上下限之间
+        "percentile": 99,
+        "multiplier": 2,
+        "min_read": 2,
+        "max_read": 15,
+        # 开始自适应前需要的样本数，以及保留的最近样本数
+        "min_samples": 20,
+        "window": 200
+    },
+    "circuit_breaker": {
+        # 是否启用熔断（关闭时只统计）
+        "enabled": True,
+        # 同一站点连续失败多少次后熔断
+        "failure_threshold": 5,
+        # 熔断后多久放行探测请求（秒）
+        "recovery_timeout": 30,
+        # 半开状态同时放行的探测请求数
+        "half_open_max_calls": 1
+    },
+    "retry": {
+        # max_attempts: 含首次请求的最多尝试次数，base_delay/max_delay: 退避基数与上限（秒）
+        # retry_statuses: 需要重试的HTTP状态码（429交给限流器退避，不重试）
+        # budget_ratio: 重试与对冲占原始请求的比例上限，budget_min_retries: 每个窗口至少允许的次数
+        # （请求量很小时保证偶尔能重试，设得过大会让故障期间的额外请求远超budget_ratio）
+        # hedge: 是否在请求超过延迟分位数后发出对冲请求（只用于幂等请求）
+        "default": {
+            "max_attempts": 3, "base_delay": 0.2, "max_delay": 2.0,
+            "retry_statuses": [500, 502, 503, 504],
+            "budget_ratio": 0.1, "budget_min_retries": 1, "budget_window": 10,
+            "hedge": False, "hedge_percentile": 95, "hedge_min_delay": 0.05
+        },
+        "platforms": {
+            "douyu": {"hedge": True},
+            "huya": {"hedge": True},
+            "bilibili": {"hedge": True},
+            # 抖音走第三方解析服务，请求代价高，只重试一次且不对冲
+            "douyin": {"max_attempts": 2, "base_delay": 0.5}
+        },
+        # 全部平台同时进行中的对冲请求数上限（共用线程池，每个占两个线程），达到上限时不对冲
+        "hedge_max_concurrent": 8
+    },
+    "streaming": {
+        # 斗鱼、虎牙页面是否流式读取，找到所需标记后提前断开
+        "enabled": True,
+        # 每次读取的字节数
+        "chunk_size": 16384,
+        # 块之间保留的尾部字节数（需大于单个标记片段的长度）
+        "tail_size": 16384
+    },
+    "bilibili_bulk": {
+        # 批量刷新时是否使用哔哩哔哩批量状态接口
+        "enabled": True,
+        # 每次批量请求包含的最大房间数
+        "chunk_size": 50,
+        # 少于该数量的哔哩哔哩直播间不走批量接口
+        "min_rooms": 2
+    },
+    "fetch_tiers": {
+        # 斗鱼、虎牙是否先尝试轻量接口，失败或缺少字段时再抓取直播间页面
+        "enabled": True,
+        # 各平台尝试轻量层级的顺序（不含兜底的page），未配置时使用检测器声明的顺序
+        "platforms": {
+            "douyu": ["betard", "open_api"],
+            "huya": ["mp_api"]
+        },
+        # 统计最近多少次尝试，至少多少次后判断是否降级
+        "window": 20,
+        "min_samples": 5,
+        # 最近失败率达到该值时降级，降级持续时间（秒）
+        "failure_threshold": 0.5,
+        "demote_duration": 600
+    },
+    "api_endpoints": {
+        # 配置了多个抖音API地址时的选择策略：weighted（按评分加权分摊）或 best（只用评分最好的）
+        "strategy": "weighted",
+        # 延迟与错误率EWMA中新样本的权重
+        "ewma_alpha": 0.3,
+        # 还没有样本的地址的假定延迟（秒）
+        "initial_latency": 1.0,
+        # 连续失败多少次后摘除，首次摘除时长与上限（秒），连续摘除时翻倍
+        "eject_after": 3,
+        "eject_duration": 30,
+        "max_eject_duration": 300
+    },
+    "egress": {
+        # 是否通过出口代理池发送检测请求
+        "enabled": False,
+        # 分配方式：round_robin（轮流使用）或 sticky（同一直播间、同一设备身份固定走同一出口）
+        "mode": "round_robin",
+        # 各平台的出口列表：http://、https://、socks5://（需要PySocks）代理地址，direct表示本机直连
+        # 例如 {"bilibili": ["direct", "http://127.0.0.1:8081"]}；未配置的平台使用default
+        "platforms": {},
+        "default": [],
+        # 平台限流器的速率、突发量和并发上限是否按出口数放大（每个出口仍按原设置的速率分摊）
+        "scale_rate_limit": True,
+        # 连续失败或被限流多少次后暂停使用该出口，首次暂停时长与上限（秒），连续暂停时翻倍
+        "eject_after": 3,
+        "eject_duration": 30,
+        "max_eject_duration": 300,
+        # 统计各出口请求速率的时间窗口（秒）
+        "rate_window": 60
+    },
+    "identity_pool": {
+        # 哔哩哔哩轮流使用的持久设备身份数
+        "size": 8,
+        # 同一身份连续被风控拦截（412）多少次后淘汰
+        "retire_after": 2,
+        # 是否把身份Cookie保存到data目录，重启后继续使用
+        "persist": True
+    },
+    "scheduler": {
+        # 是否在服务端按各用户的刷新频率定时刷新直播间（浏览器只读取缓存）
+        "enabled": True,
+        # 两次检查到期直播间之间的最长间隔（秒），有直播间更早到期时提前检查
+        "tick_interval": 30,
+        # 两次检查之间的最短间隔（秒）
+        "min_tick_interval": 1,
+        # 每次轮询等待时间的随机抖动比例
+        "jitter": 0.1
+    },
+    "adaptive_polling": {
+        # 是否按直播状态为每个直播间调整轮询间隔（关闭时都按用户设置的刷新频率）
+        "enabled": True,
+        # 直播中和刚下播的直播间的轮询间隔（秒，不超过用户设置的刷新间隔）
+        "fast_interval": 120,
+        # 下播后多长时间内仍按快速间隔轮询（秒）
+        "recent_offline_window": 3600,
+        # 长期未开播时每次轮询间隔放大的倍数
+        "backoff_factor": 2,
+        # 未开播直播间的最大轮询间隔（秒）
+        "max_interval": 7200,
+        # 历史开播时刻相差多少秒以内算同一个规律开播时间
+        "start_window": 1800,
+        # 在预计开播时间前多少秒恢复快速轮询
+        "start_lead": 300,
+        # 同一时刻至少开播几次才认为是规律开播时间
+        "min_start_occurrences": 2,
+        # 每个直播间保留的开播时间记录数
+        "max_start_history": 14
+    },
+    "bilibili_push": {
+        # 是否通过直播间消息WebSocket接收哔哩哔哩开播、下播推送
+        "enabled": False,
+        # 消息服务器地址（可指向本地的协议测试服务）
+        "url": "wss://broadcastlv.chat.bilibili.com/sub",
+        # 连接前是否通过getDanmuInfo获取连接令牌（失败时匿名连接）
+        "fetch_token": True,
+        # 心跳间隔（秒），两个心跳周期内没有收到任何数据时重连
+        "heartbeat_interval": 30,
+        # 重连退避基数与上限（秒）
+        "reconnect_base_delay": 1,
+        "reconnect_max_delay": 120,
+        # 最多同时订阅的直播间数，新建连接之间的间隔（秒）
+        "max_rooms": 500,
+        "connect_interval": 0.05,
+        # 重新汇总各用户关注列表的间隔（秒）
+        "sync_interval": 60,
+        # 推送连接正常的直播间的对账轮询间隔（秒）
+        "reconcile_interval": 1800
+    },
+    "single_flight": {
+        # 同一直播间获取结果的复用时间窗口（秒）
+        "freshness": 3.0
+    },
+    "room_id_cache": {
+        # 房间号解析结果的有效期（秒），默认7天
+        "ttl": 604800
+    },
+    "async_refresh": {
+        # 全局同时在途的请求数上限
+        "max_in_flight": 200,
+        # 单次请求超时（秒）
+        "timeout": 10
+    }
+}
+
+def get_egress_routes(platform_key, settings=None):
+    """平台配置的出口列表，未启用出口代理池时返回空列表"""
+    if settings is None:
+        settings = load_performance_settings()['egress']
+    if not settings['enabled']:
+        return []
+    return settings['platforms'].get(platform_key) or settings['default']
 
 def get_douyin_config_file(user_id=None):
     """获取抖音配置文件路径"""
@@ -38,6 +320,13 @@ def load_douyin_config(user_id=None):
     save_douyin_config(default_config, user_id)
     return default_config
 
+def get_douyin_api_bases(config):
+    """抖音API基础地址列表（兼容只有api_url的旧配置）"""
+    api_urls = config.get('api_urls')
+    if isinstance(api_urls, list) and api_urls:
+        return api_urls
+    return [config.get('api_url', 'https://douyin.wtf')]
+
 def save_douyin_config(config, user_id=None):
     """保存抖音API配置到文件"""
     if user_id is None:
@@ -99,4 +388,81 @@ def save_refresh_settings(settings, user_id=None):
             json.dump(settings, f, ensure_ascii=False, indent=2)
     except Exception as e:
         print(f"保存刷新频率设置失败: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def _merge_settings(defaults, overrides):
+    """将用户设置深度合并到默认设置上"""
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_settings(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+# 合并后的性能设置缓存：((文件路径, 修改时间, 大小), 只读设置)，文件变化或保存设置时失效
+_performance_cache = (None, None)
+_performance_lock = threading.Lock()
+
+def _performance_file_key():
+    try:
+        stat = os.stat(PERFORMANCE_SETTINGS_FILE)
+    except OSError:
+        return (PERFORMANCE_SETTINGS_FILE, None, None)
+    return (PERFORMANCE_SETTINGS_FILE, stat.st_mtime_ns, stat.st_size)
+
+def _read_performance_settings():
+    """读取设置文件并与默认设置合并"""
+    if os.path.exists(PERFORMANCE_SETTINGS_FILE):
+        try:
+            with open(PERFORMANCE_SETTINGS_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    return _merge_settings(DEFAULT_PERFORMANCE_SETTINGS, data)
+        except Exception:
+            pass
+    
+    return _merge_settings(DEFAULT_PERFORMANCE_SETTINGS, {})
+
+def _freeze(value):
+    """转换为只读结构：字典 → MappingProxyType，列表 → 元组"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def load_performance_settings():
+    """
+    从文件中加载性能调优设置，缺失的项使用默认值
+
+    文件没有变化时直接返回缓存的合并结果。返回值是只读的（字典为MappingProxyType、列表为元组），
+    多个线程共享同一份，不需要每次复制；需要修改时先用dict()、list()复制所需的部分
+    """
+    global _performance_cache
+    key = _performance_file_key()
+    cached_key, settings = _performance_cache
+    if cached_key == key:
+        return settings
+
+    with _performance_lock:
+        settings = _freeze(_read_performance_settings())
+        _performance_cache = (key, settings)
+        return settings
+
+def save_performance_settings(settings):
+    """保存性能调优设置到文件"""
+    global _performance_cache
+    try:
+        if not isinstance(settings, dict):
+            raise ValueError("Invalid settings format")
+        
+        with open(PERFORMANCE_SETTINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"保存性能调优设置失败: {e}")
+        raise
+    finally:
+        # 同一时间戳精度内的两次写入修改时间可能相同，保存后直接让缓存失效
+        with _performance_lock:
+            _performance_cache = (None, None)
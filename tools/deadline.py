@@ -0,0 +1,58 @@
+"""
+刷新时间预算
+批量刷新和单个刷新可以设置总的时间预算，预算在当前上下文中传递给网络层：
+每次请求的超时不超过剩余预算，预算用完后不再发出新请求
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+
+class DeadlineExceeded(TimeoutError):
+    """刷新时间预算已用完"""
+
+class Deadline:
+    """一次刷新的截止时间"""
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): 从现在起的时间预算（秒）
+        """
+        self.seconds = float(seconds)
+        self.expires_at = time.monotonic() + self.seconds
+
+    def remaining(self):
+        """剩余预算（秒），已用完时为0"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """预算用完时抛出DeadlineExceeded"""
+        if self.expired:
+            raise DeadlineExceeded(f"超出刷新时间预算（{self.seconds:g}秒）")
+
+def as_deadline(value):
+    """把秒数转换为Deadline，None或非正数表示不限时"""
+    if value is None or isinstance(value, Deadline):
+        return value
+    value = float(value)
+    return Deadline(value) if value > 0 else None
+
+_current_deadline = contextvars.ContextVar('refresh_deadline', default=None)
+
+def get_current_deadline():
+    """当前上下文中的截止时间，没有时返回None"""
+    return _current_deadline.get()
+
+@contextmanager
+def deadline_scope(deadline):
+    """在上下文中设置截止时间（线程池中的任务需要在各自线程内重新设置）"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
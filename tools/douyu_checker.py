@@ -3,180 +3,257 @@
 基于$ROOM.show_status参数判断直播间是否正在直播
 """
 
-import requests
 import re
-import json
 from urllib.parse import urlparse
 
-class DouyuChecker:
+from .base_checker import BaseChecker
+from .extractor import Extractor, Field
+from .fetch_tiers import PAGE_TIER
+
+class DouyuChecker(BaseChecker):
     PLATFORM_NAME = "斗鱼"
+    PLATFORM_KEY = "douyu"
     BASE_URL = "https://www.douyu.com"
-    
+    OPEN_API_URL = "https://open.douyucdn.cn/api/RoomApi/room"
+    RESPONSE_TYPE = 'text'
+    ROOM_ID_NEEDS_PAGE = True
+    FAILED_POPULAR_NUM = '0'
+
+    # 先用网页端的betard接口，再用开放接口，都不可用时抓取直播间页面
+    SNAPSHOT_TIERS = ('betard', 'open_api', PAGE_TIER)
+
+    # 流式读取页面时需要找到的标记，每组第一个为首选，其余与解析器的备选写法对应
+    ROOM_ID_MARKERS = (
+        (r'\$ROOM\.room_id\s*=\s*\d+', r'room_id["\']:\s*\d+', r'"room_id":\s*\d+'),
+    )
+    SNAPSHOT_MARKERS = (
+        (r'\$ROOM\.show_status\s*=\s*\d+', r'show_status[=:]\s*\d+', r'"show_status":\s*\d+',
+         r'"online"', r'"room_status":\s*\d+'),
+        (r'\$ROOM\.room_id\s*=\s*\d+',),
+        (r'<h3 class="Title-header[^>]*>[^<]+</h3>',),
+        (r'<h2 class="Title-anchorNameH2[^>]*>[^<]+</h2>',),
+        (r'\$ROOM\.owner_avatar\s*=\s*["\'][^"\']+["\']', r'owner_avatar["\']:\s*["\'][^"\']+["\']',
+         r'"owner_avatar":"[^"]+"'),
+        (r'\$ROOM\.coverSrc\s*=\s*["\'][^"\']+["\']', r'coverSrc["\']:\s*["\'][^"\']+["\']',
+         r'"coverSrc":"[^"]+"'),
+        (r'"hot":"[^"]+"',)
+    )
+
     @classmethod
-    def extract_room_id(cls, url):
-        """从斗鱼页面获取真实房间号"""
-        # 检查域名是否为douyu.com
+    def validate_url(cls, url):
+        """检查域名是否为douyu.com"""
         parsed_url = urlparse(url)
         if 'douyu.com' not in parsed_url.netloc:
             raise ValueError(f"域名不是douyu.com: {url}")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': url
+        return parsed_url
+
+    @classmethod
+    def build_room_id_request(cls, url):
+        """构建获取真实房间号的页面请求"""
+        return {
+            'url': url,
+            'headers': {
+                'Referer': url
+            },
+            'stream_markers': cls.ROOM_ID_MARKERS
         }
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # 从页面HTML中查找$ROOM.room_id
-            room_id_patterns = [
-                r'\$ROOM\.room_id\s*=\s*(\d+)',
-                r'room_id["\']:\s*(\d+)',
-                r'"room_id":\s*(\d+)'
-            ]
-            
-            html_content = response.text
-            
-            for pattern in room_id_patterns:
-                match = re.search(pattern, html_content)
-                if match:
-                    return match.group(1)
-            
-            # 备选方案：从URL路径中提取
-            path = parsed_url.path.strip('/')
-            if path and path.isdigit():
-                return path
-            
-            raise ValueError(f"无法从页面获取房间ID: {url}")
-            
-        except requests.RequestException as e:
-            raise ConnectionError(f"网络请求失败: {e}")
-    
+
+    @classmethod
+    def parse_room_id(cls, html_content, url):
+        """从页面HTML中解析真实房间号"""
+        fields = cls.extract_fields(html_content)
+        room_id = fields['room_id'] or fields['room_id_fallback']
+        if room_id:
+            return room_id
+
+        # 备选方案：从URL路径中提取
+        path = urlparse(url).path.strip('/')
+        if path and path.isdigit():
+            return path
+
+        raise ValueError(f"无法从页面获取房间ID: {url}")
+
+    @classmethod
+    def parse_resolved_room_id(cls, html_content):
+        """从页面HTML中解析$ROOM.room_id"""
+        return cls.extract_fields(html_content)['room_id']
+
+    @classmethod
+    def extract_room_id(cls, url):
+        """从斗鱼页面获取真实房间号"""
+        cls.validate_url(url)
+        html_content = cls._request(cls.build_room_id_request(url))
+        return cls.parse_room_id(html_content, url)
+
+    @classmethod
+    def build_room_request(cls, room_id, api_url=None):
+        """构建直播间页面请求"""
+        return {
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'headers': {
+                'Referer': f'{cls.BASE_URL}/{room_id}'
+            },
+            'stream_markers': cls.SNAPSHOT_MARKERS
+        }
+
+    @classmethod
+    def build_betard_request(cls, room_id):
+        """构建betard接口请求（网页端加载直播间数据用的JSON接口）"""
+        return {
+            'url': f'{cls.BASE_URL}/betard/{room_id}',
+            'headers': {
+                'Referer': f'{cls.BASE_URL}/{room_id}'
+            },
+            'response_type': 'json'
+        }
+
+    @classmethod
+    def parse_betard_snapshot(cls, data, room_id):
+        """从betard接口响应中解析快照"""
+        room = data.get('room') if isinstance(data, dict) else None
+        if not isinstance(room, dict):
+            raise ValueError("betard接口缺少room数据")
+
+        avatar = room.get('avatar')
+        if isinstance(avatar, dict):
+            avatar = avatar.get('big') or avatar.get('middle') or avatar.get('small')
+
+        return cls._api_snapshot(
+            room_id,
+            status=room.get('show_status'),
+            title=room.get('room_name'),
+            anchor=room.get('nickname') or room.get('owner_name'),
+            avatar=avatar or room.get('owner_avatar'),
+            cover=room.get('room_pic') or room.get('coverSrc'),
+            popular=(room.get('room_biz_all') or {}).get('hot'),
+            resolved_room_id=room.get('room_id')
+        )
+
+    @classmethod
+    def build_open_api_request(cls, room_id):
+        """构建斗鱼开放接口请求"""
+        return {
+            'url': f'{cls.OPEN_API_URL}/{room_id}',
+            'response_type': 'json'
+        }
+
+    @classmethod
+    def parse_open_api_snapshot(cls, data, room_id):
+        """从开放接口响应中解析快照（room_status: 1直播中，2未开播）"""
+        if not isinstance(data, dict) or data.get('error') != 0 or not isinstance(data.get('data'), dict):
+            raise ValueError(f"开放接口返回错误: {data.get('data') if isinstance(data, dict) else data}")
+
+        room = data['data']
+        return cls._api_snapshot(
+            room_id,
+            status=room.get('room_status'),
+            title=room.get('room_name'),
+            anchor=room.get('owner_name'),
+            avatar=room.get('avatar'),
+            cover=room.get('room_thumb'),
+            popular=room.get('hn'),
+            resolved_room_id=room.get('room_id')
+        )
+
+    @classmethod
+    def _api_snapshot(cls, room_id, status, title, anchor, avatar, cover, popular, resolved_room_id):
+        """把轻量接口的字段组装成与页面解析相同格式的快照，缺少状态、标题或主播名时抛出ValueError"""
+        if status in (None, '') or not title or not anchor:
+            raise ValueError("接口数据缺少直播状态、标题或主播名")
+
+        status_code = int(status)
+        snapshot = {
+            'platform': cls.PLATFORM_NAME,
+            'title': str(title).strip(),
+            'anchor': str(anchor).strip(),
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'avatar': cls.clean_url(avatar),
+            'cover': cls.clean_url(cover),
+            # 接口没有人气值时留空，合并时保留缓存中的值
+            'popular_num': str(popular) if popular not in (None, '') else '',
+            'is_live': status_code == 1,
+            'status_info': status_code
+        }
+        if resolved_room_id:
+            snapshot['resolved_room_id'] = str(resolved_room_id)
+        return snapshot
+
+    @classmethod
+    def parse_live_status(cls, html_content):
+        """从页面HTML中解析直播状态"""
+        fields = cls.extract_fields(html_content)
+
+        # 优先使用$ROOM.show_status，没有时尝试room_status
+        status_code = fields['show_status']
+        if status_code is None and fields['online'] is not None:
+            status_code = fields['room_status']
+
+        if status_code is None:
+            raise ValueError("无法从页面获取直播状态")
+
+        return status_code == 1, status_code
+
     @classmethod
     def check_live_status(cls, room_id):
         """检查直播间状态"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}'
+        html_content = cls._request(cls.build_room_request(room_id))
+        return cls.parse_live_status(html_content)
+
+    @staticmethod
+    def clean_url(url):
+        """清理URL中的转义字符"""
+        if not url:
+            return ""
+        cleaned = url.replace('\\/', '/')
+        cleaned = re.sub(r'\\(["\\])', r'\1', cleaned)
+        return cleaned
+
+    # 页面字段声明，每个字段的备选写法按优先级排列
+    PAGE_EXTRACTOR = Extractor((
+        Field('room_id', (r'\$ROOM\.room_id\s*=\s*(\d+)',)),
+        Field('room_id_fallback', (r'room_id["\']:\s*(\d+)', r'"room_id":\s*(\d+)')),
+        Field('show_status', (
+            r'\$ROOM\.show_status\s*=\s*(\d+)',
+            r'show_status[=:]\s*(\d+)',
+            r'"show_status":\s*(\d+)'
+        ), int),
+        Field('online', (r'"online"',)),
+        Field('room_status', (r'"room_status":\s*(\d+)',), int),
+        Field('title', (r'<h3 class="Title-header[^>]*>([^<]+)</h3>',), str.strip, "未知"),
+        Field('anchor', (r'<h2 class="Title-anchorNameH2[^>]*>([^<]+)</h2>',), str.strip, "未知"),
+        Field('avatar', (
+            r'\$ROOM\.owner_avatar\s*=\s*["\']([^"\']+)["\']',
+            r'owner_avatar["\']:\s*["\']([^"\']+)["\']',
+            r'"owner_avatar":"([^"]+)"'
+        ), clean_url, ""),
+        Field('cover', (
+            r'\$ROOM\.coverSrc\s*=\s*["\']([^"\']+)["\']',
+            r'coverSrc["\']:\s*["\']([^"\']+)["\']',
+            r'"coverSrc":"([^"]+)"'
+        ), clean_url, ""),
+        Field('hot', (r'"hot":"([^"]+)"',), default="0")
+    ))
+
+    @classmethod
+    def parse_room_info(cls, text, room_id):
+        """从页面HTML中解析直播间详细信息"""
+        fields = cls.extract_fields(text)
+
+        return {
+            'platform': cls.PLATFORM_NAME,
+            'title': fields['title'],
+            'anchor': fields['anchor'],
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'avatar': fields['avatar'],
+            'cover': fields['cover'],
+            'popular_num': fields['hot']
         }
-        
-        try:
-            url = f'{cls.BASE_URL}/{room_id}'
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # 查找$ROOM.show_status的值
-            status_patterns = [
-                r'\$ROOM\.show_status\s*=\s*(\d+)',
-                r'show_status[=:]\s*(\d+)',
-                r'"show_status":\s*(\d+)'
-            ]
-            
-            html_content = response.text
-            
-            for pattern in status_patterns:
-                match = re.search(pattern, html_content)
-                if match:
-                    status_code = int(match.group(1))
-                    is_live = status_code == 1
-                    return is_live, status_code
-            
-            # 如果没找到show_status，尝试其他方式
-            if '"online"' in html_content and '"room_status"' in html_content:
-                online_match = re.search(r'"online":\s*(\d+)', html_content)
-                status_match = re.search(r'"room_status":\s*(\d+)', html_content)
-                
-                if status_match:
-                    status_code = int(status_match.group(1))
-                    is_live = status_code == 1
-                    return is_live, status_code
-                    
-            raise ValueError("无法从页面获取直播状态")
-            
-        except requests.RequestException as e:
-            raise ConnectionError(f"网络请求失败: {e}")
-    
+
     @classmethod
     def get_room_info(cls, room_id):
         """获取直播间详细信息"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}'
-        }
-        
-        def clean_url(url):
-            """清理URL中的转义字符"""
-            if not url:
-                return ""
-            cleaned = url.replace('\\/', '/')
-            cleaned = re.sub(r'\\(["\\])', r'\1', cleaned)
-            return cleaned
-        
         try:
-            url = f'{cls.BASE_URL}/{room_id}'
-            response = requests.get(url, headers=headers, timeout=10)
-            text = response.text
-            
-            # 提取直播间标题
-            title_pattern = r'<h3 class="Title-header[^>]*>([^<]+)</h3>'
-            title_match = re.search(title_pattern, text)
-            title = title_match.group(1).strip() if title_match else "未知"
-            
-            # 提取主播名字
-            name_pattern = r'<h2 class="Title-anchorNameH2[^>]*>([^<]+)</h2>'
-            name_match = re.search(name_pattern, text)
-            anchor_name = name_match.group(1).strip() if name_match else "未知"
-            
-            # 提取头像链接
-            avatar_patterns = [
-                r'\$ROOM\.owner_avatar\s*=\s*["\']([^"\']+)["\']',
-                r'owner_avatar["\']:\s*["\']([^"\']+)["\']',
-                r'"owner_avatar":"([^"]+)"'
-            ]
-            avatar_url = ""
-            for pattern in avatar_patterns:
-                match = re.search(pattern, text)
-                if match:
-                    avatar_url = clean_url(match.group(1))
-                    break
-            
-            # 提取封面链接
-            cover_patterns = [
-                r'\$ROOM\.coverSrc\s*=\s*["\']([^"\']+)["\']',
-                r'coverSrc["\']:\s*["\']([^"\']+)["\']',
-                r'"coverSrc":"([^"]+)"'
-            ]
-            cover_url = ""
-            for pattern in cover_patterns:
-                match = re.search(pattern, text)
-                if match:
-                    cover_url = clean_url(match.group(1))
-                    break
-            
-            # 提取人气值
-            hot_pattern = r'"hot":"([^"]+)"'
-            hot_match = re.search(hot_pattern, text)
-            hot_value = hot_match.group(1) if hot_match else "0"
-            
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': title,
-                'anchor': anchor_name,
-                'url': url,
-                'avatar': avatar_url,
-                'cover': cover_url,
-                'popular_num': hot_value
-            }
-            
+            text = cls._request(cls.build_room_request(room_id))
+            return cls.parse_room_info(text, room_id)
         except Exception as e:
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': '',
-                'anchor': '',
-                'url': f'{cls.BASE_URL}/{room_id}',
-                'avatar': '',
-                'cover': '',
-                'popular_num': '0',
-                'fetch_status': 'failed'
-            }
\ No newline at end of file
+            return cls.failed_room_info(room_id)
@@ -0,0 +1,193 @@
+"""
+出口代理池
+检测请求默认都从本机的同一个出口IP发出，平台按IP限流时整体请求速率就被卡住。
+这里为每个平台配置一组出口（HTTP/HTTPS/SOCKS代理，direct表示本机直连），
+请求轮流（round_robin）或按直播间/设备身份固定（sticky）分配到各出口；
+每个出口单独统计请求速率、延迟和错误率，连续失败或被限流的出口暂停使用（见endpoint_balancer）
+"""
+
+import time
+import zlib
+import threading
+import importlib.util
+from collections import deque
+from urllib.parse import urlparse
+
+from .config_manager import load_performance_settings, get_egress_routes
+from .endpoint_balancer import EndpointBalancer
+from .rate_limiter import OUTCOME_SUCCESS, OUTCOME_ERROR
+
+# 本机直连
+DIRECT_ROUTE = 'direct'
+
+# 分配方式：round_robin轮流使用各出口，sticky按请求的固定键（直播间、设备身份）选择出口
+MODE_ROUND_ROBIN = 'round_robin'
+MODE_STICKY = 'sticky'
+
+# requests通过PySocks支持socks代理
+SOCKS_SCHEMES = ('socks4', 'socks4a', 'socks5', 'socks5h')
+
+def route_scheme(route):
+    """出口的类型：direct或代理地址的协议"""
+    if route == DIRECT_ROUTE:
+        return DIRECT_ROUTE
+    return urlparse(route).scheme.lower()
+
+def display_route(route):
+    """去掉代理地址中的账号密码，用于日志和统计"""
+    if route == DIRECT_ROUTE:
+        return route
+    parsed = urlparse(route)
+    if parsed.username is None:
+        return route
+    return parsed._replace(netloc=parsed.netloc.rsplit('@', 1)[1]).geturl()
+
+def proxies_for(route):
+    """出口对应的requests代理设置，直连时返回None"""
+    if route is None or route == DIRECT_ROUTE:
+        return None
+    return {'http': route, 'https': route}
+
+def _usable(route):
+    """检查出口能否使用（socks代理需要安装PySocks）"""
+    scheme = route_scheme(route)
+    if scheme in SOCKS_SCHEMES and importlib.util.find_spec('socks') is None:
+        print(f"出口 {display_route(route)} 需要PySocks（pip install requests[socks]），已忽略")
+        return False
+    if scheme not in (DIRECT_ROUTE, 'http', 'https') + SOCKS_SCHEMES:
+        print(f"不支持的出口地址 {display_route(route)}，已忽略")
+        return False
+    return True
+
+class EgressPool(EndpointBalancer):
+    """单个平台的出口代理池"""
+
+    LABEL = '出口'
+
+    def __init__(self, platform_key, routes, mode=MODE_ROUND_ROBIN, rate_window=60, **kwargs):
+        """
+        Args:
+            platform_key (str): 平台标识
+            routes (list): 出口列表（代理地址或direct）
+            mode (str): 分配方式（round_robin或sticky）
+            rate_window (float): 统计各出口请求速率的时间窗口（秒）
+            **kwargs: 摘除相关参数，见EndpointBalancer
+        """
+        super().__init__(**kwargs)
+        self.platform_key = platform_key
+        self.routes = list(dict.fromkeys(routes))
+        self.mode = mode
+        self.rate_window = rate_window
+        self._next = 0
+        self._sent = {route: deque() for route in self.routes}
+
+        with self._lock:
+            for route in self.routes:
+                self._endpoint(route)
+
+    def _prune(self, sent, now):
+        """丢弃统计窗口之外的请求时间（调用方需持有锁）"""
+        while sent and sent[0] <= now - self.rate_window:
+            sent.popleft()
+
+    def choose(self, key=None, schemes=None):
+        """
+        为一次请求选择出口
+
+        Args:
+            key (str): sticky模式下的固定键，同一个键总是落在同一个健康出口上；
+                       出口被摘除时只有原本落在它上面的键会换出口
+            schemes (tuple): 调用方支持的出口类型，None表示全部支持
+
+        Returns:
+            str: 出口，没有可用的出口时返回direct
+        """
+        now = time.monotonic()
+        with self._lock:
+            routes = [route for route in self.routes if schemes is None or route_scheme(route) in schemes]
+            if not routes:
+                return DIRECT_ROUTE
+
+            healthy = [route for route in routes if self._endpoints[route].ejected_until <= now]
+            if not healthy:
+                # 全部出口都被摘除时用最早恢复的一个，不让请求完全停止
+                route = min(routes, key=lambda candidate: self._endpoints[candidate].ejected_until)
+            elif self.mode == MODE_STICKY and key is not None:
+                # 最高随机权重（rendezvous）哈希
+                route = max(healthy, key=lambda candidate: zlib.crc32(f'{key}|{candidate}'.encode('utf-8')))
+            else:
+                route = healthy[self._next % len(healthy)]
+                self._next += 1
+
+            self._endpoints[route].requests += 1
+            sent = self._sent[route]
+            sent.append(now)
+            self._prune(sent, now)
+            return route
+
+    def display(self, url):
+        return display_route(url)
+
+    def get_stats(self, urls=None):
+        """获取各出口的请求速率、延迟、错误率和摘除状态（代理地址去掉账号密码）"""
+        stats = super().get_stats(self.routes)
+        now = time.monotonic()
+        with self._lock:
+            for route in self.routes:
+                sent = self._sent[route]
+                self._prune(sent, now)
+                stats[route]['rate'] = round(len(sent) / self.rate_window, 3)
+        return {self.display(route): route_stats for route, route_stats in stats.items()}
+
+_pools = {}
+_lock = threading.Lock()
+
+def get_egress_pool(platform_key):
+    """获取平台的出口代理池，未启用或没有配置出口时返回None"""
+    if platform_key in _pools:
+        return _pools[platform_key]
+
+    with _lock:
+        if platform_key not in _pools:
+            settings = load_performance_settings()['egress']
+            routes = [route for route in get_egress_routes(platform_key, settings) if _usable(route)]
+            _pools[platform_key] = EgressPool(
+                platform_key,
+                routes,
+                mode=settings['mode'],
+                rate_window=settings['rate_window'],
+                eject_after=settings['eject_after'],
+                eject_duration=settings['eject_duration'],
+                max_eject_duration=settings['max_eject_duration']
+            ) if routes else None
+        return _pools[platform_key]
+
+def choose_egress(platform_key, key=None, schemes=None):
+    """为平台的一次请求选择出口，未启用出口代理池时返回None（按原方式直接发送）"""
+    pool = get_egress_pool(platform_key)
+    if pool is None:
+        return None
+    return pool.choose(key, schemes)
+
+def record_egress_result(platform_key, route, outcome, latency, responded=False):
+    """
+    记录出口上一次请求的结果
+
+    收到了目标站点的5xx响应说明出口本身是通的，按成功计入；
+    连接失败、超时和限流（412/429，按IP限流）计入出口的失败
+    """
+    pool = _pools.get(platform_key)
+    if pool is None or route is None:
+        return
+    if responded and outcome == OUTCOME_ERROR:
+        outcome = OUTCOME_SUCCESS
+    pool.record(route, outcome, latency)
+
+def get_egress_stats():
+    """获取各平台出口代理池的健康状况"""
+    with _lock:
+        pools = {platform_key: pool for platform_key, pool in _pools.items() if pool is not None}
+    return {
+        platform_key: {'mode': pool.mode, 'routes': pool.get_stats()}
+        for platform_key, pool in pools.items()
+    }
@@ -0,0 +1,196 @@
+"""
+API地址负载均衡
+同一个接口配置了多个地址时（如多个自建的抖音解析服务），为每个地址维护延迟和错误率的
+指数加权移动平均（EWMA），按评分把请求分给最快最稳的地址或按权重分摊；
+连续失败的地址被暂时摘除，到期后重新接纳，再次失败时摘除时间翻倍
+"""
+
+import time
+import random
+import threading
+
+from .config_manager import load_performance_settings
+from .rate_limiter import OUTCOME_SUCCESS, OUTCOME_TIMEOUT, OUTCOME_CANCELLED
+
+# 选择策略：best只选评分最好的地址，weighted按评分的倒数加权随机分摊
+STRATEGY_BEST = 'best'
+STRATEGY_WEIGHTED = 'weighted'
+
+class Endpoint:
+    """单个API地址的健康状况"""
+
+    def __init__(self, url, initial_latency):
+        self.url = url
+        self.latency = initial_latency
+        self.error_rate = 0.0
+        self.samples = 0
+
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejection_streak = 0
+        self.ejections = 0
+
+    def score(self):
+        """评分（越小越好）：平均延迟按成功率放大"""
+        return self.latency / max(0.05, 1.0 - self.error_rate)
+
+class EndpointBalancer:
+    """多个API地址之间的负载均衡"""
+
+    # 日志中对地址的称呼
+    LABEL = 'API地址'
+
+    def __init__(self, strategy=STRATEGY_WEIGHTED, alpha=0.3, initial_latency=1.0,
+                 eject_after=3, eject_duration=30, max_eject_duration=300):
+        """
+        Args:
+            strategy (str): 选择策略（best或weighted）
+            alpha (float): EWMA中新样本的权重
+            initial_latency (float): 还没有样本的地址的假定延迟（秒）
+            eject_after (int): 连续失败多少次后摘除
+            eject_duration (float): 首次摘除的时长（秒），连续摘除时翻倍
+            max_eject_duration (float): 摘除时长上限（秒）
+        """
+        self.strategy = strategy
+        self.alpha = alpha
+        self.initial_latency = initial_latency
+        self.eject_after = max(1, int(eject_after))
+        self.eject_duration = eject_duration
+        self.max_eject_duration = max_eject_duration
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, url):
+        """获取地址的统计，不存在时创建（调用方需持有锁）"""
+        endpoint = self._endpoints.get(url)
+        if endpoint is None:
+            endpoint = self._endpoints[url] = Endpoint(url, self.initial_latency)
+        return endpoint
+
+    def choose(self, urls):
+        """
+        从候选地址中选择本次请求使用的地址
+
+        全部地址都被摘除时选最早恢复的一个，不让请求完全停止
+        """
+        now = time.monotonic()
+        with self._lock:
+            endpoints = [self._endpoint(url) for url in urls]
+            healthy = [endpoint for endpoint in endpoints if endpoint.ejected_until <= now]
+
+            if not healthy:
+                chosen = min(endpoints, key=lambda endpoint: endpoint.ejected_until)
+            elif self.strategy == STRATEGY_BEST:
+                chosen = min(healthy, key=Endpoint.score)
+            else:
+                chosen = random.choices(healthy, weights=[1 / endpoint.score() for endpoint in healthy])[0]
+
+            chosen.requests += 1
+            return chosen.url
+
+    def record(self, url, outcome, latency):
+        """
+        记录一次请求结果
+
+        Args:
+            url (str): 请求地址，不是负载均衡中的地址时忽略
+            outcome (str): 请求结果（OUTCOME_*）
+            latency (float): 耗时（秒）
+        """
+        if outcome == OUTCOME_CANCELLED:
+            return
+
+        success = outcome == OUTCOME_SUCCESS
+        with self._lock:
+            endpoint = self._endpoints.get(url)
+            if endpoint is None:
+                return
+
+            # 快速失败（连接被拒等）的耗时不代表地址的响应速度，只计入错误率
+            if success or outcome == OUTCOME_TIMEOUT:
+                if endpoint.samples == 0:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency = self.alpha * latency + (1 - self.alpha) * endpoint.latency
+                endpoint.samples += 1
+            endpoint.error_rate = self.alpha * (0.0 if success else 1.0) + (1 - self.alpha) * endpoint.error_rate
+
+            if success:
+                endpoint.consecutive_failures = 0
+                endpoint.ejection_streak = 0
+                return
+
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            now = time.monotonic()
+            # 重新接纳后仍然失败时立即再次摘除
+            if endpoint.consecutive_failures >= self.eject_after and endpoint.ejected_until <= now:
+                duration = min(self.max_eject_duration, self.eject_duration * (2 ** endpoint.ejection_streak))
+                endpoint.ejected_until = now + duration
+                endpoint.ejection_streak += 1
+                endpoint.ejections += 1
+                print(f"摘除{self.LABEL} {self.display(url)}（连续失败{endpoint.consecutive_failures}次，{duration:g}秒后重新接纳）")
+
+    def display(self, url):
+        """日志中显示的地址"""
+        return url
+
+    def get_stats(self, urls=None):
+        """获取各地址的延迟、错误率和摘除状态"""
+        now = time.monotonic()
+        with self._lock:
+            endpoints = [self._endpoints[url] for url in (urls or self._endpoints) if url in self._endpoints]
+            stats = {}
+            for endpoint in endpoints:
+                ejected = endpoint.ejected_until > now
+                stats[endpoint.url] = {
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures,
+                    'ewma_latency': round(endpoint.latency, 3),
+                    'ewma_error_rate': round(endpoint.error_rate, 3),
+                    'score': round(endpoint.score(), 3),
+                    'ejected': ejected,
+                    'ejections': endpoint.ejections
+                }
+                if ejected:
+                    stats[endpoint.url]['readmit_in'] = round(endpoint.ejected_until - now, 1)
+            return stats
+
+_balancer = None
+_lock = threading.Lock()
+
+def get_endpoint_balancer():
+    """获取全局的API地址负载均衡器，不存在时按性能设置创建"""
+    global _balancer
+    if _balancer is not None:
+        return _balancer
+
+    with _lock:
+        if _balancer is None:
+            settings = load_performance_settings()['api_endpoints']
+            _balancer = EndpointBalancer(
+                strategy=settings['strategy'],
+                alpha=settings['ewma_alpha'],
+                initial_latency=settings['initial_latency'],
+                eject_after=settings['eject_after'],
+                eject_duration=settings['eject_duration'],
+                max_eject_duration=settings['max_eject_duration']
+            )
+        return _balancer
+
+def choose_endpoint(urls):
+    """从多个API地址中选择一个"""
+    return get_endpoint_balancer().choose(urls)
+
+def record_endpoint_result(url, outcome, latency):
+    """记录请求结果，只有参与负载均衡的地址会被统计"""
+    if _balancer is not None:
+        _balancer.record(url, outcome, latency)
+
+def get_endpoint_stats(urls=None):
+    """获取API地址的统计，urls为None时返回全部"""
+    if _balancer is None:
+        return {}
+    return _balancer.get_stats(urls)
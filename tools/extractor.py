@@ -0,0 +1,173 @@
+"""
+声明式页面字段提取
+检测器声明每个字段的正则备选写法与后处理，提取器预编译全部正则；
+同一份页面只提取一次，状态、信息、房间号等解析逻辑共用结果。
+字段按需提取：只在首选写法缺失时才会用到的备选字段不会白白扫描整个页面
+"""
+
+import re
+import json
+
+_json_decoder = json.JSONDecoder()
+
+# 正则中可以直接作为字面量的转义字符
+_ESCAPED_LITERALS = set('$.^*+?()[]{}|\\/-"\'<>=:# ')
+
+def _literal_prefix(pattern):
+    """取正则开头的字面量部分，用于先用str.find快速定位候选位置"""
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 < len(pattern) and pattern[i + 1] in _ESCAPED_LITERALS:
+                prefix.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        if char in '.^$*+?()[]{}|':
+            break
+        prefix.append(char)
+        i += 1
+
+    # 紧跟量词时最后一个字符不是必需的
+    if i < len(pattern) and pattern[i] in '*?{' and prefix:
+        prefix.pop()
+    return ''.join(prefix)
+
+class Field:
+    """页面字段声明"""
+
+    def __init__(self, name, patterns, transform=None, default=None, flags=0):
+        """
+        Args:
+            name (str): 字段名
+            patterns (tuple): 正则备选写法，按优先级排列；有捕获组时取第一组，否则取整个匹配
+            transform (callable): 匹配值的后处理，如clean_url
+            default: 所有写法都没有匹配时的值
+            flags (int): 正则标志
+        """
+        self.name = name
+        self.transform = transform
+        self.default = default
+        self.alternatives = []
+        for pattern in patterns:
+            compiled = re.compile(pattern, flags)
+            # 忽略大小写时字面量无法直接查找，退回整体搜索
+            anchor = '' if flags & re.IGNORECASE else _literal_prefix(pattern)
+            self.alternatives.append((anchor, compiled))
+
+    def _search(self, anchor, compiled, text):
+        if not anchor:
+            return compiled.search(text)
+
+        # 先用字面量定位候选位置，只在候选处尝试完整正则
+        position = text.find(anchor)
+        while position != -1:
+            match = compiled.match(text, position)
+            if match:
+                return match
+            position = text.find(anchor, position + 1)
+        return None
+
+    def extract(self, text):
+        """按优先级尝试各写法，返回第一个匹配的值"""
+        for anchor, compiled in self.alternatives:
+            match = self._search(anchor, compiled, text)
+            if match:
+                value = match.group(1) if compiled.groups else match.group(0)
+                return self.transform(value) if self.transform else value
+        return self.default
+
+class JsonIsland:
+    """页面脚本中内嵌的JSON变量（var NAME = {...};）"""
+
+    def __init__(self, name, variable, keys=None):
+        """
+        Args:
+            name (str): 字段名
+            variable (str): JS变量名，如TT_ROOM_DATA
+            keys (tuple): 只保留的键，None表示保留整个对象
+        """
+        self.name = name
+        self.variable = variable
+        self.keys = keys
+
+    def _value_offset(self, text, position):
+        """确认该处是 var 变量 = 声明，返回值的起始位置，不是时返回None"""
+        # 变量名前面是空白加 var 关键字
+        index = position - 1
+        while index >= 0 and text[index].isspace():
+            index -= 1
+        if index == position - 1 or index < 2 or text[index - 2:index + 1] != 'var':
+            return None
+        if index >= 3 and (text[index - 3].isalnum() or text[index - 3] in '_$'):
+            return None
+
+        offset = position + len(self.variable)
+        length = len(text)
+        while offset < length and text[offset].isspace():
+            offset += 1
+        if offset >= length or text[offset] != '=':
+            return None
+        offset += 1
+        while offset < length and text[offset].isspace():
+            offset += 1
+        return offset
+
+    def extract(self, text):
+        """
+        用子串查找定位变量声明，从值的起始位置只解码一个JSON值
+
+        Returns:
+            dict: 解析结果（按keys筛选），找不到或解析失败时返回None
+        """
+        position = text.find(self.variable)
+        while position != -1:
+            offset = self._value_offset(text, position)
+            if offset is not None:
+                try:
+                    value, _ = _json_decoder.raw_decode(text, offset)
+                except ValueError:
+                    return None
+                if not isinstance(value, dict):
+                    return None
+                if self.keys is not None:
+                    value = {key: value[key] for key in self.keys if key in value}
+                return value
+            position = text.find(self.variable, position + 1)
+        return None
+
+class PageFields(dict):
+    """提取结果，首次访问字段时才提取，检测器的解析方法收到它时不再重复提取"""
+
+    def __init__(self, fields, text):
+        super().__init__()
+        self._fields = fields
+        self._text = text
+
+    def __missing__(self, name):
+        value = self._fields[name].extract(self._text)
+        self[name] = value
+        return value
+
+class Extractor:
+    """页面字段提取器"""
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields (tuple): Field或JsonIsland列表
+        """
+        self.fields = {field.name: field for field in fields}
+
+    def extract(self, text):
+        """
+        绑定页面，返回按需提取的字段集合
+
+        Returns:
+            PageFields: {字段名: 值}
+        """
+        if isinstance(text, PageFields):
+            return text
+        return PageFields(self.fields, text)
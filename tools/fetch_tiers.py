@@ -0,0 +1,157 @@
+"""
+直播间数据的分层获取
+检测器按优先级声明若干获取层级（轻量JSON接口在前，完整直播间页面兜底），
+依次尝试直到某一层返回完整数据；按层统计最近的失败率，
+失败率过高的层级暂时降级跳过，冷却后重新尝试。最后一层（页面）不会被降级
+"""
+
+import time
+import threading
+from collections import deque
+
+from .config_manager import load_performance_settings
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceeded
+from .rate_limiter import RateLimitTimeout
+
+# 完整直播间页面对应的层级名（build_room_request / parse_snapshot）
+PAGE_TIER = 'page'
+
+# 与层级本身无关、继续尝试下一层也没有意义的错误：刷新预算用完、平台限流等待超时
+ABORT_ERRORS = (DeadlineExceeded, RateLimitTimeout)
+
+class TierHealth:
+    """单个获取层级的健康统计"""
+
+    def __init__(self, window=20, min_samples=5, failure_threshold=0.5, demote_duration=600):
+        """
+        Args:
+            window (int): 统计最近多少次尝试
+            min_samples (int): 至少多少次尝试后才判断是否降级
+            failure_threshold (float): 失败率达到该值时降级
+            demote_duration (float): 降级持续时间（秒）
+        """
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.demote_duration = demote_duration
+        self._recent = deque(maxlen=max(1, int(window)))
+        self.demoted_until = 0.0
+        self.stats = {
+            'attempts': 0,
+            'served': 0,
+            'failures': 0,
+            'demotions': 0
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def demoted(self):
+        return time.monotonic() < self.demoted_until
+
+    def record(self, success, can_demote=True):
+        """
+        记录一次尝试
+
+        Returns:
+            bool: 这次失败是否导致了降级
+        """
+        with self._lock:
+            self.stats['attempts'] += 1
+            self.stats['served' if success else 'failures'] += 1
+            self._recent.append(success)
+
+            if success or not can_demote or len(self._recent) < self.min_samples:
+                return False
+            failure_rate = self._recent.count(False) / len(self._recent)
+            if failure_rate < self.failure_threshold:
+                return False
+
+            # 降级后清空窗口，冷却结束重新开始统计
+            self.demoted_until = time.monotonic() + self.demote_duration
+            self.stats['demotions'] += 1
+            self._recent.clear()
+            return True
+
+    def get_stats(self):
+        """获取计数、最近失败率和降级状态"""
+        with self._lock:
+            stats = dict(self.stats)
+            recent = list(self._recent)
+        stats['recent_failure_rate'] = round(recent.count(False) / len(recent), 3) if recent else 0
+        stats['demoted'] = self.demoted
+        if stats['demoted']:
+            stats['retry_in'] = round(self.demoted_until - time.monotonic(), 1)
+        return stats
+
+_health = {}
+_lock = threading.Lock()
+
+def get_tier_health(platform_key, tier):
+    """获取平台某个层级的健康统计，不存在时按性能设置创建"""
+    key = (platform_key, tier)
+    health = _health.get(key)
+    if health is not None:
+        return health
+
+    with _lock:
+        if key not in _health:
+            settings = load_performance_settings()['fetch_tiers']
+            _health[key] = TierHealth(
+                window=settings['window'],
+                min_samples=settings['min_samples'],
+                failure_threshold=settings['failure_threshold'],
+                demote_duration=settings['demote_duration']
+            )
+        return _health[key]
+
+def plan_tiers(platform_key, declared_tiers):
+    """
+    本次获取依次尝试的层级
+
+    Args:
+        platform_key (str): 平台标识
+        declared_tiers (tuple): 检测器声明的层级，最后一个为兜底层级
+
+    Returns:
+        list: 去掉已降级层级后的顺序；设置中可为平台调整顺序或关闭部分层级
+    """
+    settings = load_performance_settings()['fetch_tiers']
+    fallback = declared_tiers[-1]
+    if not settings['enabled']:
+        return [fallback]
+
+    configured = settings['platforms'].get(platform_key)
+    tiers = [tier for tier in (configured or declared_tiers) if tier in declared_tiers and tier != fallback]
+    tiers = [tier for tier in tiers if not get_tier_health(platform_key, tier).demoted]
+    return tiers + [fallback]
+
+def record_tier_success(platform_key, tier, snapshot):
+    """记录成功的层级，并在快照中标明数据来源"""
+    get_tier_health(platform_key, tier).record(True)
+    snapshot['tier'] = tier
+    return snapshot
+
+def record_tier_failure(platform_key, tier, error, is_last):
+    """
+    处理某一层级的失败：需要中止或已是最后一层时重新抛出，否则记录失败后返回以尝试下一层
+
+    目标站点熔断不计入层级失败（不是该层级本身的问题）；兜底层级只统计不降级
+    """
+    if isinstance(error, ABORT_ERRORS):
+        raise error
+
+    if not isinstance(error, CircuitOpenError):
+        if get_tier_health(platform_key, tier).record(False, can_demote=not is_last):
+            print(f"{platform_key} 获取层级 {tier} 失败率过高，暂时降级: {error}")
+
+    if is_last:
+        raise error
+
+def get_tier_stats():
+    """获取各平台各层级的服务次数与健康状况"""
+    with _lock:
+        health = dict(_health)
+    stats = {}
+    for (platform_key, tier), tier_health in health.items():
+        stats.setdefault(platform_key, {})[tier] = tier_health.get_stats()
+    return stats
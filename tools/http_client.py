@@ -0,0 +1,413 @@
+"""
+平台HTTP会话层
+为每个平台维护一个共享的keep-alive会话（带连接池），默认请求头挂在会话上，
+所有检测器的网络请求都经由这里发出
+"""
+
+import time
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config_manager import load_performance_settings
+from .stream_scanner import scan_chunks
+from .page_decoding import declared_charset
+from .circuit_breaker import get_breaker
+from .latency_tracker import get_latency_tracker, get_request_timeout
+from .endpoint_balancer import record_endpoint_result
+from .traffic_meter import record_outbound
+from .egress_pool import choose_egress, record_egress_result, proxies_for
+from .deadline import DeadlineExceeded, get_current_deadline
+from .retry_policy import get_retry_policy, get_retry_budget, backoff_delay, hedge_delay
+from .rate_limiter import (
+    get_rate_limiter, classify_status, RateLimitTimeout, BREAKER_FAILURE_OUTCOMES,
+    OUTCOME_SUCCESS, OUTCOME_THROTTLED, OUTCOME_ERROR, OUTCOME_TIMEOUT, OUTCOME_CANCELLED
+)
+
+# 可以安全重试和对冲的请求方法
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_sessions = {}
+_request_counts = {}
+_stream_stats = {}
+_lock = threading.Lock()
+# 对冲请求共用的 (线程池, 名额)，首次对冲时按性能设置创建
+_hedge_pool = None
+
+def _create_session(platform_key, default_headers):
+    """创建带连接池的会话"""
+    settings = load_performance_settings()['http']
+    pool_maxsize = settings['pool_maxsize'].get(platform_key, settings['default_pool_maxsize'])
+
+    session = requests.Session()
+    # 会话只用于连接复用，不在不同用户的请求之间保存Cookie
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.headers.update(default_headers or {})
+
+    adapter = HTTPAdapter(
+        pool_connections=settings['pool_connections'],
+        pool_maxsize=pool_maxsize,
+        pool_block=settings['pool_block']
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(platform_key, default_headers=None):
+    """获取平台的共享会话，不存在时用给定的默认请求头创建"""
+    session = _sessions.get(platform_key)
+    if session is not None:
+        return session
+
+    with _lock:
+        if platform_key not in _sessions:
+            _sessions[platform_key] = _create_session(platform_key, default_headers)
+            _request_counts[platform_key] = 0
+        return _sessions[platform_key]
+
+def resolve_timeout(platform_key, timeout=None):
+    """
+    确定本次请求的超时：未指定时使用平台的自适应超时，并且不超过当前刷新的剩余预算
+
+    Returns:
+        tuple: (连接超时, 读超时)
+
+    Raises:
+        DeadlineExceeded: 刷新时间预算已用完
+    """
+    if timeout is None:
+        connect_timeout, read_timeout = get_request_timeout(platform_key)
+    elif isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+    else:
+        connect_timeout = read_timeout = timeout
+
+    deadline = get_current_deadline()
+    if deadline is not None:
+        deadline.check()
+        remaining = deadline.remaining()
+        connect_timeout, read_timeout = min(connect_timeout, remaining), min(read_timeout, remaining)
+    return connect_timeout, read_timeout
+
+def settle_request(platform_key, url, limiter, breaker, outcome, latency):
+    """请求结束后归还限流许可，并记录熔断结果、延迟样本、API地址的健康状况和出站流量"""
+    limiter.release(outcome, latency)
+    record_endpoint_result(url, outcome, latency)
+    record_outbound(platform_key)
+
+    # 因刷新预算用完而中止的请求不代表站点状态
+    if outcome == OUTCOME_CANCELLED:
+        breaker.cancel()
+        return
+
+    breaker.record(outcome not in BREAKER_FAILURE_OUTCOMES)
+    # 超时的请求按超时时长记为样本，站点整体变慢时超时能随之放宽
+    if outcome in (OUTCOME_SUCCESS, OUTCOME_THROTTLED, OUTCOME_TIMEOUT):
+        get_latency_tracker(platform_key).record(latency)
+
+def _send(method, platform_key, url, params=None, headers=None, timeout=None, default_headers=None,
+          egress_key=None, **kwargs):
+    """
+    通过平台会话发送一次请求（不重试），参数与request相同
+
+    Raises:
+        CircuitOpenError: 目标站点处于熔断状态
+        RateLimitTimeout: 等待平台限流许可超时
+        DeadlineExceeded: 刷新时间预算已用完
+    """
+    session = get_session(platform_key, default_headers)
+    deadline = get_current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+    # 目标站点熔断时直接失败，不再等待超时
+    breaker = get_breaker(url)
+    breaker.acquire()
+
+    with _lock:
+        _request_counts[platform_key] += 1
+
+    # 经过平台限流器：令牌桶控制速率，AIMD窗口控制并发
+    limiter = get_rate_limiter(platform_key)
+    try:
+        limiter.acquire(max_wait=min(limiter.max_wait, deadline.remaining()) if deadline else None)
+    except RateLimitTimeout:
+        breaker.cancel()
+        if deadline is not None:
+            deadline.check()
+        raise
+    except Exception:
+        breaker.cancel()
+        raise
+
+    # 启用了出口代理池时选择本次请求的出口
+    route = choose_egress(platform_key, egress_key or f'{url}|{params}')
+    if route is not None:
+        kwargs['proxies'] = proxies_for(route)
+
+    start = time.monotonic()
+    outcome = OUTCOME_CANCELLED
+    response = None
+    try:
+        # 排队等待许可后再按剩余预算确定超时
+        request_timeout = resolve_timeout(platform_key, timeout)
+        outcome = OUTCOME_ERROR
+        response = session.request(method, url, params=params, headers=headers, timeout=request_timeout, **kwargs)
+        outcome = classify_status(response.status_code)
+        return response
+    except requests.Timeout as e:
+        if deadline is not None and deadline.expired:
+            outcome = OUTCOME_CANCELLED
+            raise DeadlineExceeded(f"超出刷新时间预算（{deadline.seconds:g}秒）") from e
+        outcome = OUTCOME_TIMEOUT
+        raise
+    finally:
+        latency = time.monotonic() - start
+        settle_request(platform_key, url, limiter, breaker, outcome, latency)
+        record_egress_result(platform_key, route, outcome, latency, responded=response is not None)
+
+def _get_hedge_pool():
+    """获取对冲请求共用的线程池和名额，每个名额对应线程池中的两个线程"""
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _lock:
+            if _hedge_pool is None:
+                max_concurrent = max(1, int(load_performance_settings()['retry']['hedge_max_concurrent']))
+                _hedge_pool = (
+                    ThreadPoolExecutor(max_workers=2 * max_concurrent, thread_name_prefix='hedge'),
+                    threading.BoundedSemaphore(max_concurrent)
+                )
+    return _hedge_pool
+
+def _send_hedged(platform_key, delay, budget, send):
+    """
+    发出请求，超过delay秒仍未返回时再发一个对冲请求，取先成功返回的响应
+
+    两个请求在共用的对冲线程池中执行（带上当前上下文中的刷新预算），落败请求的响应在返回后直接关闭；
+    名额在两个请求都结束后归还，同时对冲的请求数达到上限时直接在当前线程发送、不对冲
+    """
+    executor, slots = _get_hedge_pool()
+    if not slots.acquire(blocking=False):
+        return send()
+
+    results = queue.Queue()
+    lock = threading.Lock()
+    state = {'settled': False, 'running': 0}
+
+    def attempt(index):
+        try:
+            result = (index, send(), None)
+        except Exception as e:
+            result = (index, None, e)
+        with lock:
+            state['running'] -= 1
+            if not state['settled']:
+                results.put(result)
+                return
+            release = state['running'] == 0
+        if result[1] is not None:
+            result[1].close()
+        if release:
+            slots.release()
+
+    def launch(index):
+        with lock:
+            state['running'] += 1
+        executor.submit(contextvars.copy_context().run, attempt, index)
+
+    launch(0)
+    launched = 1
+    try:
+        result = results.get(timeout=delay)
+    except queue.Empty:
+        if budget.try_withdraw('hedges'):
+            launch(1)
+            launched = 2
+        result = results.get()
+
+    # 先返回的是异常时等另一个请求的结果
+    received = 1
+    while result[2] is not None and received < launched:
+        result = results.get()
+        received += 1
+
+    with lock:
+        state['settled'] = True
+        release = state['running'] == 0
+    while not results.empty():
+        _, response, _ = results.get_nowait()
+        if response is not None:
+            response.close()
+    if release:
+        slots.release()
+
+    index, response, error = result
+    if error is not None:
+        raise error
+    if index == 1:
+        budget.record_hedge_win()
+    return response
+
+def plan_retry(platform_key, url, policy, budget, attempt, max_attempts, reason):
+    """
+    判断第attempt次尝试失败后能否重试
+
+    Returns:
+        float: 重试前需要等待的时间（秒），不能重试时返回None
+    """
+    if attempt + 1 >= max_attempts:
+        return None
+
+    delay = backoff_delay(policy, attempt)
+    # 退避后已经没有剩余预算时不再重试
+    deadline = get_current_deadline()
+    if deadline is not None and deadline.remaining() <= delay:
+        return None
+    if not budget.try_withdraw():
+        return None
+
+    print(f"请求重试 {platform_key} {url}（第{attempt + 1}次，{reason}）")
+    return delay
+
+def request(method, platform_key, url, params=None, headers=None, timeout=None, default_headers=None,
+            idempotent=None, egress_key=None, **kwargs):
+    """
+    通过平台会话发送请求，幂等请求遇到瞬时失败时按平台策略重试，慢请求可对冲
+
+    Args:
+        method (str): 请求方法
+        platform_key (str): 平台标识
+        url (str): 请求地址
+        params (dict): 查询参数
+        headers (dict): 本次请求的额外请求头，与会话默认请求头合并
+        timeout: 超时（秒，或 (连接超时, 读超时)），None表示使用平台的自适应超时
+        default_headers (dict): 会话首次创建时使用的默认请求头
+        idempotent (bool): 请求是否可以安全重试，None表示按请求方法判断
+        egress_key (str): sticky出口分配的固定键（如设备身份），None表示按请求地址和参数
+
+    Raises:
+        CircuitOpenError: 目标站点处于熔断状态
+        RateLimitTimeout: 等待平台限流许可超时
+        DeadlineExceeded: 刷新时间预算已用完
+    """
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+    policy = get_retry_policy(platform_key)
+    budget = get_retry_budget(platform_key)
+    budget.record_request()
+    max_attempts = policy['max_attempts'] if idempotent else 1
+
+    def send():
+        return _send(method, platform_key, url, params=params, headers=headers, timeout=timeout,
+                     default_headers=default_headers, egress_key=egress_key, **kwargs)
+
+    attempt = 0
+    while True:
+        delay = hedge_delay(platform_key, policy) if idempotent else None
+        try:
+            response = _send_hedged(platform_key, delay, budget, send) if delay is not None else send()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retry_in = plan_retry(platform_key, url, policy, budget, attempt, max_attempts, type(e).__name__)
+            if retry_in is None:
+                raise
+        else:
+            if response.status_code not in policy['retry_statuses']:
+                return response
+            retry_in = plan_retry(platform_key, url, policy, budget, attempt, max_attempts, response.status_code)
+            if retry_in is None:
+                return response
+            response.close()
+        time.sleep(retry_in)
+        attempt += 1
+
+def get(platform_key, url, **kwargs):
+    """通过平台会话发送GET请求"""
+    return request('GET', platform_key, url, **kwargs)
+
+def post(platform_key, url, **kwargs):
+    """通过平台会话发送POST请求"""
+    return request('POST', platform_key, url, **kwargs)
+
+def record_stream(platform_key, bytes_read, stopped_early):
+    """记录一次流式读取的字节数及是否提前断开"""
+    with _lock:
+        stats = _stream_stats.setdefault(platform_key, {
+            'responses': 0,
+            'stopped_early': 0,
+            'bytes_read': 0
+        })
+        stats['responses'] += 1
+        stats['bytes_read'] += bytes_read
+        if stopped_early:
+            stats['stopped_early'] += 1
+
+def read_streamed(platform_key, response, markers):
+    """
+    流式读取响应体，只保留标记匹配到的片段，全部找到后关闭连接
+
+    提前关闭的连接不会回到连接池，换来的是不用下载页面剩余部分
+
+    Returns:
+        str: 按页面顺序拼接的片段；读到结尾仍有标记没找到时为整个页面
+    """
+    settings = load_performance_settings()['streaming']
+    try:
+        payload, stopped_early, bytes_read = scan_chunks(
+            response.iter_content(chunk_size=settings['chunk_size']),
+            markers,
+            encoding=declared_charset(response.headers.get('Content-Type')),
+            tail_size=settings['tail_size']
+        )
+    finally:
+        response.close()
+
+    record_stream(platform_key, bytes_read, stopped_early)
+    return payload
+
+def _pool_stats(adapter):
+    """读取适配器中各主机连接池的连接复用情况"""
+    pools = {}
+    pool_manager = adapter.poolmanager
+    for key in list(pool_manager.pools.keys()):
+        pool = pool_manager.pools.get(key)
+        if pool is None:
+            continue
+        host = f"{pool.scheme}://{pool.host}:{pool.port}"
+        num_requests = getattr(pool, 'num_requests', 0)
+        num_connections = getattr(pool, 'num_connections', 0)
+        pools[host] = {
+            'requests': num_requests,
+            'new_connections': num_connections,
+            'reused_connections': max(0, num_requests - num_connections),
+            'idle_connections': sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+        }
+    return pools
+
+def get_session_stats():
+    """获取各平台会话的连接复用统计"""
+    stats = {}
+    with _lock:
+        sessions = dict(_sessions)
+        request_counts = dict(_request_counts)
+        stream_stats = {key: dict(value) for key, value in _stream_stats.items()}
+
+    for platform_key, session in sessions.items():
+        pools = _pool_stats(session.get_adapter('https://'))
+        total_requests = sum(pool['requests'] for pool in pools.values())
+        total_reused = sum(pool['reused_connections'] for pool in pools.values())
+        stats[platform_key] = {
+            'requests': request_counts.get(platform_key, 0),
+            'reuse_ratio': round(total_reused / total_requests, 3) if total_requests else 0,
+            'pools': pools
+        }
+
+    # 异步引擎不经过会话，流式读取统计单独合并
+    for platform_key, stream in stream_stats.items():
+        stats.setdefault(platform_key, {})['stream'] = stream
+    return stats
@@ -3,19 +3,65 @@
 基于TT_ROOM_DATA和TT_PROFILE_INFO变量判断直播间状态
 """
 
-import requests
 import re
-import json
 from urllib.parse import urlparse
 
-class HuyaChecker:
+from .base_checker import BaseChecker
+from .extractor import Extractor, Field, JsonIsland
+from .circuit_breaker import CircuitOpenError
+from .fetch_tiers import PAGE_TIER
+
+# 流式标记中内嵌JSON对象的最大长度，需小于streaming.tail_size，保证整个对象能留在扫描缓冲区内
+JSON_MARKER_MAX_LENGTH = 12288
+
+def _json_marker(variable):
+    """
+    内嵌JSON变量的流式标记：从 var 变量 = { 截取到对象结尾的 };
+
+    虎牙把TT_ROOM_DATA、TT_PROFILE_INFO和体积很大的TT_PLAYER_INFO放在同一个脚本里，
+    截取到</script>会超出扫描缓冲区而匹配不到；
+    结尾的 }; 之后须是下一条语句或脚本结束，字符串里出现的 }; 不会截断对象
+    """
+    return (
+        rf'var\s+{variable}\s*=\s*\{{.{{0,{JSON_MARKER_MAX_LENGTH}}}?\}};'
+        r'(?=\s*(?:var\s|window\.|</script>|$))'
+    )
+
+class HuyaChecker(BaseChecker):
     PLATFORM_NAME = "虎牙"
+    PLATFORM_KEY = "huya"
     BASE_URL = "https://www.huya.com"
-    
+    MP_API_URL = "https://mp.huya.com/cache.php"
+    RESPONSE_TYPE = 'text'
+    ROOM_ID_NEEDS_PAGE = True
+    FAILED_POPULAR_NUM = '0'
+
+    # 先用移动端的profileRoom接口，不可用时抓取直播间页面
+    SNAPSHOT_TIERS = ('mp_api', PAGE_TIER)
+
+    # 流式读取页面时需要找到的标记，每组第一个为首选，其余与解析器的备选写法对应
+    ROOM_ID_MARKERS = (
+        (_json_marker('TT_PROFILE_INFO'), r'data-roomid=["\'][^"\']+["\']',
+         r'window\.HNF_GLOBAL\s*=\s*\{.*?roomId:\s*["\'][^"\']+["\']'),
+    )
+    SNAPSHOT_MARKERS = (
+        (_json_marker('TT_ROOM_DATA'), r'(?i)<title>[^<]+</title>'),
+        (_json_marker('TT_PROFILE_INFO'), r'<h1[^>]*>\s*<span[^>]*>[^<]+</span>')
+    )
+
+    # 页面字段声明：内嵌JSON只解码一个值，只保留用到的键
+    PAGE_EXTRACTOR = Extractor((
+        JsonIsland('room_data', 'TT_ROOM_DATA', ('state', 'introduction', 'screenshot', 'screenshotUrl', 'totalCount')),
+        JsonIsland('profile', 'TT_PROFILE_INFO', ('nick', 'avatar', 'profileRoom')),
+        Field('title', (r'<title>([^<]+)</title>',), flags=re.IGNORECASE),
+        Field('h1_anchor', (r'<h1[^>]*>\s*<span[^>]*>([^<]+)</span>',), str.strip),
+        Field('data_room_id', (r'data-roomid=["\']([^"\']+)["\']',)),
+        Field('global_room_id', (r'window\.HNF_GLOBAL\s*=\s*\{.*?roomId:\s*["\']([^"\']+)["\']',), flags=re.DOTALL)
+    ))
+
     @classmethod
-    def extract_room_id(cls, url):
-        """从虎牙直播间URL对应的页面中提取房间号"""
-        # 检查域名是否为huya.com
+    def validate_url(cls, url):
+        """检查域名是否为huya.com"""
         try:
             parsed_url = urlparse(url)
             domain = parsed_url.netloc.lower()
@@ -23,179 +69,214 @@ class HuyaChecker:
                 raise ValueError(f"域名不是huya.com: {url}")
         except Exception as e:
             raise ValueError(f"无效的URL: {url}")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': url
+        return parsed_url
+
+    @classmethod
+    def build_room_id_request(cls, url):
+        """构建获取真实房间号的页面请求"""
+        return {
+            'url': url,
+            'headers': {
+                'Referer': url
+            },
+            'stream_markers': cls.ROOM_ID_MARKERS
         }
-        
+
+    @classmethod
+    def parse_room_id(cls, html_content, url):
+        """从页面HTML中解析真实房间号"""
+        fields = cls.extract_fields(html_content)
+
+        # 方法1: 从TT_PROFILE_INFO中提取profileRoom
+        real_room_id = cls._profile_room(fields)
+        if real_room_id:
+            return real_room_id
+
+        # 方法2: 如果无法从JSON获取，从URL路径中提取
+        path = urlparse(url).path.strip('/')
+        if path and not path.startswith('?'):
+            return path.split('/')[0]
+
+        # 方法3: 从页面HTML中提取房间标识符
+        if fields['data_room_id']:
+            return fields['data_room_id']
+
+        # 方法4: 从window.HNF_GLOBAL变量中提取
+        if fields['global_room_id']:
+            return fields['global_room_id']
+
+        # 如果所有方法都失败，抛出错误
+        raise ValueError(f"无法从页面提取房间号: {url}")
+
+    @staticmethod
+    def _profile_room(fields):
+        """TT_PROFILE_INFO中的profileRoom，没有时返回None"""
+        profile_info = fields['profile']
+        if profile_info is None:
+            return None
+        return str(profile_info.get('profileRoom', '')) or None
+
+    @classmethod
+    def parse_resolved_room_id(cls, html_content):
+        """从TT_PROFILE_INFO中解析profileRoom"""
+        return cls._profile_room(cls.extract_fields(html_content))
+
+    @classmethod
+    def extract_room_id(cls, url):
+        """从虎牙直播间URL对应的页面中提取房间号"""
+        cls.validate_url(url)
+
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            html_content = response.text
-            
-            # 从页面内容中提取真实房间号
-            # 方法1: 从TT_PROFILE_INFO中提取profileRoom
-            profile_info_match = re.search(r'var\s+TT_PROFILE_INFO\s*=\s*(\{.*?\});', html_content, re.DOTALL)
-            if profile_info_match:
-                try:
-                    profile_info = json.loads(profile_info_match.group(1))
-                    real_room_id = str(profile_info.get('profileRoom', ''))
-                    if real_room_id:
-                        return real_room_id
-                except:
-                    pass
-            
-            # 方法2: 如果无法从JSON获取，从URL路径中提取
-            path = parsed_url.path.strip('/')
-            if path and not path.startswith('?'):
-                return path.split('/')[0]
-                
-            # 方法3: 从页面HTML中提取房间标识符
-            room_id_match = re.search(r'data-roomid=["\']([^"\']+)["\']', html_content)
-            if room_id_match:
-                return room_id_match.group(1)
-                
-            # 方法4: 从window.HNF_GLOBAL变量中提取
-            global_match = re.search(r'window\.HNF_GLOBAL\s*=\s*\{.*?roomId:\s*["\']([^"\']+)["\']', html_content, re.DOTALL)
-            if global_match:
-                return global_match.group(1)
-                
-            # 如果所有方法都失败，抛出错误
-            raise ValueError(f"无法从页面提取房间号: {url}")
-            
-        except requests.RequestException as e:
+            html_content = cls._request(cls.build_room_id_request(url))
+        except CircuitOpenError:
+            raise
+        except ConnectionError as e:
             raise ConnectionError(f"获取页面失败: {e}")
-    
+
+        return cls.parse_room_id(html_content, url)
+
+    @classmethod
+    def build_room_request(cls, room_id, api_url=None):
+        """构建直播间页面请求"""
+        return {
+            'url': f'{cls.BASE_URL}/{room_id}',
+            'headers': {
+                'Referer': f'{cls.BASE_URL}/{room_id}'
+            },
+            'stream_markers': cls.SNAPSHOT_MARKERS
+        }
+
+    @classmethod
+    def build_mp_api_request(cls, room_id):
+        """构建mp.huya.com的profileRoom接口请求"""
+        return {
+            'url': cls.MP_API_URL,
+            'params': {'m': 'Live', 'do': 'profileRoom', 'roomid': room_id},
+            'headers': {
+                'Referer': f'{cls.BASE_URL}/{room_id}'
+            },
+            'response_type': 'json'
+        }
+
+    @classmethod
+    def parse_mp_api_snapshot(cls, data, room_id):
+        """从profileRoom接口响应中解析快照，缺少直播状态或主播名时抛出ValueError"""
+        if not isinstance(data, dict) or data.get('status') != 200 or not isinstance(data.get('data'), dict):
+            raise ValueError(f"mp接口返回错误: {data.get('message') if isinstance(data, dict) else data}")
+
+        payload = data['data']
+        profile_info = payload.get('profileInfo') or {}
+        live_data = payload.get('liveData') or {}
+
+        state = str(payload.get('liveStatus') or payload.get('realLiveStatus') or '').upper()
+        anchor_name = profile_info.get('nick') or live_data.get('nick')
+        if not state or not anchor_name:
+            raise ValueError("mp接口数据缺少直播状态或主播名")
+
+        real_room_id = str(profile_info.get('profileRoom') or room_id)
+        total_count = live_data.get('totalCount')
+        snapshot = {
+            'platform': cls.PLATFORM_NAME,
+            # 未开播时接口可能没有直播数据，标题留空，合并时保留缓存中的值
+            'title': live_data.get('introduction') or '',
+            'anchor': anchor_name,
+            'url': f'{cls.BASE_URL}/{real_room_id}',
+            'avatar': cls.clean_url(profile_info.get('avatar180') or live_data.get('avatar180')),
+            'cover': cls.clean_url(live_data.get('screenshot')),
+            'popular_num': str(total_count) if total_count is not None else '',
+            'is_live': state == 'ON',
+            'status_info': state
+        }
+        if profile_info.get('profileRoom'):
+            snapshot['resolved_room_id'] = real_room_id
+        return snapshot
+
+    @classmethod
+    def parse_live_status(cls, html_content):
+        """从页面HTML中解析直播状态"""
+        room_data = cls.extract_fields(html_content)['room_data']
+        if room_data is None:
+            raise ValueError("无法获取直播间数据")
+
+        state = str(room_data.get('state') or '').upper()
+        is_live = state == 'ON'
+        return is_live, state
+
     @classmethod
     def check_live_status(cls, room_id):
-        """检查直播间状态，并返回真实房间号"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}'
+        """检查直播间状态，返回 (是否直播中, 状态)"""
+        html_content = cls._request(cls.build_room_request(room_id))
+        return cls.parse_live_status(html_content)
+
+    @staticmethod
+    def clean_url(url):
+        """清理URL中的转义字符"""
+        if not url:
+            return ""
+        if url.startswith('//'):
+            url = 'https:' + url
+        # 去除转义字符
+        cleaned = url.replace('\\/', '/')
+        cleaned = re.sub(r'\\(["\\])', r'\1', cleaned)
+        return cleaned
+
+    @classmethod
+    def parse_room_info(cls, text, room_id):
+        """从页面HTML中解析直播间详细信息"""
+        fields = cls.extract_fields(text)
+        room_data = fields['room_data']
+        profile_info = fields['profile']
+
+        title = "未知"
+        anchor_name = "未知"
+        avatar_url = ""
+        cover_url = ""
+        total_count = '0'
+        real_room_id = room_id  # 默认为输入的房间号
+
+        # 解析TT_ROOM_DATA
+        if room_data is not None:
+            title = room_data.get('introduction', '未知')
+            cover_url = room_data.get('screenshot', '')
+            if not cover_url and 'screenshotUrl' in room_data:
+                cover_url = room_data['screenshotUrl']
+            # 获取人气值
+            total_count = str(room_data.get('totalCount', '0'))
+
+        # 解析TT_PROFILE_INFO
+        if profile_info is not None:
+            anchor_name = profile_info.get('nick', '未知')
+            avatar_url = profile_info.get('avatar', '')
+            # 使用真实的房间号（profileRoom）
+            real_room_id = str(profile_info.get('profileRoom', room_id))
+
+        # 备选方案：从网页HTML中提取
+        if title == "未知" and fields['title']:
+            # 尝试从title标签提取标题
+            title = fields['title'].replace(' - 虎牙直播', '').strip()
+
+        if anchor_name == "未知" and fields['h1_anchor']:
+            # 尝试从HTML中提取主播名
+            anchor_name = fields['h1_anchor']
+
+        # 使用真实房间号拼接链接
+        real_url = f'{cls.BASE_URL}/{real_room_id}'
+
+        return {
+            'platform': cls.PLATFORM_NAME,
+            'title': title,
+            'anchor': anchor_name,
+            'url': real_url,
+            'avatar': cls.clean_url(avatar_url),
+            'cover': cls.clean_url(cover_url),
+            'popular_num': total_count
         }
-        
-        try:
-            url = f'{cls.BASE_URL}/{room_id}'
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            html_content = response.text
-            
-            # 查找TT_ROOM_DATA变量
-            room_data_match = re.search(r'var\s+TT_ROOM_DATA\s*=\s*(\{.*?\});', html_content, re.DOTALL)
-            
-            if not room_data_match:
-                raise ValueError("无法获取直播间数据")
-                
-            # 解析TT_ROOM_DATA获取状态
-            try:
-                room_data = json.loads(room_data_match.group(1))
-                state = room_data.get('state', '').upper()
-                
-                is_live = state == 'ON'
-                return is_live, state
-                
-            except json.JSONDecodeError as e:
-                raise ValueError(f"解析直播间数据失败: {e}")
-            
-        except requests.RequestException as e:
-            raise ConnectionError(f"网络请求失败: {e}")
-    
+
     @classmethod
     def get_room_info(cls, room_id):
         """获取直播间详细信息"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': f'{cls.BASE_URL}/{room_id}'
-        }
-        
-        def clean_url(url):
-            """清理URL中的转义字符"""
-            if not url:
-                return ""
-            if url.startswith('//'):
-                url = 'https:' + url
-            # 去除转义字符
-            cleaned = url.replace('\\/', '/')
-            cleaned = re.sub(r'\\(["\\])', r'\1', cleaned)
-            return cleaned
-        
         try:
-            url = f'{cls.BASE_URL}/{room_id}'
-            response = requests.get(url, headers=headers, timeout=10)
-            text = response.text
-            
-            # 查找TT_ROOM_DATA和TT_PROFILE_INFO变量
-            room_data_match = re.search(r'var\s+TT_ROOM_DATA\s*=\s*(\{.*?\});', text, re.DOTALL)
-            profile_info_match = re.search(r'var\s+TT_PROFILE_INFO\s*=\s*(\{.*?\});', text, re.DOTALL)
-            
-            title = "未知"
-            anchor_name = "未知"
-            avatar_url = ""
-            cover_url = ""
-            real_room_id = room_id  # 默认为输入的房间号
-            
-            # 解析TT_ROOM_DATA
-            if room_data_match:
-                try:
-                    room_data = json.loads(room_data_match.group(1))
-                    title = room_data.get('introduction', '未知')
-                    cover_url = room_data.get('screenshot', '')
-                    if not cover_url and 'screenshotUrl' in room_data:
-                        cover_url = room_data['screenshotUrl']
-                    # 获取人气值
-                    total_count = str(room_data.get('totalCount', '0'))
-                except:
-                    total_count = '0'
-            else:
-                total_count = '0'
-                    
-            # 解析TT_PROFILE_INFO
-            if profile_info_match:
-                try:
-                    profile_info = json.loads(profile_info_match.group(1))
-                    anchor_name = profile_info.get('nick', '未知')
-                    avatar_url = profile_info.get('avatar', '')
-                    # 使用真实的房间号（profileRoom）
-                    real_room_id = str(profile_info.get('profileRoom', room_id))
-                except:
-                    pass
-            
-            # 备选方案：从网页HTML中提取
-            if title == "未知":
-                # 尝试从meta标签提取标题
-                title_match = re.search(r'<title>([^<]+)</title>', text, re.IGNORECASE)
-                if title_match:
-                    title = title_match.group(1).replace(' - 虎牙直播', '').strip()
-                    
-            if anchor_name == "未知":
-                # 尝试从HTML中提取主播名
-                h1_match = re.search(r'<h1[^>]*>\s*<span[^>]*>([^<]+)</span>', text)
-                if h1_match:
-                    anchor_name = h1_match.group(1).strip()
-            
-            # 使用真实房间号拼接链接
-            real_url = f'{cls.BASE_URL}/{real_room_id}'
-            
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': title,
-                'anchor': anchor_name,
-                'url': real_url,
-                'avatar': clean_url(avatar_url),
-                'cover': clean_url(cover_url),
-                'popular_num': total_count
-            }
-            
+            text = cls._request(cls.build_room_request(room_id))
+            return cls.parse_room_info(text, room_id)
         except Exception as e:
-            return {
-                'platform': cls.PLATFORM_NAME,
-                'title': '',
-                'anchor': '',
-                'url': f'{cls.BASE_URL}/{room_id}',
-                'avatar': '',
-                'cover': '',
-                'popular_num': '0',
-                'fetch_status': 'failed'
-            }
\ No newline at end of file
+            return cls.failed_room_info(room_id)
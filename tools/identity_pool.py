@@ -0,0 +1,233 @@
+"""
+设备身份池
+哔哩哔哩按设备Cookie（buvid3/buvid4等）识别访问者，每次请求都换一个新设备
+反而更容易被限流。这里为平台维护一组持久的设备身份，每个身份有自己的Cookie罐，
+请求轮流使用池中的身份，服务端下发的Cookie写回对应的罐；
+连续收到412（风控拦截）的身份会被淘汰并补充新身份。身份池持久化到data目录
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+
+from requests.cookies import RequestsCookieJar
+
+from .user_manager import DATA_DIR
+from .config_manager import load_performance_settings
+
+# 服务端判定为风控拦截的状态码
+BLOCKED_STATUS_CODES = (412,)
+
+class DeviceIdentity:
+    """一个设备身份及其Cookie罐"""
+
+    def __init__(self, identity_id, cookies, domain, created_at=None):
+        """
+        Args:
+            identity_id (str): 身份标识
+            cookies (dict): 初始Cookie
+            domain (str): Cookie所属域名，如 .bilibili.com
+            created_at (float): 创建时间戳
+        """
+        self.identity_id = identity_id
+        self.domain = domain
+        self.created_at = created_at or time.time()
+        self.jar = RequestsCookieJar()
+        for name, value in cookies.items():
+            self.jar.set(name, value, domain=domain, path='/')
+
+        self.requests = 0
+        self.blocked = 0
+        self.consecutive_blocked = 0
+
+    def cookie_header(self):
+        """生成请求头中的Cookie"""
+        return '; '.join(f'{cookie.name}={cookie.value}' for cookie in self.jar)
+
+    def update_cookies(self, cookies):
+        """
+        把服务端下发的Cookie写回罐中
+
+        Returns:
+            bool: Cookie是否有变化
+        """
+        changed = False
+        for name, value in cookies.items():
+            if self.jar.get(name, domain=self.domain) != value:
+                self.jar.set(name, value, domain=self.domain, path='/')
+                changed = True
+        return changed
+
+    def to_dict(self):
+        return {
+            'id': self.identity_id,
+            'cookies': {cookie.name: cookie.value for cookie in self.jar},
+            'created_at': self.created_at
+        }
+
+class IdentityPool:
+    """平台的设备身份池"""
+
+    def __init__(self, platform_key, factory, domain, size=8, retire_after=2, persist_file=None):
+        """
+        Args:
+            platform_key (str): 平台标识
+            factory (callable): 生成新身份初始Cookie的函数，返回dict
+            domain (str): Cookie所属域名
+            size (int): 池中保持的身份数
+            retire_after (int): 连续被拦截多少次后淘汰身份
+            persist_file (str): 持久化文件路径，None表示不持久化
+        """
+        self.platform_key = platform_key
+        self.factory = factory
+        self.domain = domain
+        self.size = max(1, int(size))
+        self.retire_after = max(1, int(retire_after))
+        self.persist_file = persist_file
+
+        self.stats = {
+            'requests': 0,
+            'created': 0,
+            'retired': 0,
+            'blocked': 0
+        }
+        self._identities = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._load()
+            self._fill()
+
+    def _new_identity(self):
+        self.stats['created'] += 1
+        return DeviceIdentity(uuid.uuid4().hex[:12], self.factory(), self.domain)
+
+    def _fill(self):
+        """补足身份数（调用方需持有锁）"""
+        if len(self._identities) >= self.size:
+            return
+        while len(self._identities) < self.size:
+            self._identities.append(self._new_identity())
+        self._save()
+
+    def _load(self):
+        """从持久化文件恢复身份（调用方需持有锁）"""
+        if not self.persist_file or not os.path.exists(self.persist_file):
+            return
+        try:
+            with open(self.persist_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for entry in data.get('identities', [])[:self.size]:
+                self._identities.append(
+                    DeviceIdentity(entry['id'], entry['cookies'], self.domain, entry.get('created_at'))
+                )
+        except Exception as e:
+            print(f"加载{self.platform_key}设备身份失败: {e}")
+
+    def _save(self):
+        """写回持久化文件（调用方需持有锁）"""
+        if not self.persist_file:
+            return
+        try:
+            tmp_file = self.persist_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'identities': [identity.to_dict() for identity in self._identities]},
+                          f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.persist_file)
+        except Exception as e:
+            print(f"保存{self.platform_key}设备身份失败: {e}")
+
+    def acquire(self):
+        """按轮转顺序取一个身份，把请求均匀分摊到池中"""
+        with self._lock:
+            identity = self._identities[self._next % len(self._identities)]
+            self._next = (self._next + 1) % len(self._identities)
+            identity.requests += 1
+            self.stats['requests'] += 1
+            return identity
+
+    def report(self, identity, status_code, cookies=None):
+        """
+        记录使用该身份的请求结果
+
+        Args:
+            identity (DeviceIdentity): acquire返回的身份
+            status_code (int): 响应状态码
+            cookies (dict): 服务端下发的Cookie
+        """
+        with self._lock:
+            if identity not in self._identities:
+                # 已被淘汰的身份上还没返回的请求
+                return
+
+            changed = identity.update_cookies(cookies) if cookies else False
+            if status_code not in BLOCKED_STATUS_CODES:
+                identity.consecutive_blocked = 0
+                if changed:
+                    self._save()
+                return
+
+            identity.blocked += 1
+            identity.consecutive_blocked += 1
+            self.stats['blocked'] += 1
+            if identity.consecutive_blocked < self.retire_after:
+                return
+
+            # 淘汰被风控的身份，原位置换上新身份
+            index = self._identities.index(identity)
+            self._identities[index] = self._new_identity()
+            self.stats['retired'] += 1
+            self._save()
+            print(f"淘汰{self.platform_key}设备身份 {identity.identity_id}（连续{identity.consecutive_blocked}次{status_code}）")
+
+    def get_stats(self):
+        """获取身份池健康状况"""
+        now = time.time()
+        with self._lock:
+            identities = [{
+                'id': identity.identity_id,
+                'requests': identity.requests,
+                'blocked': identity.blocked,
+                'consecutive_blocked': identity.consecutive_blocked,
+                'age': round(now - identity.created_at)
+            } for identity in self._identities]
+            stats = dict(self.stats)
+
+        stats.update({
+            'size': len(identities),
+            'healthy': sum(1 for identity in identities if identity['consecutive_blocked'] == 0),
+            'blocked_ratio': round(stats['blocked'] / stats['requests'], 3) if stats['requests'] else 0,
+            'identities': identities
+        })
+        return stats
+
+_pools = {}
+_lock = threading.Lock()
+
+def get_identity_pool(platform_key, factory, domain):
+    """获取平台的设备身份池，不存在时按性能设置创建"""
+    pool = _pools.get(platform_key)
+    if pool is not None:
+        return pool
+
+    with _lock:
+        if platform_key not in _pools:
+            settings = load_performance_settings()['identity_pool']
+            _pools[platform_key] = IdentityPool(
+                platform_key,
+                factory,
+                domain,
+                size=settings['size'],
+                retire_after=settings['retire_after'],
+                persist_file=os.path.join(DATA_DIR, f'{platform_key}_identities.json') if settings['persist'] else None
+            )
+        return _pools[platform_key]
+
+def get_identity_pool_stats():
+    """获取各平台设备身份池的健康状况"""
+    with _lock:
+        pools = dict(_pools)
+    return {platform_key: pool.get_stats() for platform_key, pool in pools.items()}
@@ -0,0 +1,97 @@
+"""
+平台请求延迟统计与自适应超时
+按平台记录最近一段时间的响应延迟（到收到响应头为止），
+读超时取延迟分位数乘以倍数并限制在上下限之间；连接超时单独固定配置
+"""
+
+import math
+import threading
+from collections import deque
+
+from .config_manager import load_performance_settings
+
+class LatencyTracker:
+    """单个平台的滑动窗口延迟统计"""
+
+    def __init__(self, window=200):
+        """
+        Args:
+            window (int): 保留的最近样本数
+        """
+        self._samples = deque(maxlen=max(1, int(window)))
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        """记录一次请求延迟（秒）"""
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, percent):
+        """延迟分位数（秒），没有样本时返回None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(percent / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def get_stats(self):
+        """获取样本数与常用分位数"""
+        return {
+            'samples': len(self),
+            'p50': _round(self.percentile(50)),
+            'p95': _round(self.percentile(95)),
+            'p99': _round(self.percentile(99))
+        }
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+_trackers = {}
+_lock = threading.Lock()
+
+def get_latency_tracker(platform_key):
+    """获取平台的延迟统计，不存在时创建"""
+    tracker = _trackers.get(platform_key)
+    if tracker is not None:
+        return tracker
+
+    with _lock:
+        if platform_key not in _trackers:
+            window = load_performance_settings()['timeouts']['window']
+            _trackers[platform_key] = LatencyTracker(window)
+        return _trackers[platform_key]
+
+def get_request_timeout(platform_key):
+    """
+    计算平台当前的请求超时
+
+    Returns:
+        tuple: (连接超时, 读超时)，单位秒；样本不足时读超时使用默认值
+    """
+    settings = load_performance_settings()['timeouts']
+    tracker = get_latency_tracker(platform_key)
+
+    read_timeout = settings['default_read']
+    if len(tracker) >= settings['min_samples']:
+        observed = tracker.percentile(settings['percentile'])
+        read_timeout = min(settings['max_read'], max(settings['min_read'], observed * settings['multiplier']))
+    return settings['connect'], read_timeout
+
+def get_latency_stats():
+    """获取各平台的延迟分位数和当前超时"""
+    with _lock:
+        platform_keys = list(_trackers)
+
+    stats = {}
+    for platform_key in platform_keys:
+        connect_timeout, read_timeout = get_request_timeout(platform_key)
+        stats[platform_key] = get_latency_tracker(platform_key).get_stats()
+        stats[platform_key].update({
+            'connect_timeout': connect_timeout,
+            'read_timeout': round(read_timeout, 3)
+        })
+    return stats
@@ -0,0 +1,59 @@
+"""
+页面字节解码
+直播间页面按固定顺序确定编码：响应头声明的charset → 页面<meta>中的charset → UTF-8，
+不使用requests/aiohttp在缺少charset时的编码探测（对大页面非常耗CPU）
+"""
+
+import re
+import codecs
+
+# 只在页面开头查找<meta>声明的编码
+META_SNIFF_SIZE = 4096
+
+DEFAULT_ENCODING = 'utf-8'
+
+_CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+def normalize_encoding(encoding):
+    """返回Python可识别的编码名，未知编码返回None"""
+    if not encoding:
+        return None
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+def is_ascii_compatible(encoding):
+    """编码是否兼容ASCII（标记可以直接在字节上匹配）"""
+    return 'a<"='.encode(encoding, errors='replace') == b'a<"='
+
+def declared_charset(content_type):
+    """响应头Content-Type中声明的编码，没有声明或无法识别时返回None"""
+    if not content_type:
+        return None
+    match = _CHARSET_PARAM.search(content_type)
+    return normalize_encoding(match.group(1)) if match else None
+
+def sniff_meta_charset(head):
+    """页面开头<meta charset>或<meta http-equiv content="...; charset=">中的编码"""
+    match = _META_CHARSET.search(head[:META_SNIFF_SIZE])
+    return normalize_encoding(match.group(1).decode('ascii')) if match else None
+
+def resolve_encoding(declared, head):
+    """
+    确定页面编码
+
+    Args:
+        declared (str): 响应头声明的编码，可为None
+        head (bytes): 页面开头的字节
+
+    Returns:
+        str: 编码名
+    """
+    return normalize_encoding(declared) or sniff_meta_charset(head) or DEFAULT_ENCODING
+
+def decode_page(content, content_type=None):
+    """按编码策略把页面字节解码为文本，无法解码的字节替换为U+FFFD"""
+    encoding = resolve_encoding(declared_charset(content_type), content)
+    return content.decode(encoding, errors='replace')
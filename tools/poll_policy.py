@@ -0,0 +1,116 @@
+"""
+直播间自适应轮询间隔
+按直播状态为每个直播间单独计算下次轮询时间：直播中和刚下播的直播间快速轮询，
+长期未开播的直播间按倍数逐步放宽间隔直到上限；
+有规律开播时间的直播间在预计开播前提前恢复快速轮询。
+轮询状态随直播间缓存一起保存（见cache_manager）。
+各直播间的轮询时间按URL的稳定哈希错开并加随机抖动，请求在间隔内均匀分布而不是同时发出
+"""
+
+import zlib
+import random
+
+DAY_SECONDS = 86400
+
+def spread_fraction(url):
+    """直播间在刷新间隔内的固定相位（0~1），由URL的稳定哈希决定，重启后不变"""
+    return zlib.crc32(url.encode('utf-8')) / 0x100000000
+
+def jitter_delay(delay, jitter):
+    """
+    把轮询等待时间随机提前最多jitter比例，避免各直播间的轮询时间逐渐对齐
+
+    只提前不推后，不会超过最大间隔或错过预计开播时间
+    """
+    return delay * random.uniform(1 - jitter, 1)
+
+def _time_of_day_distance(a, b):
+    """两个时间点在一天中的时刻差（秒，跨零点取较短的一边）"""
+    diff = abs(a % DAY_SECONDS - b % DAY_SECONDS)
+    return min(diff, DAY_SECONDS - diff)
+
+def predict_next_start(start_times, now, window, min_occurrences):
+    """
+    根据历史开播时间预测下一次开播
+
+    在一天中的时刻上聚类：某次开播前后window秒内（含自身）至少有min_occurrences次开播时，
+    认为该时刻是规律开播时间
+
+    Returns:
+        float: 下一次预计开播的时间戳（当前仍在该时刻的窗口内时返回本次的时间），没有规律时返回None
+    """
+    best = None
+    best_count = 0
+    for start in start_times:
+        count = sum(1 for other in start_times if _time_of_day_distance(start, other) <= window)
+        if count > best_count or (count == best_count and best is not None and start % DAY_SECONDS < best % DAY_SECONDS):
+            best, best_count = start, count
+    if best is None or best_count < min_occurrences:
+        return None
+
+    predicted = now - now % DAY_SECONDS + best % DAY_SECONDS
+    # 已经过了这次的窗口时预测明天同一时刻
+    if predicted + window < now:
+        predicted += DAY_SECONDS
+    return predicted
+
+def next_poll_state(previous, is_live, now, base_interval, settings):
+    """
+    根据本次轮询结果计算新的轮询状态
+
+    Args:
+        previous (dict): 上次的轮询状态，没有时为None
+        is_live (bool): 本次轮询到的直播状态
+        now (float): 当前时间戳
+        base_interval (float): 用户设置的刷新间隔（秒）
+        settings (dict): 性能设置中的adaptive_polling
+
+    Returns:
+        dict: 轮询状态，包含is_live、interval、next_poll_at、last_live_at、start_times
+    """
+    state = dict(previous or {})
+    if not settings['enabled']:
+        state.update({'is_live': is_live, 'interval': base_interval, 'next_poll_at': now + base_interval})
+        return state
+
+    fast_interval = min(base_interval, settings['fast_interval'])
+    max_interval = max(base_interval, settings['max_interval'])
+    was_live = state.get('is_live')
+
+    if is_live:
+        # 观察到从未开播变为直播中时记录开播时间，用于发现规律开播时刻
+        if was_live is False:
+            start_times = list(state.get('start_times') or []) + [now]
+            state['start_times'] = start_times[-settings['max_start_history']:]
+        state['last_live_at'] = now
+        interval = fast_interval
+    elif state.get('last_live_at') and now - state['last_live_at'] < settings['recent_offline_window']:
+        interval = fast_interval
+    elif was_live is None or state.get('interval') is None:
+        interval = base_interval
+    else:
+        # 长期未开播：间隔逐次放大，不低于用户设置的刷新间隔
+        interval = min(max_interval, max(base_interval, state['interval'] * settings['backoff_factor']))
+
+    next_poll_at = now + interval
+    if not is_live:
+        predicted = predict_next_start(
+            state.get('start_times') or [], now, settings['start_window'], settings['min_start_occurrences']
+        )
+        if predicted is not None:
+            if predicted - settings['start_lead'] <= now:
+                # 处在规律开播时间的窗口内
+                interval = fast_interval
+                next_poll_at = now + interval
+            elif predicted - settings['start_lead'] < next_poll_at:
+                next_poll_at = predicted - settings['start_lead']
+
+    state.update({'is_live': is_live, 'interval': interval, 'next_poll_at': next_poll_at})
+    return state
+
+def failed_poll_state(previous, now, base_interval):
+    """轮询失败（或只返回了缓存数据）时推迟下次轮询，间隔与状态保持不变"""
+    state = dict(previous or {})
+    interval = state.get('interval') or base_interval
+    state['next_poll_at'] = now + min(interval, base_interval)
+    return state
@@ -0,0 +1,238 @@
+"""
+平台请求限流器
+每个平台一个令牌桶（限制请求速率）加一个AIMD自适应并发窗口：
+遇到412/429或超时时按比例收缩并发，延迟健康时逐步放大并发
+"""
+
+import time
+import asyncio
+import threading
+
+from .config_manager import load_performance_settings, get_egress_routes
+
+# 请求结果分类
+OUTCOME_SUCCESS = 'success'
+OUTCOME_THROTTLED = 'throttled'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_ERROR = 'error'
+# 请求被调用方中止（如刷新预算用完），不反映平台状态
+OUTCOME_CANCELLED = 'cancelled'
+
+# 说明目标站点不可用的结果（限流说明站点仍然可达，不计入熔断）
+BREAKER_FAILURE_OUTCOMES = (OUTCOME_TIMEOUT, OUTCOME_ERROR)
+
+# 被平台限流的HTTP状态码
+THROTTLE_STATUS_CODES = (412, 429)
+
+class RateLimitTimeout(ConnectionError):
+    """等待限流许可超时"""
+
+class PlatformRateLimiter:
+    """单个平台的令牌桶 + AIMD并发限流器"""
+
+    def __init__(self, platform_key, rate, burst, initial_concurrency, min_concurrency,
+                 max_concurrency, latency_target, backoff_ratio=0.5, backoff_cooldown=1.0, max_wait=30):
+        """
+        Args:
+            platform_key (str): 平台标识
+            rate (float): 令牌补充速率（每秒请求数）
+            burst (int): 令牌桶容量
+            initial_concurrency (int): 初始并发窗口
+            min_concurrency (int): 并发窗口下限
+            max_concurrency (int): 并发窗口上限
+            latency_target (float): 健康延迟阈值（秒），低于该值才放大并发
+            backoff_ratio (float): 收缩并发时的乘数
+            backoff_cooldown (float): 两次收缩之间的最短间隔（秒），避免一次拥塞被重复惩罚
+            max_wait (float): 等待许可的默认最长时间（秒）
+        """
+        self.platform_key = platform_key
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.min_concurrency = float(min_concurrency)
+        self.max_concurrency = float(max_concurrency)
+        self.latency_target = float(latency_target)
+        self.backoff_ratio = float(backoff_ratio)
+        self.backoff_cooldown = float(backoff_cooldown)
+        self.max_wait = float(max_wait)
+
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.concurrency_limit = float(initial_concurrency)
+        self.in_flight = 0
+        self.last_backoff = 0.0
+
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'backoffs': 0,
+            'waited_requests': 0,
+            'wait_seconds': 0.0
+        }
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.last_refill = now
+
+    def try_acquire(self):
+        """
+        尝试获取一次请求许可
+
+        Returns:
+            float: 0表示已获取许可，否则为建议的等待秒数
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+
+            if self.in_flight >= int(self.concurrency_limit):
+                return 0.05
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate if self.rate > 0 else 0.05
+
+            self.tokens -= 1
+            self.in_flight += 1
+            self.stats['requests'] += 1
+            return 0
+
+    def _record_wait(self, waited):
+        with self._condition:
+            self.stats['waited_requests'] += 1
+            self.stats['wait_seconds'] += waited
+
+    def acquire(self, max_wait=None):
+        """阻塞等待请求许可，超过max_wait秒抛出RateLimitTimeout"""
+        if max_wait is None:
+            max_wait = self.max_wait
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                if attempts:
+                    self._record_wait(time.monotonic() - start)
+                return
+            attempts += 1
+
+            remaining = max_wait - (time.monotonic() - start)
+            if remaining <= 0:
+                raise RateLimitTimeout(f"{self.platform_key} 限流等待超时")
+
+            with self._condition:
+                self._condition.wait(min(wait, remaining))
+
+    async def acquire_async(self, max_wait=None):
+        """异步等待请求许可，超过max_wait秒抛出RateLimitTimeout"""
+        if max_wait is None:
+            max_wait = self.max_wait
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                if attempts:
+                    self._record_wait(time.monotonic() - start)
+                return
+            attempts += 1
+
+            remaining = max_wait - (time.monotonic() - start)
+            if remaining <= 0:
+                raise RateLimitTimeout(f"{self.platform_key} 限流等待超时")
+
+            await asyncio.sleep(min(wait, remaining))
+
+    def release(self, outcome, latency=None):
+        """
+        归还请求许可并根据结果调整并发窗口
+
+        Args:
+            outcome (str): 请求结果（OUTCOME_*）
+            latency (float): 请求耗时（秒）
+        """
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+
+            if outcome in (OUTCOME_THROTTLED, OUTCOME_TIMEOUT):
+                if outcome == OUTCOME_THROTTLED:
+                    self.stats['throttled'] += 1
+                else:
+                    self.stats['timeouts'] += 1
+
+                # 乘性减：同一轮拥塞只收缩一次
+                if now - self.last_backoff >= self.backoff_cooldown:
+                    self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.backoff_ratio)
+                    self.last_backoff = now
+                    self.stats['backoffs'] += 1
+            elif outcome == OUTCOME_CANCELLED:
+                pass
+            elif outcome == OUTCOME_SUCCESS:
+                # 加性增：延迟健康时每个往返窗口大约增加1
+                if latency is not None and latency <= self.latency_target:
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            else:
+                self.stats['errors'] += 1
+
+            self._condition.notify_all()
+
+    def get_stats(self):
+        """获取当前限流参数与计数"""
+        with self._condition:
+            self._refill(time.monotonic())
+            stats = dict(self.stats)
+            stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+            stats.update({
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self.tokens, 2),
+                'concurrency_limit': round(self.concurrency_limit, 2),
+                'in_flight': self.in_flight
+            })
+            return stats
+
+_limiters = {}
+_lock = threading.Lock()
+
+def get_rate_limiter(platform_key):
+    """获取平台的限流器，不存在时按性能设置创建"""
+    limiter = _limiters.get(platform_key)
+    if limiter is not None:
+        return limiter
+
+    with _lock:
+        if platform_key not in _limiters:
+            performance_settings = load_performance_settings()
+            settings = performance_settings['rate_limit']
+            platform_settings = dict(settings['platforms'].get(platform_key, settings['default']))
+            # 经过多个出口发送时，平台整体的速率和并发按出口数放大
+            egress_settings = performance_settings['egress']
+            routes = len(get_egress_routes(platform_key, egress_settings))
+            if routes > 1 and egress_settings['scale_rate_limit']:
+                for key in ('rate', 'burst', 'max_concurrency'):
+                    platform_settings[key] *= routes
+            _limiters[platform_key] = PlatformRateLimiter(
+                platform_key,
+                backoff_ratio=settings['backoff_ratio'],
+                backoff_cooldown=settings['backoff_cooldown'],
+                max_wait=settings['max_wait'],
+                **platform_settings
+            )
+        return _limiters[platform_key]
+
+def classify_status(status_code):
+    """根据HTTP状态码判断请求结果"""
+    if status_code in THROTTLE_STATUS_CODES:
+        return OUTCOME_THROTTLED
+    if status_code >= 500:
+        return OUTCOME_ERROR
+    return OUTCOME_SUCCESS
+
+def get_rate_limit_stats():
+    """获取各平台限流器的统计"""
+    with _lock:
+        limiters = dict(_limiters)
+    return {platform_key: limiter.get_stats() for platform_key, limiter in limiters.items()}
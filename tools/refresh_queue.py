@@ -0,0 +1,419 @@
+"""
+直播间刷新优先队列
+原来批量刷新按rooms_data.json中的顺序提交，各次刷新各自开线程池、争用平台并发名额，
+用户手动刷新单个直播间时也要和正在进行的后台刷新一起排队。
+这里在刷新线程前放一个全局共享的优先队列：
+用户手动刷新排在最前，特别关注分组和直播中的直播间排在未开播的直播间之前；
+排队时间越长排名越靠前（老化），低优先级的刷新不会一直得不到执行。
+各平台同时进行中的刷新数不超过platform_concurrency，名额满的平台不占用工作线程。
+多个用户之间按赤字轮询公平分配，每个用户的后台刷新有并发上限，积压过多时丢弃新的后台刷新。
+异步刷新引擎自己在事件循环中发请求，通过reserve/release向队列预约名额，同样受以上限制
+"""
+
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from .config_manager import load_performance_settings
+from .latency_tracker import LatencyTracker
+from .group_manager import load_groups
+from .cache_manager import load_cached_data
+
+# 优先级（数值越小越优先）
+PRIORITY_INTERACTIVE = 0  # 用户手动刷新
+PRIORITY_BOOSTED = 1      # 特别关注或直播中
+PRIORITY_NORMAL = 2       # 其他直播间
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BOOSTED: 'boosted',
+    PRIORITY_NORMAL: 'normal'
+}
+
+SPECIAL_GROUP = '特别关注'
+
+def load_special_rooms(user_id):
+    """用户特别关注分组中的直播间URL"""
+    group = load_groups(user_id).get(SPECIAL_GROUP) or {}
+    return set(group.get('rooms', []))
+
+def room_priority(url, user_id, special_rooms=None):
+    """
+    后台刷新直播间的优先级：特别关注或缓存中为直播中的直播间优先
+
+    Args:
+        special_rooms (set): 特别关注的直播间，None时读取用户的分组
+    """
+    if special_rooms is None:
+        special_rooms = load_special_rooms(user_id)
+    if url in special_rooms:
+        return PRIORITY_BOOSTED
+    cached_data = load_cached_data(url, user_id)
+    if cached_data and cached_data.get('is_live'):
+        return PRIORITY_BOOSTED
+    return PRIORITY_NORMAL
+
+class RefreshShedError(Exception):
+    """刷新队列积压过多，后台刷新被丢弃"""
+
+class _Job:
+    __slots__ = ('user_id', 'priority', 'platform_key', 'fn', 'args', 'future', 'enqueued_at')
+
+    def __init__(self, user_id, priority, platform_key, fn, args):
+        self.user_id = user_id
+        self.priority = priority
+        self.platform_key = platform_key
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+class RefreshQueue:
+    """
+    多用户共享的刷新工作线程池
+
+    每个用户的刷新单独排队，用户之间按赤字轮询（deficit round-robin）分配工作线程，
+    关注了大量直播间的用户不会占满线程和出站请求；用户内部按优先级和排队时间排序。
+    手动刷新不参与轮询，总是优先执行，也不受用户并发上限限制
+    """
+
+    def __init__(self, workers=16, aging_interval=30, window=500, user_max_in_flight=8,
+                 shed_threshold=1000, user_weights=None):
+        """
+        Args:
+            workers (int): 工作线程数
+            aging_interval (float): 每排队多少秒相当于提升一个优先级
+            window (int): 排队时间统计保留的最近样本数
+            user_max_in_flight (int): 每个用户同时进行中的后台刷新数上限
+            shed_threshold (int): 排队的刷新超过多少个时丢弃新提交的后台刷新
+            user_weights (dict): 用户 → 轮询权重（默认1），权重2的用户每轮可执行两次刷新
+        """
+        self.workers = max(1, int(workers))
+        self.aging_interval = aging_interval
+        self.user_max_in_flight = max(1, int(user_max_in_flight))
+        self.shed_threshold = shed_threshold
+        self.user_weights = dict(user_weights or {})
+        # 后台刷新：用户 → 平台 → [(排名, 序号, 任务)]，排名为入队时间加优先级×老化间隔，入队后不再变化
+        self._queues = {}
+        # 手动刷新不参与轮询，所有用户共用：平台 → [(排名, 序号, 任务)]
+        self._interactive = {}
+        # 有排队任务的用户，按轮询顺序排列
+        self._active = deque()
+        self._deficits = {}
+        self._depth = 0
+        self._limits = {}
+        self._in_flight = {}
+        self._user_in_flight = {}
+        self._sequence = itertools.count()
+        # 已取得名额、还没有release的预约：Future → (任务, 取得名额的时间)
+        self._reserved = {}
+        self._cond = threading.Condition()
+        self._threads = []
+
+        self._waits = {priority: LatencyTracker(window) for priority in PRIORITY_NAMES}
+        self.stats = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'shed': 0}
+        self._usage = {}
+
+    def _user_usage(self, user_id):
+        """用户的用量计数（调用方需持有锁）"""
+        if user_id not in self._usage:
+            self._usage[user_id] = {
+                'submitted': 0, 'completed': 0, 'cancelled': 0, 'shed': 0, 'failed': 0, 'busy_seconds': 0.0
+            }
+        return self._usage[user_id]
+
+    def submit(self, user_id, platform_key, priority, limit, fn, *args):
+        """
+        提交一次刷新
+
+        Args:
+            user_id (str): 发起刷新的用户
+            platform_key (str): 平台标识
+            priority (int): 优先级（PRIORITY_*）
+            limit (int): 平台同时进行中的刷新数上限（以最近一次提交的为准）
+
+        Returns:
+            Future: 刷新结果，还没开始执行时可以cancel()；
+                    积压超过阈值时后台刷新直接以RefreshShedError结束
+        """
+        job = _Job(user_id, priority, platform_key, fn, args)
+        rank = job.enqueued_at + priority * self.aging_interval
+        with self._cond:
+            usage = self._user_usage(user_id)
+            usage['submitted'] += 1
+            self.stats['submitted'] += 1
+            if priority != PRIORITY_INTERACTIVE and self._depth >= self.shed_threshold:
+                usage['shed'] += 1
+                self.stats['shed'] += 1
+                job.future.set_exception(RefreshShedError(f"刷新队列积压超过{self.shed_threshold}个，已跳过后台刷新"))
+                return job.future
+
+            self._start_workers()
+            self._limits[platform_key] = max(1, int(limit))
+            if priority == PRIORITY_INTERACTIVE:
+                heap = self._interactive.setdefault(platform_key, [])
+            else:
+                queues = self._queues.setdefault(user_id, {})
+                if not queues:
+                    self._active.append(user_id)
+                heap = queues.setdefault(platform_key, [])
+            heapq.heappush(heap, (rank, next(self._sequence), job))
+            self._depth += 1
+            self._cond.notify()
+        return job.future
+
+    def reserve(self, user_id, platform_key, priority, limit):
+        """
+        预约一个刷新名额，供自己发请求的异步刷新引擎使用
+
+        预约和刷新一样排队，按优先级、用户间轮询、平台和用户并发上限取得名额，积压时同样被丢弃；
+        取得名额时不占用工作线程，名额一直保留到调用release
+
+        Returns:
+            Future: 取得名额时完成（结果为None），还没取得时可以cancel()
+        """
+        return self.submit(user_id, platform_key, priority, limit, None)
+
+    def release(self, future):
+        """归还reserve取得的名额；还没取得名额时在取得后立即归还，已取消或被丢弃的预约不做处理"""
+        future.add_done_callback(self._release_reserved)
+
+    def _release_reserved(self, future):
+        with self._cond:
+            reserved = self._reserved.pop(future, None)
+            if reserved is None:
+                return
+            job, start = reserved
+            self._finish(job, True, False, start)
+
+    def _finish(self, job, running, failed, start):
+        """任务结束后归还并发名额并记录用量（调用方需持有锁）"""
+        self._in_flight[job.platform_key] -= 1
+        self._user_in_flight[job.user_id] -= 1
+        usage = self._user_usage(job.user_id)
+        status = 'completed' if running else 'cancelled'
+        self.stats[status] += 1
+        usage[status] += 1
+        if failed:
+            usage['failed'] += 1
+        usage['busy_seconds'] += time.monotonic() - start
+        self._cond.notify_all()
+
+    def _start_workers(self):
+        """首次提交时启动工作线程（调用方需持有锁）"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f'room-refresh-{len(self._threads)}', daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _drop_cancelled(self, heap):
+        """丢弃堆顶已取消的任务（调用方需持有锁）"""
+        while heap and heap[0][2].future.cancelled():
+            job = heapq.heappop(heap)[2]
+            self._depth -= 1
+            self.stats['cancelled'] += 1
+            self._user_usage(job.user_id)['cancelled'] += 1
+
+    def _best_platform(self, queues):
+        """各平台队列中排名最前、且平台还有并发名额的任务所在的平台，没有时返回None（调用方需持有锁）"""
+        best = None
+        for platform_key, heap in queues.items():
+            self._drop_cancelled(heap)
+            if not heap or self._in_flight.get(platform_key, 0) >= self._limits[platform_key]:
+                continue
+            if best is None or heap[0][:2] < queues[best][0][:2]:
+                best = platform_key
+        return best
+
+    def _head(self, user_id):
+        """
+        用户排名最前、且所属平台还有并发名额的后台刷新所在的平台，没有时返回None（调用方需持有锁）
+
+        用户的后台刷新达到并发上限时返回None
+        """
+        best = None
+        if self._user_in_flight.get(user_id, 0) < self.user_max_in_flight:
+            best = self._best_platform(self._queues[user_id])
+        else:
+            for heap in self._queues[user_id].values():
+                self._drop_cancelled(heap)
+        self._discard_empty(user_id)
+        return best
+
+    def _discard_empty(self, user_id):
+        """移除已经没有任务的平台队列，用户没有排队任务时退出轮询（调用方需持有锁）"""
+        queues = self._queues[user_id]
+        for platform_key in [platform_key for platform_key, heap in queues.items() if not heap]:
+            del queues[platform_key]
+        if not queues:
+            del self._queues[user_id]
+            self._active.remove(user_id)
+            self._deficits.pop(user_id, None)
+
+    def _take(self, queues, platform_key):
+        """从平台队列取出任务并占用平台和用户的并发名额（调用方需持有锁）"""
+        job = heapq.heappop(queues[platform_key])[2]
+        self._depth -= 1
+        if not queues[platform_key]:
+            del queues[platform_key]
+
+        self._in_flight[platform_key] = self._in_flight.get(platform_key, 0) + 1
+        self._user_in_flight[job.user_id] = self._user_in_flight.get(job.user_id, 0) + 1
+        return job
+
+    def _pop_job(self):
+        """按 手动刷新 → 用户间赤字轮询 的顺序取出下一个任务，没有可执行的任务时返回None（调用方需持有锁）"""
+        # 手动刷新不参与轮询，也不受用户并发上限限制，取所有用户中排名最前的一个
+        platform_key = self._best_platform(self._interactive)
+        for empty in [key for key, heap in self._interactive.items() if not heap]:
+            del self._interactive[empty]
+        if platform_key is not None:
+            return self._take(self._interactive, platform_key)
+
+        # 赤字轮询：每轮给用户加上权重作为额度，每执行一次刷新消耗1
+        while True:
+            eligible = False
+            for _ in range(len(self._active)):
+                if not self._active:
+                    break
+                user_id = self._active[0]
+                platform_key = self._head(user_id)
+                if platform_key is None:
+                    # 只剩已取消任务的用户已经退出轮询
+                    if user_id in self._queues:
+                        self._active.rotate(-1)
+                    continue
+                eligible = True
+                if self._deficits.get(user_id, 0) < 1:
+                    self._deficits[user_id] = self._deficits.get(user_id, 0) + max(0.01, self.user_weights.get(user_id, 1))
+                if self._deficits[user_id] < 1:
+                    self._active.rotate(-1)
+                    continue
+
+                self._deficits[user_id] -= 1
+                # 额度用完后轮到下一个用户
+                if self._deficits[user_id] < 1:
+                    self._active.rotate(-1)
+                job = self._take(self._queues[user_id], platform_key)
+                self._discard_empty(user_id)
+                return job
+            if not eligible:
+                return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._pop_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._pop_job()
+
+            # 等待期间被取消（调用方超出时间预算）的任务不再执行
+            running = job.future.set_running_or_notify_cancel()
+            failed = False
+            start = time.monotonic()
+            if running and job.fn is None:
+                # 预约：名额保留到调用方release
+                self._waits[job.priority].record(start - job.enqueued_at)
+                with self._cond:
+                    self._reserved[job.future] = (job, start)
+                job.future.set_result(None)
+                continue
+            try:
+                if running:
+                    self._waits[job.priority].record(start - job.enqueued_at)
+                    try:
+                        job.future.set_result(job.fn(*job.args))
+                    except BaseException as e:
+                        failed = True
+                        job.future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._finish(job, running, failed, start)
+
+    def _queued_jobs(self):
+        """全部排队中的条目（调用方需持有锁）"""
+        for heap in self._interactive.values():
+            yield from heap
+        for queues in self._queues.values():
+            for heap in queues.values():
+                yield from heap
+
+    def get_stats(self):
+        """获取各优先级的排队数、排队时间分位数，以及各平台进行中的刷新数"""
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for _, _, job in self._queued_jobs():
+                if not job.future.cancelled():
+                    depth[PRIORITY_NAMES[job.priority]] += 1
+            stats = dict(self.stats)
+            in_flight = {platform_key: count for platform_key, count in self._in_flight.items() if count}
+
+        stats.update({
+            'workers': self.workers,
+            'depth': sum(depth.values()),
+            'depth_by_priority': depth,
+            'in_flight': in_flight,
+            'wait_seconds': {
+                PRIORITY_NAMES[priority]: tracker.get_stats() for priority, tracker in self._waits.items()
+            }
+        })
+        return stats
+
+    def get_usage(self):
+        """获取各用户的刷新用量：提交、完成、取消、丢弃、失败次数，占用工作线程的时间，以及当前排队和进行中的数量"""
+        with self._cond:
+            queued = {}
+            for _, _, job in self._queued_jobs():
+                queued[job.user_id] = queued.get(job.user_id, 0) + 1
+            usage = {}
+            for user_id, counters in self._usage.items():
+                usage[user_id] = dict(counters)
+                usage[user_id].update({
+                    'busy_seconds': round(counters['busy_seconds'], 3),
+                    'queued': queued.get(user_id, 0),
+                    'in_flight': self._user_in_flight.get(user_id, 0),
+                    'weight': self.user_weights.get(user_id, 1)
+                })
+        return usage
+
+_queue = None
+_lock = threading.Lock()
+
+def get_refresh_queue():
+    """获取全局刷新队列，不存在时按性能设置创建"""
+    global _queue
+    if _queue is not None:
+        return _queue
+
+    with _lock:
+        if _queue is None:
+            settings = load_performance_settings()
+            _queue = RefreshQueue(
+                workers=settings['batch_refresh'].get('max_workers', 16),
+                aging_interval=settings['refresh_queue']['aging_interval'],
+                window=settings['refresh_queue']['window'],
+                user_max_in_flight=settings['refresh_queue']['user_max_in_flight'],
+                shed_threshold=settings['refresh_queue']['shed_threshold'],
+                user_weights=settings['refresh_queue']['user_weights']
+            )
+        return _queue
+
+def get_refresh_usage():
+    """获取各用户的刷新用量，还没有刷新过时返回空字典"""
+    queue = _queue
+    if queue is None:
+        return {}
+    return queue.get_usage()
+
+def get_refresh_queue_stats():
+    """获取刷新队列的运行统计，还没有刷新过时返回None"""
+    queue = _queue
+    if queue is None:
+        return None
+    return queue.get_stats()
@@ -0,0 +1,249 @@
+"""
+服务端定时刷新
+原来只有打开页面时浏览器才会逐个请求刷新直播间，多个标签页会重复刷新，关闭页面后数据不再更新。
+这里在应用进程中运行一个后台线程刷新各用户关注的直播间并写入缓存，浏览器只读取缓存。
+每个直播间按自适应间隔（见poll_policy）单独安排下次轮询，多个用户关注的同一直播间到期时只获取一次。
+首次轮询（以及停机后过期的直播间）按URL哈希分散在一个刷新间隔内，之后每次轮询加随机抖动，
+出站请求保持平稳而不是每个刷新周期集中突发
+"""
+
+import time
+import threading
+
+from .user_manager import load_users
+from .data_handler import load_saved_rooms
+from .config_manager import (
+    load_performance_settings, load_refresh_settings, load_douyin_config, get_douyin_api_bases
+)
+from .cache_manager import load_poll_state, save_poll_state
+from .room_refresher import poll_rooms, save_room_result
+from .bilibili_push import needs_poll
+from .poll_policy import next_poll_state, failed_poll_state, spread_fraction, jitter_delay
+
+class RefreshScheduler:
+    """按直播间的自适应轮询间隔在后台刷新直播间"""
+
+    def __init__(self, tick_interval=30, min_tick_interval=1, jitter=0.1):
+        """
+        Args:
+            tick_interval (float): 两次检查到期直播间之间的最长间隔（秒）
+            min_tick_interval (float): 两次检查之间的最短间隔（秒）
+            jitter (float): 轮询等待时间的随机抖动比例
+        """
+        self.tick_interval = tick_interval
+        self.min_tick_interval = min_tick_interval
+        self.jitter = jitter
+        # (用户ID, 直播间URL) → 轮询状态（首次用到时从缓存文件读取）
+        self._poll_states = {}
+
+        self.stats = {
+            'cycles': 0,
+            'fetched': 0,
+            'shared': 0,
+            'pushed': 0,
+            'failed': 0,
+            'last_cycle_seconds': 0,
+            'rooms': 0,
+            'due': 0,
+            'mean_interval': 0,
+            'mean_base_interval': 0
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台线程，启动后立即检查一次"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止后台线程（正在进行的刷新结束后退出）"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"定时刷新出错: {e}")
+            self._stop.wait(self._next_wait())
+
+    def _next_wait(self):
+        """距离最早到期的直播间的时间，限制在检查间隔的上下限之间"""
+        upcoming = [state['next_poll_at'] for state in list(self._poll_states.values()) if state]
+        if not upcoming:
+            return self.tick_interval
+        return min(self.tick_interval, max(self.min_tick_interval, min(upcoming) - time.time()))
+
+    @staticmethod
+    def user_interval(user_id):
+        """用户设置的刷新间隔（秒）"""
+        return load_refresh_settings(user_id)['refresh_interval'] * 60
+
+    def _poll_state(self, user_id, url):
+        key = (user_id, url)
+        if key not in self._poll_states:
+            self._poll_states[key] = load_poll_state(url, user_id)
+        return self._poll_states[key]
+
+    def run_due(self):
+        """
+        刷新到期的直播间
+
+        直播间对任一关注者到期时获取一次，结果写入全部关注者的缓存，
+        并按各自的刷新间隔更新轮询状态
+        """
+        start = time.monotonic()
+        now = time.time()
+        url_users = {}
+        base_intervals = {}
+        due_users = {}
+        intervals = []
+        base_total = 0
+        for user_id in load_users():
+            base_intervals[user_id] = self.user_interval(user_id)
+            for url in load_saved_rooms(user_id):
+                url_users.setdefault(url, []).append(user_id)
+                poll_state = self._poll_state(user_id, url)
+                # 没有轮询记录或停机期间早已过期的直播间按URL哈希分散到一个刷新间隔内，不在同一时刻一起获取
+                if poll_state is None or now - poll_state['next_poll_at'] > base_intervals[user_id]:
+                    poll_state = dict(poll_state or {}, next_poll_at=now + spread_fraction(url) * base_intervals[user_id])
+                    self._poll_states[(user_id, url)] = poll_state
+                intervals.append(poll_state.get('interval') or base_intervals[user_id])
+                base_total += base_intervals[user_id]
+                if poll_state['next_poll_at'] <= now:
+                    due_users.setdefault(url, []).append(user_id)
+
+        # 已取消关注的直播间不再保留状态
+        self._poll_states = {
+            key: state for key, state in self._poll_states.items()
+            if key[0] in base_intervals and key[0] in url_users.get(key[1], [])
+        }
+
+        counts = self.refresh_urls(due_users, url_users, base_intervals)
+        with self._lock:
+            self.stats['cycles'] += 1
+            for key, value in counts.items():
+                self.stats[key] += value
+            self.stats['last_cycle_seconds'] = round(time.monotonic() - start, 3)
+            self.stats['rooms'] = len(url_users)
+            self.stats['due'] = len(due_users)
+            self.stats['mean_interval'] = round(sum(intervals) / len(intervals)) if intervals else 0
+            self.stats['mean_base_interval'] = round(base_total / len(intervals)) if intervals else 0
+
+    def _update_poll_states(self, url, users, base_intervals, is_live=None, failed=False):
+        """计算并返回各关注者的新轮询状态"""
+        now = time.time()
+        settings = load_performance_settings()['adaptive_polling']
+        states = {}
+        for user_id in users:
+            previous = self._poll_state(user_id, url)
+            if failed:
+                states[user_id] = failed_poll_state(previous, now, base_intervals[user_id])
+            else:
+                states[user_id] = next_poll_state(previous, is_live, now, base_intervals[user_id], settings)
+            states[user_id]['next_poll_at'] = now + jitter_delay(states[user_id]['next_poll_at'] - now, self.jitter)
+            self._poll_states[(user_id, url)] = states[user_id]
+        return states
+
+    def refresh_urls(self, due_users, url_users, base_intervals):
+        """
+        刷新一批直播间
+
+        由第一个到期的关注者获取（抖音直播间使用该用户的API配置），结果与其他关注者各自的缓存合并后写入；
+        推送连接覆盖的直播间由推送维护缓存，只按对账间隔获取
+
+        Args:
+            due_users: 直播间URL到其到期关注者列表的映射
+            url_users: 直播间URL到全部关注者列表的映射
+            base_intervals: 各用户的基础刷新间隔
+
+        Returns:
+            dict: 本次的获取、共享、推送跳过和失败次数
+        """
+        counts = {'fetched': 0, 'shared': 0, 'pushed': 0, 'failed': 0}
+        owners = {}
+        for url, due in due_users.items():
+            users = url_users[url]
+            if not needs_poll(url):
+                counts['pushed'] += len(users)
+                # 推送覆盖期间按用户间隔检查是否需要对账
+                for user_id, poll_state in self._update_poll_states(url, users, base_intervals, failed=True).items():
+                    save_poll_state(url, poll_state, user_id)
+                continue
+            owners.setdefault(due[0], []).append(url)
+
+        deadline = load_performance_settings()['batch_refresh'].get('deadline')
+        for owner, owned_urls in owners.items():
+            douyin_api_url_base = get_douyin_api_bases(load_douyin_config(owner))
+            for url, outcome, error in poll_rooms(owned_urls, owner, douyin_api_url_base, deadline=deadline):
+                users = url_users[url]
+                merged_result = outcome[0] if error is None else None
+                # 熔断或超出预算时返回的是缓存数据，按失败推迟下次轮询
+                if merged_result is None or merged_result.get('from_cache'):
+                    if error is not None:
+                        print(f"定时刷新直播间失败 {url}: {error}")
+                    counts['failed'] += 1
+                    for user_id, poll_state in self._update_poll_states(url, users, base_intervals, failed=True).items():
+                        save_poll_state(url, poll_state, user_id)
+                    continue
+
+                counts['fetched'] += 1
+                poll_states = self._update_poll_states(url, users, base_intervals, is_live=bool(merged_result.get('is_live')))
+                for user_id in users:
+                    if user_id == owner:
+                        save_poll_state(url, poll_states[user_id], user_id)
+                    else:
+                        save_room_result(url, merged_result, user_id, poll_states[user_id])
+                        counts['shared'] += 1
+        return counts
+
+    def get_stats(self):
+        """获取刷新次数、共享次数，以及当前平均轮询间隔与用户设置间隔的对比"""
+        with self._lock:
+            stats = dict(self.stats)
+        now = time.time()
+        upcoming = [state['next_poll_at'] - now for state in list(self._poll_states.values()) if state]
+        stats['next_poll_in'] = max(0, round(min(upcoming))) if upcoming else 0
+        return stats
+
+_scheduler = None
+_lock = threading.Lock()
+
+def start_refresh_scheduler():
+    """按性能设置启动定时刷新（未启用时不启动），返回调度器实例"""
+    global _scheduler
+    with _lock:
+        if _scheduler is not None:
+            return _scheduler
+
+        settings = load_performance_settings()['scheduler']
+        if not settings['enabled']:
+            return None
+
+        _scheduler = RefreshScheduler(
+            tick_interval=settings['tick_interval'],
+            min_tick_interval=settings['min_tick_interval'],
+            jitter=settings['jitter']
+        )
+        _scheduler.start()
+        print("定时刷新服务已启动")
+        return _scheduler
+
+def is_scheduler_running():
+    """定时刷新是否在运行（未运行时由浏览器发起增量更新）"""
+    return _scheduler is not None
+
+def get_scheduler_stats():
+    """获取定时刷新的运行统计，未启用时返回None"""
+    scheduler = _scheduler
+    if scheduler is None:
+        return None
+    return scheduler.get_stats()
@@ -0,0 +1,146 @@
+"""
+请求重试与对冲策略
+瞬时失败（连接错误、超时、5xx）按指数退避加随机抖动重试；
+慢请求超过平台延迟分位数后再发一个对冲请求，取先返回的结果。
+重试和对冲都从平台的重试预算中扣除，额外请求不会超过正常流量的一定比例
+"""
+
+import time
+import random
+import threading
+from collections import deque
+
+from .config_manager import load_performance_settings
+from .latency_tracker import get_latency_tracker
+
+class TransientError(ConnectionError):
+    """可以重试的网络错误"""
+
+class RetryBudget:
+    """平台的重试预算：时间窗口内的额外请求数不超过原始请求数的一定比例"""
+
+    def __init__(self, ratio=0.1, min_retries=1, window=10):
+        """
+        Args:
+            ratio (float): 额外请求占原始请求的比例上限
+            min_retries (int): 每个窗口内至少允许的额外请求数（请求量很小时也能重试）
+            window (float): 统计窗口（秒）
+        """
+        self.ratio = float(ratio)
+        self.min_retries = int(min_retries)
+        self.window = float(window)
+        self._requests = deque()
+        self._retries = deque()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'denied': 0
+        }
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        cutoff = now - self.window
+        for timestamps in (self._requests, self._retries):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def record_request(self):
+        """记录一次原始请求"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+            self.stats['requests'] += 1
+
+    def try_withdraw(self, kind='retries'):
+        """
+        申请一次额外请求
+
+        Args:
+            kind (str): retries（重试）或 hedges（对冲）
+
+        Returns:
+            bool: 预算内返回True并记账，超出预算返回False
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            allowed = max(self.min_retries, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                self.stats['denied'] += 1
+                return False
+            self._retries.append(now)
+            self.stats[kind] += 1
+            return True
+
+    def record_hedge_win(self):
+        """对冲请求先于原请求返回"""
+        with self._lock:
+            self.stats['hedge_wins'] += 1
+
+    def get_stats(self):
+        """获取计数与当前窗口内的额外请求占比"""
+        with self._lock:
+            self._trim(time.monotonic())
+            stats = dict(self.stats)
+            stats['window_requests'] = len(self._requests)
+            stats['window_retries'] = len(self._retries)
+        return stats
+
+def get_retry_policy(platform_key):
+    """平台的重试与对冲设置（平台设置覆盖默认设置）"""
+    settings = load_performance_settings()['retry']
+    policy = dict(settings['default'])
+    policy.update(settings['platforms'].get(platform_key, {}))
+    return policy
+
+def backoff_delay(policy, attempt):
+    """
+    第attempt次重试前的等待时间（秒）
+
+    指数退避并取完全随机抖动：在 [0, min(上限, 基数 × 2^attempt)] 中均匀取值，
+    避免同时失败的请求在同一时刻一起重试
+    """
+    ceiling = min(policy['max_delay'], policy['base_delay'] * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+def hedge_delay(platform_key, policy):
+    """
+    发出对冲请求前等待的时间（秒）
+
+    Returns:
+        float: 平台延迟分位数；未启用对冲或延迟样本不足时返回None
+    """
+    if not policy['hedge']:
+        return None
+    tracker = get_latency_tracker(platform_key)
+    if len(tracker) < load_performance_settings()['timeouts']['min_samples']:
+        return None
+    return max(policy['hedge_min_delay'], tracker.percentile(policy['hedge_percentile']))
+
+_budgets = {}
+_lock = threading.Lock()
+
+def get_retry_budget(platform_key):
+    """获取平台的重试预算，不存在时按性能设置创建"""
+    budget = _budgets.get(platform_key)
+    if budget is not None:
+        return budget
+
+    with _lock:
+        if platform_key not in _budgets:
+            policy = get_retry_policy(platform_key)
+            _budgets[platform_key] = RetryBudget(
+                ratio=policy['budget_ratio'],
+                min_retries=policy['budget_min_retries'],
+                window=policy['budget_window']
+            )
+        return _budgets[platform_key]
+
+def get_retry_stats():
+    """获取各平台的重试与对冲统计"""
+    with _lock:
+        budgets = dict(_budgets)
+    return {platform_key: budget.get_stats() for platform_key, budget in budgets.items()}
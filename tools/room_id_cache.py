@@ -0,0 +1,112 @@
+"""
+房间号解析缓存
+斗鱼、虎牙需要请求直播间页面才能得到真实房间号，而这个映射几乎不会变化。
+这里按规范化URL持久化解析结果，长期有效；后续抓取发现房间号变化时自动更新
+"""
+
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from .user_manager import DATA_DIR
+from .config_manager import load_performance_settings
+
+ROOM_ID_CACHE_FILE = os.path.join(DATA_DIR, 'room_id_cache.json')
+
+_entries = None
+_lock = threading.Lock()
+
+def canonicalize_url(url):
+    """规范化直播间URL：统一https、小写域名，去掉查询参数、锚点和末尾斜杠"""
+    parsed_url = urlparse(url.strip())
+    netloc = parsed_url.netloc.lower()
+    path = parsed_url.path.rstrip('/')
+    return f"https://{netloc}{path}"
+
+def _load_entries():
+    """加载缓存文件（调用方需持有锁）"""
+    global _entries
+    if _entries is None:
+        _entries = {}
+        if os.path.exists(ROOM_ID_CACHE_FILE):
+            try:
+                with open(ROOM_ID_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        _entries = data
+            except Exception as e:
+                print(f"加载房间号缓存失败: {e}")
+    return _entries
+
+def _save_entries():
+    """写回缓存文件（调用方需持有锁）"""
+    try:
+        tmp_file = ROOM_ID_CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(_entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, ROOM_ID_CACHE_FILE)
+    except Exception as e:
+        print(f"保存房间号缓存失败: {e}")
+
+def get_cached_room_id(url):
+    """获取未过期的缓存房间号，没有时返回None"""
+    ttl = load_performance_settings()['room_id_cache']['ttl']
+    key = canonicalize_url(url)
+
+    with _lock:
+        entry = _load_entries().get(key)
+        if entry and time.time() - entry.get('resolved_at', 0) < ttl:
+            return entry['room_id']
+    return None
+
+def store_room_id(url, room_id):
+    """记录URL对应的真实房间号"""
+    key = canonicalize_url(url)
+    room_id = str(room_id)
+
+    with _lock:
+        entries = _load_entries()
+        entries[key] = {
+            'room_id': room_id,
+            'resolved_at': time.time()
+        }
+        _save_entries()
+
+def confirm_room_id(url, room_id, observed_room_id):
+    """抓取结果中看到的房间号与缓存不一致时更新缓存"""
+    if not observed_room_id or str(observed_room_id) == str(room_id):
+        return
+    print(f"房间号发生变化 {url}: {room_id} -> {observed_room_id}")
+    store_room_id(url, observed_room_id)
+
+def invalidate_room_id(url):
+    """删除URL的房间号缓存"""
+    key = canonicalize_url(url)
+    with _lock:
+        entries = _load_entries()
+        if entries.pop(key, None) is not None:
+            _save_entries()
+
+def resolve_room_id(checker_class, url):
+    """
+    解析直播间URL对应的房间号，需要请求页面的平台优先使用缓存
+
+    Args:
+        checker_class (class): 平台检测器类
+        url (str): 直播间URL
+
+    Returns:
+        str: 房间号
+    """
+    if not checker_class.ROOM_ID_NEEDS_PAGE:
+        return checker_class.extract_room_id(url)
+
+    room_id = get_cached_room_id(url)
+    if room_id:
+        return room_id
+
+    room_id = checker_class.extract_room_id(url)
+    store_room_id(url, room_id)
+    return room_id
@@ -0,0 +1,426 @@
+"""
+直播间刷新流水线
+封装单个直播间的 检测器选择 → 提取房间号 → 获取信息 → 合并数据 → 保存缓存 流程，
+并提供按平台限制并发数的批量刷新
+"""
+
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from .platform_factory import PlatformFactory
+from .bilibili_checker import BilibiliChecker
+from .cache_manager import load_cached_data, save_cached_data, cache_entry_lock
+from .config_manager import load_performance_settings
+from .utils import check_data_changes, merge_room_data
+from .room_id_cache import resolve_room_id, confirm_room_id
+from .single_flight import SingleFlight
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceeded, as_deadline, deadline_scope
+from .bilibili_push import needs_poll, mark_reconciled, record_served_from_push, take_push_changed
+from .refresh_queue import get_refresh_queue, load_special_rooms, room_priority, RefreshShedError
+
+# 抖音第三方API的接口路径
+DOUYIN_API_PATH = '/api/douyin/web/fetch_user_live_videos'
+
+# 预算用完时已开始执行的刷新最多再等待的时间（秒），之后先返回缓存数据，刷新在后台自行结束
+RUNNING_GRACE_SECONDS = 0.5
+
+def _snapshot_freshness():
+    return load_performance_settings()['single_flight']['freshness']
+
+# 相同直播间的并发获取合并为一次请求（复用时间窗口每次按当前设置读取）
+snapshot_flight = SingleFlight(freshness=_snapshot_freshness)
+
+def get_douyin_api_url(checker_class, douyin_api_url_base):
+    """
+    如果是抖音平台，返回完整的API地址，否则返回None
+
+    douyin_api_url_base为多个基础地址时返回地址元组，每次请求由负载均衡选择其中一个
+    """
+    if checker_class.__name__ != 'DouyinChecker':
+        return None
+    if isinstance(douyin_api_url_base, (list, tuple)):
+        api_urls = tuple(base + DOUYIN_API_PATH for base in douyin_api_url_base)
+        return api_urls[0] if len(api_urls) == 1 else api_urls
+    return douyin_api_url_base + DOUYIN_API_PATH
+
+def build_room_result(url, room_id, room_info, is_live, status_info):
+    """根据检测结果构建返回给前端的房间数据"""
+    platform = PlatformFactory.detect_platform_from_url(url)
+
+    result = {
+        'success': True,
+        'platform': platform,
+        'room_id': room_id,
+        'anchor': room_info['anchor'],
+        'title': room_info['title'],
+        'url': room_info['url'],
+        'is_live': is_live,
+        'status_info': str(status_info),
+        'avatar': room_info['avatar'],
+        'cover': room_info['cover'],
+        'popular_num': room_info.get('popular_num', 0),
+        'from_cache': False
+    }
+
+    # 如果有fetch_status字段，添加到result中
+    if 'fetch_status' in room_info:
+        result['fetch_status'] = room_info['fetch_status']
+
+    # 分层获取的平台记录数据来自哪一层
+    if 'tier' in room_info:
+        result['source_tier'] = room_info['tier']
+
+    return result
+
+def fetch_snapshot_shared(checker_class, room_id, douyin_api_url=None):
+    """获取直播间快照，同一直播间的并发请求共享一次网络获取"""
+    key = (checker_class.PLATFORM_KEY, str(room_id), douyin_api_url)
+    return snapshot_flight.do(key, lambda: checker_class.fetch_snapshot(room_id, douyin_api_url))
+
+def fetch_room(url, checker_class, douyin_api_url_base):
+    """从平台获取单个直播间的最新数据（不读写缓存）"""
+    # 提取房间ID（优先使用房间号解析缓存）
+    room_id = resolve_room_id(checker_class, url)
+
+    # 获取抖音API配置（如果是抖音平台）
+    douyin_api_url = get_douyin_api_url(checker_class, douyin_api_url_base)
+
+    # 一次请求同时获取直播状态和房间信息（与并发的相同请求合并）
+    snapshot = fetch_snapshot_shared(checker_class, room_id, douyin_api_url)
+
+    # 页面显示的房间号与缓存不一致时更新缓存
+    confirm_room_id(url, room_id, snapshot.get('resolved_room_id'))
+
+    return build_room_result(url, room_id, snapshot, snapshot['is_live'], snapshot['status_info'])
+
+def prefetch_bulk_snapshots(urls):
+    """
+    对支持批量查询的平台（哔哩哔哩）一次性预取直播状态
+
+    Returns:
+        dict: {url: (room_id, 快照)}，批量查询不到的房间不在其中，需要单独获取
+    """
+    settings = load_performance_settings()['bilibili_bulk']
+    if not settings.get('enabled', True):
+        return {}
+
+    room_ids = {}
+    for url in urls:
+        try:
+            if PlatformFactory.get_platform_checker(url) is BilibiliChecker:
+                room_ids[url] = BilibiliChecker.extract_room_id(url)
+        except ValueError:
+            continue
+
+    if len(room_ids) < settings.get('min_rooms', 2):
+        return {}
+
+    try:
+        status_map = BilibiliChecker.batch_check_live_status(
+            room_ids=sorted(set(room_ids.values())),
+            chunk_size=settings.get('chunk_size', 50)
+        )
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        # 单独获取时同样会按熔断和时间预算快速返回缓存数据
+        print(f"哔哩哔哩批量预取跳过: {e}")
+        return {}
+
+    return {
+        url: (room_id, status_map[room_id])
+        for url, room_id in room_ids.items()
+        if room_id in status_map
+    }
+
+def build_prefetched_result(url, prefetched, user_id):
+    """用批量预取的快照构建房间数据，快照不足以替代单独获取时返回None"""
+    room_id, snapshot = prefetched
+
+    # 按房间号的批量接口不含头像，缓存里也没有头像时改为单独获取
+    if not snapshot.get('avatar'):
+        cached_data = load_cached_data(url, user_id)
+        if not (cached_data and cached_data.get('avatar')):
+            return None
+
+    return build_room_result(url, room_id, snapshot, snapshot['is_live'], snapshot['status_info'])
+
+def save_room_result(url, result, user_id, poll_state=None):
+    """
+    将最新数据与缓存合并后写回缓存
+
+    Args:
+        poll_state (dict): 新的轮询状态，None表示保留原有状态
+
+    Returns:
+        tuple: (合并后的房间数据, 数据是否发生变化)
+    """
+    with cache_entry_lock(url, user_id):
+        # 合并数据，保留有效原有数据
+        cached_data = load_cached_data(url, user_id)
+        merged_result = merge_room_data(cached_data, result)
+
+        # 检查数据是否发生变化（推送写入缓存的状态变化还没返回给用户时也算变化）
+        has_changes = check_data_changes(cached_data, merged_result)
+        has_changes = take_push_changed(user_id, url) or has_changes
+
+        # 保存到缓存
+        save_cached_data(url, merged_result, user_id, poll_state)
+    # 成功获取后推送覆盖的直播间才算已对账
+    mark_reconciled(url)
+
+    return merged_result, has_changes
+
+def keep_cached_result(url, user_id, error, deadline_exceeded=False):
+    """
+    目标站点熔断或刷新预算用完时快速失败，按获取失败与缓存合并，保留最后一次成功获取的数据
+
+    不写回缓存，避免期间不断延长旧数据的有效期；没有缓存时抛出原异常
+
+    Args:
+        deadline_exceeded (bool): 是否因刷新预算用完，是时结果带deadline_exceeded标记
+
+    Returns:
+        tuple: (缓存中的房间数据, False)
+    """
+    cached_data = load_cached_data(url, user_id)
+    if not cached_data:
+        raise error
+
+    merged_result = merge_room_data(cached_data, {'fetch_status': 'failed'})
+    merged_result['from_cache'] = True
+    if deadline_exceeded:
+        merged_result['deadline_exceeded'] = True
+    return merged_result, False
+
+def serve_pushed_room(url, user_id):
+    """
+    推送连接覆盖、且还没到对账时间的直播间不轮询，直接返回推送维护的缓存数据
+
+    Returns:
+        tuple: (缓存中的房间数据, 推送是否改变过数据)，需要轮询时返回None
+    """
+    if needs_poll(url):
+        return None
+
+    cached_data = load_cached_data(url, user_id)
+    if not cached_data:
+        return None
+
+    result = dict(cached_data)
+    result['from_push'] = True
+    record_served_from_push()
+    return result, take_push_changed(user_id, url)
+
+def refresh_room(url, user_id, douyin_api_url_base, checker_class=None, prefetched=None, deadline=None):
+    """
+    刷新单个直播间并写入缓存
+
+    Args:
+        prefetched (tuple): 批量预取得到的 (room_id, 快照)，可选
+        deadline (float|Deadline): 时间预算（秒），用完时返回缓存数据并带deadline_exceeded标记
+
+    Returns:
+        tuple: (合并后的房间数据, 数据是否发生变化)
+    """
+    deadline = as_deadline(deadline)
+    result = build_prefetched_result(url, prefetched, user_id) if prefetched else None
+
+    if result is None:
+        if checker_class is None:
+            checker_class = PlatformFactory.get_platform_checker(url)
+        try:
+            with deadline_scope(deadline):
+                if deadline is not None:
+                    deadline.check()
+                result = fetch_room(url, checker_class, douyin_api_url_base)
+        except CircuitOpenError as e:
+            return keep_cached_result(url, user_id, e)
+        except DeadlineExceeded as e:
+            return keep_cached_result(url, user_id, e, deadline_exceeded=True)
+
+    return save_room_result(url, result, user_id)
+
+def summarize_outcomes(outcomes):
+    """
+    汇总批量刷新结果
+
+    Args:
+        outcomes (list): [(url, (merged_result, has_changes) 或 None, 异常 或 None), ...]
+
+    Returns:
+        tuple: (updated_rooms, changed_rooms, failed_rooms)
+    """
+    updated_rooms = []
+    changed_rooms = []
+    failed_rooms = []
+
+    for url, outcome, error in outcomes:
+        if error is not None:
+            print(f"更新直播间失败 {url}: {error}")
+            failed_room = {
+                'url': url,
+                'error': str(error)
+            }
+            if isinstance(error, DeadlineExceeded):
+                failed_room['deadline_exceeded'] = True
+            failed_rooms.append(failed_room)
+            continue
+
+        merged_result, has_changes = outcome
+        if has_changes:
+            changed_rooms.append(merged_result)
+        updated_rooms.append(merged_result)
+
+    return updated_rooms, changed_rooms, failed_rooms
+
+def submit_refresh(url, user_id, douyin_api_url_base, priority, prefetched=None, deadline=None):
+    """
+    把单个直播间的刷新提交到全局刷新队列（各平台并发数受platform_concurrency限制）
+
+    Args:
+        priority (int): 优先级，见refresh_queue
+
+    Returns:
+        Future: 结果为 (合并后的房间数据, 数据是否发生变化)
+    """
+    checker_class = PlatformFactory.get_platform_checker(url)
+    return get_refresh_queue().submit(
+        user_id, checker_class.PLATFORM_KEY, priority, platform_limit(checker_class),
+        refresh_room, url, user_id, douyin_api_url_base, checker_class, prefetched, deadline
+    )
+
+def platform_limit(checker_class):
+    """平台同时进行中的刷新数上限（性能设置batch_refresh.platform_concurrency）"""
+    platform_concurrency = load_performance_settings()['batch_refresh'].get('platform_concurrency', {})
+    return platform_concurrency.get(checker_class.PLATFORM_KEY, 1)
+
+def reserve_refresh_slot(checker_class, user_id, priority):
+    """
+    在全局刷新队列中为异步引擎预约一个名额，与队列中的刷新共享平台并发、用户并发上限和积压丢弃
+
+    Returns:
+        Future: 取得名额时完成，用完后必须调用release_refresh_slot；积压时以RefreshShedError结束
+    """
+    return get_refresh_queue().reserve(user_id, checker_class.PLATFORM_KEY, priority, platform_limit(checker_class))
+
+def release_refresh_slot(future):
+    """归还reserve_refresh_slot预约的名额"""
+    get_refresh_queue().release(future)
+
+def wait_refresh(future, url, user_id, deadline=None):
+    """
+    等待队列中的刷新完成
+
+    排队等待也计入时间预算：预算用完时还没开始执行的刷新取消并返回缓存数据；
+    已开始执行的刷新最多再等待RUNNING_GRACE_SECONDS，仍未完成时同样返回缓存数据
+    （刷新由自身的时间预算结束，结果照常写入缓存）；队列积压而被丢弃的后台刷新同样返回缓存数据
+
+    Returns:
+        tuple: (合并后的房间数据, 数据是否发生变化)
+    """
+    try:
+        return future.result(timeout=deadline.remaining() if deadline else None)
+    except FutureTimeoutError:
+        if not future.cancel():
+            try:
+                return future.result(timeout=RUNNING_GRACE_SECONDS)
+            except FutureTimeoutError:
+                pass
+        return keep_cached_result(url, user_id, DeadlineExceeded("等待刷新超出时间预算"), deadline_exceeded=True)
+    except RefreshShedError as e:
+        return keep_cached_result(url, user_id, e)
+
+def refresh_room_queued(url, user_id, douyin_api_url_base, priority, deadline=None):
+    """按优先级排队刷新单个直播间并等待结果，参数和返回值见refresh_room"""
+    deadline = as_deadline(deadline)
+    return wait_refresh(submit_refresh(url, user_id, douyin_api_url_base, priority, deadline=deadline), url, user_id, deadline)
+
+def refresh_rooms(urls, user_id, douyin_api_url_base, concurrent=None, deadline=None):
+    """
+    批量刷新直播间
+
+    Args:
+        urls (list): 直播间URL列表
+        user_id (str): 用户ID
+        douyin_api_url_base (list): 抖音API基础地址（可为多个，见get_douyin_api_bases）
+        concurrent (bool): 是否并发刷新，None表示使用性能设置中的默认值
+        deadline (float): 总时间预算（秒），用完后剩余直播间返回缓存数据并带deadline_exceeded标记；
+                          None表示不限时
+
+    推送连接覆盖的哔哩哔哩直播间在对账间隔内直接返回缓存数据（带from_push标记）
+
+    Returns:
+        tuple: (updated_rooms, changed_rooms, failed_rooms)，顺序与urls一致
+    """
+    deadline = as_deadline(deadline)
+
+    # 推送覆盖的直播间只按对账间隔轮询
+    outcomes = {}
+    for url in urls:
+        pushed = serve_pushed_room(url, user_id)
+        if pushed is not None:
+            outcomes[url] = (url, pushed, None)
+    poll_urls = [url for url in urls if url not in outcomes]
+
+    for outcome in poll_rooms(poll_urls, user_id, douyin_api_url_base, concurrent, deadline):
+        outcomes[outcome[0]] = outcome
+
+    return summarize_outcomes([outcomes[url] for url in urls])
+
+def poll_rooms(urls, user_id, douyin_api_url_base, concurrent=None, deadline=None):
+    """
+    向平台获取并刷新一批直播间
+
+    Args:
+        deadline (float|Deadline): 时间预算，见refresh_rooms
+
+    Returns:
+        list: [(url, (merged_result, has_changes) 或 None, 异常 或 None), ...]，顺序与urls一致
+    """
+    settings = load_performance_settings()['batch_refresh']
+    if concurrent is None:
+        concurrent = settings.get('concurrent', True)
+    if not urls:
+        return []
+    deadline = as_deadline(deadline)
+
+    # 哔哩哔哩直播间先走批量查询，查询不到的再单独获取
+    with deadline_scope(deadline):
+        prefetched = prefetch_bulk_snapshots(urls)
+
+    # 各引擎都经过全局刷新队列：特别关注和直播中的直播间优先，共享平台并发、用户并发上限和积压丢弃
+    if concurrent and settings.get('engine') == 'asyncio':
+        from .async_refresh import AsyncRefreshEngine
+        return AsyncRefreshEngine().refresh_outcomes(urls, user_id, douyin_api_url_base, prefetched, deadline)
+
+    special_rooms = load_special_rooms(user_id)
+    outcomes = []
+    if concurrent:
+        submitted = []
+        for url in urls:
+            try:
+                priority = room_priority(url, user_id, special_rooms)
+                submitted.append((url, submit_refresh(
+                    url, user_id, douyin_api_url_base, priority, prefetched.get(url), deadline
+                ), None))
+            except Exception as e:
+                submitted.append((url, None, e))
+
+        for url, future, error in submitted:
+            if error is not None:
+                outcomes.append((url, None, error))
+                continue
+            try:
+                outcomes.append((url, wait_refresh(future, url, user_id, deadline), None))
+            except Exception as e:
+                outcomes.append((url, None, e))
+    else:
+        # 逐个更新房间信息（等上一个完成后再提交下一个）
+        for url in urls:
+            try:
+                priority = room_priority(url, user_id, special_rooms)
+                future = submit_refresh(url, user_id, douyin_api_url_base, priority, prefetched.get(url), deadline)
+                outcomes.append((url, wait_refresh(future, url, user_id, deadline), None))
+            except Exception as e:
+                outcomes.append((url, None, e))
+
+    return outcomes
@@ -0,0 +1,126 @@
+"""
+请求合并（single-flight）
+同一个键同时只执行一次获取，并发的调用方加入进行中的请求并共享结果；
+结果在短暂的新鲜期内直接复用
+"""
+
+import copy
+import time
+import threading
+
+from .deadline import DeadlineExceeded, get_current_deadline
+
+class _Call:
+    """一次进行中的获取"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """按键合并并发获取"""
+
+    def __init__(self, freshness=3.0, max_recent=4096):
+        """
+        Args:
+            freshness (float | callable): 结果的复用时间窗口（秒），0表示只合并进行中的请求；
+                传入函数时每次调用时读取，修改设置后立即生效
+            max_recent (int): 最多保留的近期结果数
+        """
+        self.freshness = freshness
+        self.max_recent = max_recent
+        self._in_flight = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'executed': 0,
+            'joined': 0,
+            'fresh_hits': 0,
+            'retried': 0
+        }
+
+    def _get_freshness(self):
+        return self.freshness() if callable(self.freshness) else self.freshness
+
+    def _prune_recent(self, now, freshness):
+        """清理过期结果（调用方需持有锁）"""
+        expired = [key for key, (stored_at, _) in self._recent.items() if now - stored_at >= freshness]
+        for key in expired:
+            del self._recent[key]
+        # 仍然过多时丢弃最早的结果
+        while len(self._recent) > self.max_recent:
+            del self._recent[next(iter(self._recent))]
+
+    def do(self, key, fn):
+        """
+        执行或加入键对应的获取
+
+        Args:
+            key (hashable): 合并键
+            fn (callable): 实际的获取函数
+
+        Returns:
+            获取结果的副本（各调用方可以独立修改）
+        """
+        deadline = get_current_deadline()
+        freshness = self._get_freshness()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                recent = self._recent.get(key)
+                if recent and now - recent[0] < freshness:
+                    self.stats['fresh_hits'] += 1
+                    return copy.deepcopy(recent[1])
+
+                call = self._in_flight.get(key)
+                if call is not None:
+                    self.stats['joined'] += 1
+                    leader = False
+                else:
+                    call = _Call()
+                    self._in_flight[key] = call
+                    self.stats['executed'] += 1
+                    leader = True
+
+            if leader:
+                try:
+                    call.result = fn()
+                except Exception as e:
+                    call.error = e
+                finally:
+                    with self._lock:
+                        del self._in_flight[key]
+                        if call.error is None and freshness > 0:
+                            now = time.monotonic()
+                            self._recent[key] = (now, call.result)
+                            if len(self._recent) > self.max_recent:
+                                self._prune_recent(now, freshness)
+                    call.event.set()
+                break
+
+            # 加入的调用方按自己的时间预算等待
+            if not call.event.wait(deadline.remaining() if deadline is not None else None):
+                deadline.check()
+                continue
+            # 发起方的预算用完不代表本调用方的预算用完，重新获取（成为新的发起方或加入新的请求）
+            if isinstance(call.error, DeadlineExceeded):
+                self.stats['retried'] += 1
+                if deadline is not None:
+                    deadline.check()
+                continue
+            break
+
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def get_stats(self):
+        """获取合并统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._in_flight)
+            stats['recent'] = len(self._recent)
+            total = stats['executed'] + stats['joined'] + stats['fresh_hits']
+            stats['dedup_ratio'] = round(1 - stats['executed'] / total, 3) if total else 0
+            return stats
@@ -0,0 +1,145 @@
+"""
+流式页面扫描
+逐块扫描直播间页面，只保留解析需要的片段和一小段尾部缓冲区，
+所有关键标记都找到后即可提前断开连接，不必下载整个页面；
+读到页面结尾仍有标记没找到时（如内嵌JSON超出标记的长度上限）按整个页面解析
+"""
+
+import re
+import codecs
+
+from .page_decoding import META_SNIFF_SIZE, normalize_encoding, is_ascii_compatible, resolve_encoding
+
+# 新到达的字节累积到该长度才重新扫描，避免小块时反复扫描整个缓冲区
+MIN_SCAN_SIZE = 4096
+
+class StreamScanner:
+    """按标记组增量提取页面片段"""
+
+    def __init__(self, markers, encoding=None, tail_size=16384):
+        """
+        Args:
+            markers (tuple): 标记组列表，每组是若干正则（第一个为首选，其余为解析器的备选写法），
+                             所有组的首选正则都匹配到后扫描完成
+            encoding (str): 响应头声明的编码，None表示按页面<meta>声明，都没有时按UTF-8
+            tail_size (int): 块之间保留的尾部字节数，用于匹配跨块的标记
+        """
+        # 标记直接在字节上匹配，只有命中的片段才解码；
+        # 不兼容ASCII的编码（如UTF-16）先增量转码为UTF-8
+        self.encoding = normalize_encoding(encoding)
+        self._transcoder = None
+        if self.encoding and not is_ascii_compatible(self.encoding):
+            self._transcoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+            self.encoding = 'utf-8'
+        self.bytes_read = 0
+
+        self.groups = [[re.compile(pattern.encode('utf-8'), re.DOTALL) for pattern in group] for group in markers]
+        self.tail_size = tail_size
+        self._pending = {
+            (group_index, pattern_index)
+            for group_index, group in enumerate(self.groups)
+            for pattern_index in range(len(group))
+        }
+        self._captures = []
+        self._head = b''
+        self._buffer = b''
+        # 标记找全之前保留已读取的全部字节，读到页面结尾仍没找全时返回整个页面
+        self._raw = bytearray()
+        self._unscanned = 0
+        # 缓冲区首字节在整个页面中的偏移
+        self._offset = 0
+
+    @property
+    def done(self):
+        """所有标记组的首选正则是否都已匹配"""
+        return not any((group_index, 0) in self._pending for group_index in range(len(self.groups)))
+
+    def _scan(self, final=False):
+        for key in sorted(self._pending):
+            group_index, pattern_index = key
+            match = self.groups[group_index][pattern_index].search(self._buffer)
+            # 匹配到缓冲区末尾时内容可能还没收全（如数字被截断），等下一块再确认
+            if match and (final or match.end() < len(self._buffer)):
+                self._captures.append((self._offset + match.start(), self._offset + match.end(), match.group(0)))
+                self._pending.discard(key)
+
+    def feed(self, data):
+        """
+        扫描新到达的一段页面字节
+
+        Returns:
+            bool: 是否已找到全部首选标记，可以停止读取
+        """
+        if len(self._head) < META_SNIFF_SIZE:
+            self._head += data[:META_SNIFF_SIZE - len(self._head)]
+        self._buffer += data
+        if self._raw is not None:
+            self._raw += data
+        self._unscanned += len(data)
+        if self._unscanned < MIN_SCAN_SIZE:
+            return False
+        self._unscanned = 0
+        self._scan()
+        if self.done:
+            self._raw = None
+
+        if len(self._buffer) > self.tail_size:
+            cut = len(self._buffer) - self.tail_size
+            self._buffer = self._buffer[cut:]
+            self._offset += cut
+        return self.done
+
+    def feed_bytes(self, chunk):
+        """扫描新到达的一块响应字节，返回值同feed"""
+        self.bytes_read += len(chunk)
+        if self._transcoder is not None:
+            chunk = self._transcoder.decode(chunk).encode('utf-8')
+        return self.feed(chunk)
+
+    def finish(self):
+        """
+        结束扫描并返回供解析器使用的内容
+
+        Returns:
+            str: 按页面中的先后顺序拼接并解码的已匹配片段；有首选标记没找到时为整个页面
+        """
+        if self._transcoder is not None:
+            tail = self._transcoder.decode(b'', final=True).encode('utf-8')
+            self._buffer += tail
+            if self._raw is not None:
+                self._raw += tail
+        self._scan(final=True)
+        self._buffer = b''
+
+        encoding = resolve_encoding(self.encoding, self._head)
+        if not self.done and self._raw is not None:
+            # 已经读完整个页面，交给解析器按整页解析（与不流式读取时一致），而不是只给出部分片段
+            text = bytes(self._raw).decode(encoding, errors='replace')
+            self._raw = None
+            return text
+        self._raw = None
+
+        # 片段可能因尾部缓冲区重叠而相互包含，按位置去重
+        fragments = []
+        last_end = -1
+        for start, end, data in sorted(self._captures):
+            if end <= last_end:
+                continue
+            fragments.append(data.decode(encoding, errors='replace'))
+            last_end = max(last_end, end)
+        return '\n'.join(fragments)
+
+def scan_chunks(chunks, markers, encoding=None, tail_size=16384):
+    """
+    扫描字节块迭代器，找到全部首选标记后停止迭代
+
+    Returns:
+        tuple: (拼接后的片段, 是否提前结束, 读取的字节数)
+    """
+    scanner = StreamScanner(markers, encoding, tail_size)
+    stopped_early = False
+    for chunk in chunks:
+        if scanner.feed_bytes(chunk):
+            stopped_early = True
+            break
+    return scanner.finish(), stopped_early, scanner.bytes_read
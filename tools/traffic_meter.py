@@ -0,0 +1,98 @@
+"""
+出站请求流量统计
+按固定长度的时间桶统计各平台最近一段时间发出的请求数，
+用峰均比（请求最多的时间桶 / 平均每个时间桶）衡量请求是否集中成突发：
+请求均匀分布时接近1，整批直播间同时刷新、之后长时间空闲时明显偏大
+"""
+
+import time
+import threading
+
+from .config_manager import load_performance_settings
+
+# 汇总全部平台的统计键
+ALL_PLATFORMS = 'all'
+
+class TrafficMeter:
+    """单个平台的分桶请求计数"""
+
+    def __init__(self, bucket_seconds=10, window=600):
+        """
+        Args:
+            bucket_seconds (float): 每个时间桶的长度（秒）
+            window (float): 统计的时间窗口（秒）
+        """
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(1, int(window // bucket_seconds))
+        self._counts = {}
+        self._first_bucket = None
+        self._lock = threading.Lock()
+
+    def _prune(self, current):
+        """丢弃窗口之外的时间桶（调用方需持有锁）"""
+        for index in [index for index in self._counts if index <= current - self.buckets]:
+            del self._counts[index]
+
+    def record(self, now=None):
+        """记录一次出站请求"""
+        current = int((now if now is not None else time.monotonic()) // self.bucket_seconds)
+        with self._lock:
+            if self._first_bucket is None:
+                self._first_bucket = current
+            self._counts[current] = self._counts.get(current, 0) + 1
+            self._prune(current)
+
+    def get_stats(self, now=None):
+        """
+        获取窗口内已结束的时间桶的请求数统计（正在进行的时间桶不计入，避免峰均比偏低）
+
+        Returns:
+            dict: 请求数、平均每秒请求数、峰值和平均每桶请求数、峰均比
+        """
+        current = int((now if now is not None else time.monotonic()) // self.bucket_seconds)
+        with self._lock:
+            self._prune(current)
+            if self._first_bucket is None:
+                return {'requests': 0, 'rate': 0, 'peak': 0, 'mean': 0, 'peak_to_mean': None}
+            # 空闲的时间桶也计入平均值，统计从第一次请求开始
+            first = max(self._first_bucket, current - self.buckets + 1)
+            counts = [self._counts.get(index, 0) for index in range(first, current)]
+
+        if not counts:
+            return {'requests': 0, 'rate': 0, 'peak': 0, 'mean': 0, 'peak_to_mean': None}
+        total = sum(counts)
+        mean = total / len(counts)
+        return {
+            'requests': total,
+            'rate': round(total / (len(counts) * self.bucket_seconds), 3),
+            'peak': max(counts),
+            'mean': round(mean, 3),
+            'peak_to_mean': round(max(counts) / mean, 3) if mean else None
+        }
+
+_meters = {}
+_lock = threading.Lock()
+
+def _get_meter(key):
+    meter = _meters.get(key)
+    if meter is not None:
+        return meter
+
+    with _lock:
+        if key not in _meters:
+            settings = load_performance_settings()['traffic']
+            _meters[key] = TrafficMeter(settings['bucket_seconds'], settings['window'])
+        return _meters[key]
+
+def record_outbound(platform_key):
+    """记录平台发出的一次请求（同时计入全部平台的汇总）"""
+    now = time.monotonic()
+    _get_meter(platform_key).record(now)
+    _get_meter(ALL_PLATFORMS).record(now)
+
+def get_traffic_stats():
+    """获取各平台和全部平台汇总的出站请求峰均比"""
+    with _lock:
+        meters = dict(_meters)
+    now = time.monotonic()
+    return {key: meter.get_stats(now) for key, meter in meters.items()}